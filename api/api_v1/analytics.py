@@ -0,0 +1,118 @@
+"""
+搜索分析接口
+由写入接口收到的记录实时聚合（见 common/stream_analytics.py），内存占用与记录数无关：
+- /analytics/top-queries  最近 N 分钟的高频查询词
+- /analytics/query-count  最近 N 分钟某个查询词的次数（估计值）
+- /analytics/latency      最近 N 分钟的搜索耗时分位数，可按设备 / 年级分组
+- /analytics/windows      最近的滚动窗口逐个汇总
+多 worker 部署时设置 ANALYTICS_STATE_DIR 为共享目录，结果包含所有 worker
+"""
+
+import os
+from typing import Literal
+
+from fastapi import APIRouter, Query
+
+from common.query_cache import normalize_query
+from common.stream_analytics import SketchOptions, StreamAnalytics, WindowState
+
+router = APIRouter()
+
+search_analytics = StreamAnalytics(
+    "search_records",
+    window_seconds=int(os.getenv("ANALYTICS_WINDOW_SECONDS", "60")),
+    windows=int(os.getenv("ANALYTICS_WINDOWS", "60")),
+    options=SketchOptions(
+        top_capacity=int(os.getenv("ANALYTICS_TOP_CAPACITY", "200")),
+        cms_width=int(os.getenv("ANALYTICS_CMS_WIDTH", "4096")),
+        cms_depth=int(os.getenv("ANALYTICS_CMS_DEPTH", "4")),
+        relative_accuracy=float(os.getenv("ANALYTICS_LATENCY_ACCURACY", "0.01")),
+        max_groups=int(os.getenv("ANALYTICS_MAX_GROUPS", "32")),
+    ),
+    state_dir=os.getenv("ANALYTICS_STATE_DIR") or None,
+    worker_id=os.getenv("LOG_WORKER_ID"),
+    publish_interval=float(os.getenv("ANALYTICS_PUBLISH_INTERVAL", "5")),
+)
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+MinutesQuery = Query(60, ge=1, le=24 * 60, description="统计最近多少分钟（按窗口取整，最长为保留的窗口总长）")
+
+
+def _span(window: WindowState) -> dict:
+    return {"start": window.start, "end": window.end, "count": window.count}
+
+
+def _latency_summary(window: WindowState, dimension: str) -> dict:
+    return {
+        group: {
+            "count": histogram.count,
+            "mean": histogram.mean,
+            **histogram.quantiles(QUANTILES),
+            "max": histogram.max,
+        }
+        for group, histogram in sorted(window.latency[dimension].items())
+    }
+
+
+@router.get("/analytics/top-queries")
+async def top_queries(minutes: int = MinutesQuery, size: int = Query(10, ge=1, le=100)):
+    """最近 N 分钟出现次数最多的查询词（次数为估计值，可能偏高 error_bound 以内）"""
+    await search_analytics.refresh_peers()
+    window = search_analytics.sliding(minutes * 60)
+    return {
+        "window": _span(window),
+        "error_bound": window.queries.sketch.error_bound,
+        "queries": [{"text": text, "count": count} for text, count in window.queries.top(size)],
+    }
+
+
+@router.get("/analytics/query-count")
+async def query_count(
+    q: str = Query(..., min_length=1, max_length=256, description="查询词"),
+    minutes: int = MinutesQuery,
+):
+    """最近 N 分钟某个查询词（规范化后）的出现次数估计"""
+    await search_analytics.refresh_peers()
+    window = search_analytics.sliding(minutes * 60)
+    return {
+        "q": q,
+        "window": _span(window),
+        "count": window.queries.estimate(normalize_query(q)),
+        "error_bound": window.queries.sketch.error_bound,
+    }
+
+
+@router.get("/analytics/latency")
+async def latency(
+    minutes: int = MinutesQuery,
+    by: Literal["all", "device", "grade"] = Query("all", description="分组维度"),
+):
+    """最近 N 分钟搜索耗时（search_time_taken，秒）的分位数"""
+    await search_analytics.refresh_peers()
+    window = search_analytics.sliding(minutes * 60)
+    return {
+        "window": _span(window),
+        "relative_accuracy": search_analytics.options.relative_accuracy,
+        "groups": _latency_summary(window, by),
+    }
+
+
+@router.get("/analytics/windows")
+async def windows(
+    limit: int = Query(10, ge=1, le=1440, description="最近多少个窗口"),
+    top: int = Query(3, ge=0, le=20, description="每个窗口返回的高频查询词条数"),
+):
+    """最近的滚动窗口逐个汇总，按时间倒序"""
+    await search_analytics.refresh_peers()
+    summaries = []
+    for window in search_analytics.tumbling(limit):
+        histogram = window.latency["all"].get("all")
+        summaries.append(
+            {
+                **_span(window),
+                "latency": histogram.quantiles(QUANTILES) if histogram else None,
+                "top_queries": [{"text": text, "count": count} for text, count in window.queries.top(top)],
+            }
+        )
+    return {"window_seconds": search_analytics.window_seconds, "windows": summaries}
@@ -0,0 +1,88 @@
+"""
+搜索接口
+在 search_records 别名上检索搜索内容，结果按 规范化查询词 + 过滤条件 缓存（见 common/query_cache.py），
+响应头 X-Cache 标明 HIT / STALE / MISS；别名切换到新索引时该别名下的缓存全部失效：
+本进程重建索引时立即失效，其它 worker 或脚本重建时由 search_alias_watcher 每 SEARCH_ALIAS_POLL_INTERVAL 秒查询一次别名，
+发现变化后失效
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from api.deps import ESDep
+from api.responses import FastJSONResponse
+from common.query_cache import QueryCache, cache_key, normalize_query
+from db.es import current_es_client
+from db.es_index import AliasWatcher, on_alias_change, search_record_index
+
+router = APIRouter()
+
+search_cache = QueryCache(
+    "search",
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "60")),
+    negative_ttl=float(os.getenv("SEARCH_CACHE_NEGATIVE_TTL", "10")),
+    stale_ttl=float(os.getenv("SEARCH_CACHE_STALE_TTL", "30")),
+    is_empty=lambda result: not result["hits"],
+)
+on_alias_change(lambda alias, index: search_cache.invalidate_tag(alias))
+search_alias_watcher = AliasWatcher(
+    [search_record_index.alias],
+    current_es_client,
+    interval=float(os.getenv("SEARCH_ALIAS_POLL_INTERVAL", "10")),
+)
+
+
+async def search_records(
+    es,
+    q: str,
+    filters: Dict[str, Any],
+    size: int,
+) -> Dict[str, Any]:
+    """在 search_records 别名上按搜索内容全文检索"""
+    from elastic_transport import TransportError
+    from elasticsearch import ApiError
+
+    terms = [{"term": {name: value}} for name, value in filters.items() if value is not None]
+    query = {
+        "bool": {
+            "must": [{"match": {"search_content": {"query": q, "operator": "and"}}}],
+            "filter": terms,
+        }
+    }
+    try:
+        response = await es.search(
+            index=search_record_index.alias,
+            query=query,
+            size=size,
+            source_excludes=["search_results_id_list"],
+        )
+    except (ApiError, TransportError) as e:
+        raise HTTPException(status_code=503, detail=f"搜索服务不可用: {e}") from e
+    hits = response["hits"]
+    return {
+        "total": hits["total"]["value"],
+        "hits": [{"score": hit["_score"], **hit["_source"]} for hit in hits["hits"]],
+    }
+
+
+@router.get("/search", response_class=FastJSONResponse)
+async def search(
+    es: ESDep,
+    q: str = Query(..., min_length=1, max_length=256, description="搜索内容"),
+    user_grade_id: Optional[str] = Query(None, description="按年级过滤"),
+    user_device: Optional[str] = Query(None, description="按设备过滤"),
+    size: int = Query(10, ge=1, le=100),
+):
+    """检索搜索记录，相同查询在缓存有效期内直接返回缓存结果"""
+    filters = {"user_grade_id": user_grade_id, "user_device": user_device}
+    # 按规范化后的查询词检索，保证同一缓存键对应同一个查询
+    q = normalize_query(q)
+    result, state = await search_cache.get(
+        cache_key(q, filters, size=size),
+        lambda: search_records(es, q, filters, size),
+        tags=(search_record_index.alias,),
+    )
+    return FastJSONResponse(result, headers={"X-Cache": state})
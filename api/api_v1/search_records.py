@@ -0,0 +1,131 @@
+"""
+搜索记录写入接口
+记录校验后进入写后缓冲区，由后台任务批量写入数据库；缓冲区满时返回 429。
+配置了 Elasticsearch 时记录同时进入索引缓冲区，批量写入 search_records 别名（尽力而为，
+索引缓冲区满时丢弃，可用 python -m db.es_backfill 从数据库补齐）；
+搜索内容同时计入补全索引（见 api/api_v1/suggest.py）与流式分析（见 api/api_v1/analytics.py）
+"""
+
+import math
+import os
+from typing import List, Sequence, Union
+
+from fastapi import APIRouter, HTTPException, status
+
+from api.api_v1.analytics import search_analytics
+from api.api_v1.suggest import suggest_index
+from common.write_behind import BufferFull, WriteBehindBuffer
+from db.es import current_es_client
+from db.es_bulk import BulkIndexer, BulkIndexError
+from db.es_index import ensure_index, search_record_index
+from schemas.search import SearchRecord
+
+router = APIRouter()
+
+_repository = None
+
+
+def get_search_record_repository():
+    """搜索记录仓储，首次使用时创建（导入本模块不加载 SQLAlchemy 与模型）"""
+    global _repository
+    if _repository is None:
+        from crud import AsyncRepository
+        from models import SearchRecordModel
+
+        _repository = AsyncRepository(SearchRecordModel)
+    return _repository
+
+
+def __getattr__(name: str):
+    # 兼容 from api.api_v1.search_records import search_record_repository
+    if name == "search_record_repository":
+        return get_search_record_repository()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def to_row(record: SearchRecord) -> dict:
+    row = record.model_dump()
+    row["search_results_id"] = record.search_results_id.id
+    return row
+
+
+async def write_search_records(records: Sequence[dict]):
+    """批量写入；按主键去重（DO NOTHING），客户端重试不会产生重复记录"""
+    from db.database import get_session_factory
+
+    async with get_session_factory()() as session:
+        await get_search_record_repository().upsert(session, records, update_columns=[])
+        await session.commit()
+
+
+def is_permanent_write_error(error: BaseException) -> bool:
+    """数据本身导致的写入错误（约束冲突、类型或取值不合法），重试不会成功；连接、超时等其余错误按暂时性处理"""
+    from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+
+    if isinstance(error, (IntegrityError, DataError)):
+        return True
+    # DBAPIError（含 OperationalError 等连接错误）也是 StatementError 的子类，这里只认参数处理阶段的错误
+    return isinstance(error, StatementError) and not isinstance(error, DBAPIError)
+
+
+search_record_buffer: WriteBehindBuffer[dict] = WriteBehindBuffer(
+    "search_records",
+    write_search_records,
+    is_permanent=is_permanent_write_error,
+    max_size=int(os.getenv("SEARCH_RECORD_BUFFER_SIZE", "50000")),
+    flush_size=int(os.getenv("SEARCH_RECORD_FLUSH_SIZE", "1000")),
+    flush_interval=float(os.getenv("SEARCH_RECORD_FLUSH_INTERVAL", "1.0")),
+)
+
+
+async def index_search_records(records: Sequence[SearchRecord]):
+    """批量写入 Elasticsearch；重试用尽仍失败时抛出异常，由缓冲区整批重试（按 id 覆盖，幂等）"""
+    global _index_ready
+    es = current_es_client()
+    if es is None:
+        return
+    if not _index_ready:
+        await ensure_index(es, search_record_index)
+        _index_ready = True
+    stats = await BulkIndexer(
+        es, search_record_index.alias, concurrency=2, max_retries=3
+    ).run(records)
+    if stats.retry_exhausted:
+        raise BulkIndexError(stats)
+
+
+_index_ready = False
+
+search_record_index_buffer: WriteBehindBuffer[SearchRecord] = WriteBehindBuffer(
+    "search_records_es",
+    index_search_records,
+    max_size=int(os.getenv("SEARCH_RECORD_BUFFER_SIZE", "50000")),
+    flush_size=int(os.getenv("SEARCH_RECORD_FLUSH_SIZE", "1000")),
+    flush_interval=float(os.getenv("SEARCH_RECORD_FLUSH_INTERVAL", "1.0")),
+)
+
+
+@router.post("/search-records", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_search_records(payload: Union[SearchRecord, List[SearchRecord]]):
+    """写入一条或一批搜索记录，返回 202 表示已进入缓冲区（异步落库）"""
+    records = payload if isinstance(payload, list) else [payload]
+    try:
+        buffered = search_record_buffer.add([to_row(record) for record in records])
+    except BufferFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="search record buffer is full",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    if current_es_client() is not None:
+        try:
+            search_record_index_buffer.add(records)
+        except BufferFull:
+            # 数据库是权威数据源，索引落后时不影响写入接口
+            pass
+    for record in records:
+        suggest_index.record(record.search_content, record.user_grade_id)
+        search_analytics.observe(
+            record.search_content, record.search_time_taken, record.user_device, record.user_grade_id
+        )
+    return {"accepted": len(records), "buffered": buffered}
@@ -0,0 +1,69 @@
+"""
+搜索词补全接口
+按前缀返回历史搜索内容，按出现次数排序，可按年级过滤（见 common/suggest.py）。
+写入接口收到的记录即时计入，定期重建后可被补全；SUGGEST_SEED_FROM_DB=true 时启动后从数据库加载历史记录
+"""
+
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from common.log import EnhancedLog
+from common.suggest import SuggestIndex
+
+router = APIRouter()
+
+logger = EnhancedLog.get_logger("suggest")
+
+suggest_index = SuggestIndex(
+    "search_content",
+    top_k=int(os.getenv("SUGGEST_TOP_K", "10")),
+    rebuild_interval=float(os.getenv("SUGGEST_REBUILD_INTERVAL", "60")),
+    min_count=int(os.getenv("SUGGEST_MIN_COUNT", "1")),
+    max_length=int(os.getenv("SUGGEST_MAX_LENGTH", "64")),
+    max_groups=int(os.getenv("SUGGEST_MAX_GROUPS", "32")),
+    rebuild_budget=float(os.getenv("SUGGEST_REBUILD_BUDGET", "0.05")),
+)
+
+SEED_FROM_DB = os.getenv("SUGGEST_SEED_FROM_DB", "false").lower() == "true"
+
+
+async def seed_from_database(page_size: int = 5000):
+    """按主键 keyset 分页读取全部搜索记录的搜索内容与年级，读完后重建一次"""
+    from api.api_v1.search_records import search_record_repository
+    from db.database import get_session_factory
+
+    cursor = None
+    try:
+        while True:
+            async with get_session_factory()() as session:
+                page = await search_record_repository.page(
+                    session,
+                    order_by=["id"],
+                    limit=page_size,
+                    after=cursor,
+                    columns=["search_content", "user_grade_id"],
+                )
+            for row in page.items:
+                suggest_index.record(row["search_content"], row["user_grade_id"])
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        await suggest_index.rebuild(full=True)
+    except Exception as e:
+        logger.error(f"❌ 从数据库加载补全词失败: {e}")
+
+
+@router.get("/suggest")
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=64, description="已输入的前缀"),
+    user_grade_id: Optional[str] = Query(None, description="只返回该年级搜索过的内容"),
+    size: int = Query(10, ge=1, le=50),
+):
+    """按前缀补全搜索内容，按历史出现次数从高到低排序"""
+    suggestions = suggest_index.suggest(q, group=user_grade_id, size=size)
+    return {
+        "q": q,
+        "suggestions": [{"text": text, "count": count} for text, count in suggestions],
+    }
@@ -0,0 +1,32 @@
+"""
+路由依赖
+"""
+
+from typing import TYPE_CHECKING, Annotated, Any, AsyncIterator
+
+from fastapi import Depends
+
+from db.es import get_es_client
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def get_session() -> AsyncIterator["AsyncSession"]:
+    """请求级会话依赖（见 db.database.get_session），首次用到时才导入 SQLAlchemy"""
+    from db.database import get_session_factory
+
+    async with get_session_factory()() as session:
+        yield session
+
+
+# 请求级异步数据库会话：async def handler(session: SessionDep)
+# 运行时类型写作 Any，避免启动时导入 SQLAlchemy
+if TYPE_CHECKING:
+    SessionDep = Annotated[AsyncSession, Depends(get_session)]
+else:
+    SessionDep = Annotated[Any, Depends(get_session)]
+
+# 进程内共享的 AsyncElasticsearch（类型写作 Any，避免启动时导入 elasticsearch）：
+# async def handler(es: ESDep)，未配置 Elasticsearch 时返回 503
+ESDep = Annotated[Any, Depends(get_es_client)]
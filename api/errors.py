@@ -0,0 +1,19 @@
+"""
+请求校验错误处理
+FastAPI 默认的 422 响应把原始输入放在 detail[].input 里并用标准库 json 序列化，
+输入含 NaN / Infinity（Python json 解析时接受）时序列化失败，变成 500。
+这里输出相同结构，非有限浮点数输出为字符串
+"""
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic_core import to_json
+
+
+async def request_validation_exception_handler(request: Request, exc: RequestValidationError) -> Response:
+    return Response(
+        to_json({"detail": exc.errors()}, inf_nan_mode="strings", fallback=str),
+        status_code=422,
+        media_type="application/json",
+    )
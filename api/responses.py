@@ -0,0 +1,19 @@
+"""
+快速 JSON 响应
+FastAPI 默认先用 jsonable_encoder 把返回值转换成 dict/list，再交给标准库 json 序列化；
+这里直接用 pydantic-core（Rust 实现）把 Pydantic 模型及其容器序列化为字节，跳过中间转换。
+返回大列表的接口按需启用：路由上声明 response_class=FastJSONResponse 并直接返回 FastJSONResponse，
+其余接口保持 FastAPI 默认行为（response_model 校验与过滤、注入 Response 的状态码和响应头）
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """直接序列化 Pydantic 模型（及包含模型的 list/dict）的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -1,3 +1,9 @@
 from fastapi import APIRouter
 
+from .api_v1 import analytics, search, search_records, suggest
+
 api_router = APIRouter(prefix="/api/v1", tags=["API v1"])
+api_router.include_router(search_records.router)
+api_router.include_router(search.router)
+api_router.include_router(suggest.router)
+api_router.include_router(analytics.router)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式搜索分析基准
+合成搜索记录流（查询词按 Zipf 分布，耗时按设备取不同的对数正态分布），对比 StreamAnalytics 与精确统计：
+- 写入吞吐（条/秒）与窗口状态大小（记录数增加时不变）
+- 滑动窗口首次合并与缓存已结束窗口后的查询耗时
+- 高频查询词 top-10 的召回率与次数误差
+- 各设备 p50 / p99 的相对误差
+- 按 4 个 worker 分片写入后合并的结果与单进程结果是否一致，状态文件大小与读写耗时
+
+运行: python -m benchmarks.bench_analytics [--records 500000] [--windows 10]
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+from common.query_cache import normalize_query
+from common.stream_analytics import StreamAnalytics, WindowState
+
+from .bench_inverted_index import GRADES, make_text
+
+DEVICES = {"ios": (-2.5, 0.5), "android": (-2.2, 0.7), "web": (-1.8, 0.9), "mini-program": (-2.0, 0.6)}
+# 与窗口边界对齐，滑动窗口正好覆盖全部记录
+START = 28_333_334 * 60.0
+
+
+def make_records(n: int, windows: int, window_seconds: int) -> List[Tuple[str, float, str, str, float]]:
+    """(查询词, 耗时, 设备, 年级, 时间戳)，时间戳均匀分布在 windows 个窗口内"""
+    rng = random.Random(0)
+    devices = list(DEVICES)
+    span = windows * window_seconds
+    records = []
+    for i in range(n):
+        device = rng.choice(devices)
+        mu, sigma = DEVICES[device]
+        records.append((make_text(rng), rng.lognormvariate(mu, sigma), device, rng.choice(GRADES), START + span * i / n))
+    return records
+
+
+def exact_quantile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式搜索分析基准")
+    parser.add_argument("--records", type=int, default=500_000)
+    parser.add_argument("--windows", type=int, default=10)
+    args = parser.parse_args()
+
+    window_seconds = 60
+    records = make_records(args.records, args.windows, window_seconds)
+    now = records[-1][4]
+    seconds = args.windows * window_seconds
+
+    analytics = StreamAnalytics("bench", window_seconds=window_seconds, windows=args.windows)
+    sizes = []
+    start = time.perf_counter()
+    for index, (query, latency, device, grade, timestamp) in enumerate(records, 1):
+        analytics.observe(query, latency, device, grade, now=timestamp)
+        if index in (args.records // 10, args.records):
+            sizes.append((index, analytics.memory_usage() / len(analytics._windows)))
+    elapsed = time.perf_counter() - start
+    print(f"observed {args.records} records in {elapsed:.2f}s ({args.records / elapsed:.0f} records/s)")
+    for count, size in sizes:
+        print(f"  after {count:>8} records: {size / 1024:.0f} KB per window")
+
+    start = time.perf_counter()
+    merged = analytics.sliding(seconds, now=now)
+    cold = time.perf_counter() - start
+    # 已结束窗口的合并结果已缓存，之后的请求只合并当前窗口
+    start = time.perf_counter()
+    analytics.sliding(seconds, now=now)
+    cached = time.perf_counter() - start
+    start = time.perf_counter()
+    analytics.tumbling(args.windows, now=now)
+    tumbling = time.perf_counter() - start
+    print(
+        f"sliding window over {args.windows} windows: first {cold * 1e3:.1f}ms, "
+        f"then {cached * 1e3:.1f}ms per request; tumbling {tumbling * 1e3:.1f}ms"
+    )
+
+    # 精确统计
+    exact = Counter(normalize_query(query) for query, *_ in records)
+    latencies = defaultdict(list)
+    for _, latency, device, _, _ in records:
+        latencies[device].append(latency)
+
+    expected_top = [text for text, _ in exact.most_common(10)]
+    actual_top = merged.queries.top(10)
+    recall = len(set(expected_top) & {text for text, _ in actual_top}) / len(expected_top)
+    count_error = max(count - exact[text] for text, count in actual_top)
+    print(
+        f"top-10 recall {recall:.0%}, top-1 count {exact[expected_top[0]]}, max overestimate {count_error} "
+        f"(bound {merged.queries.sketch.error_bound:.0f} of {merged.queries.total} records)"
+    )
+    for device, values in sorted(latencies.items()):
+        histogram = merged.latency["device"][device]
+        errors = [
+            abs(histogram.quantile(q) - exact_quantile(values, q)) / exact_quantile(values, q) for q in (0.5, 0.99)
+        ]
+        print(f"  {device:<13} p50 error {errors[0]:.2%}   p99 error {errors[1]:.2%}")
+
+    # 4 个 worker 分片写入，状态经 JSON 往返后合并
+    workers = [StreamAnalytics("bench", window_seconds=window_seconds, windows=args.windows) for _ in range(4)]
+    for index, (query, latency, device, grade, timestamp) in enumerate(records):
+        workers[index % 4].observe(query, latency, device, grade, now=timestamp)
+    start = time.perf_counter()
+    encoded = [json.dumps(worker.snapshot()) for worker in workers]
+    dumped = time.perf_counter() - start
+    start = time.perf_counter()
+    combined = WindowState(0, 0, analytics.options)
+    for data in encoded:
+        for state in json.loads(data)["windows"].values():
+            combined.merge(WindowState.from_dict(state, analytics.options))
+    loaded = time.perf_counter() - start
+    same_top = [text for text, _ in combined.queries.top(10)] == [text for text, _ in actual_top]
+    same_latency = all(
+        combined.latency["device"][device].quantile(0.99) == merged.latency["device"][device].quantile(0.99)
+        for device in DEVICES
+    )
+    print(
+        f"4 workers: state {sum(map(len, encoded)) / 4 / 1e6:.2f} MB per worker, dump {dumped * 1e3:.0f}ms, "
+        f"load+merge {loaded * 1e3:.0f}ms, same top-10: {same_top}, same p99: {same_latency}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Elasticsearch 批量写入基准
+向本地 _bulk 桩（benchmarks.es_stub，模拟每个请求的处理延迟与 429 拒绝）写入 N 条 SearchRecord，
+对比逐条写入与不同并发度的 BulkIndexer 的吞吐与批次延迟（需安装 elasticsearch[async]）
+
+运行: python -m benchmarks.bench_bulk_index [--records 50000] [--latency-ms 20] [--reject-rate 0.01]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Iterator
+
+from elasticsearch import AsyncElasticsearch
+
+from benchmarks.es_stub import EsStub
+from db.es_bulk import BulkIndexer
+from schemas.search import SearchRecord, SearchResult
+
+
+def make_records(n: int) -> Iterator[SearchRecord]:
+    rng = random.Random(0)
+    for i in range(n):
+        yield SearchRecord(
+            id=i,
+            user_id=rng.randint(1, 1_000_000),
+            user_grade_id=f"grade-{rng.randint(1, 12)}",
+            search_content="一元二次方程",
+            search_time="2025-06-01 10:00",
+            search_results_id=SearchResult(id=rng.randint(1, 1_000_000)),
+            search_results_id_list=[rng.randint(1, 10_000_000) for _ in range(20)],
+            search_time_taken=rng.random(),
+            user_device="iPhone 15",
+        )
+
+
+async def bench(records: int, latency: float, reject_rate: float, max_docs: int):
+    stub = EsStub(latency=latency, reject_rate=reject_rate)
+    url = await stub.start()
+    es = AsyncElasticsearch(url, connections_per_node=32)
+    print(f"stub: {url}  latency {latency * 1e3:.0f}ms/request  reject {reject_rate:.1%}/item")
+
+    # 逐条写入作为对照（桩只实现了 _bulk，用单条目 _bulk 请求模拟，延迟模型相同），只取一小部分估算
+    sample = min(records, 2000)
+    iterator = make_records(sample)
+
+    async def worker():
+        for record in iterator:
+            await es.bulk(
+                operations=[
+                    {"index": {"_index": "search_records", "_id": str(record.id)}},
+                    record.model_dump(),
+                ]
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(4)))
+    rate = sample / (time.perf_counter() - start)
+    print(f"{'one-by-one c=4':<18} {rate:>10.0f} docs/s   ({sample} docs)")
+
+    for concurrency in (1, 2, 4, 8):
+        stub.max_in_flight = 0
+        indexer = BulkIndexer(
+            es, "search_records", max_docs=max_docs, concurrency=concurrency, retry_backoff=0.05
+        )
+        stats = await indexer.run(make_records(records))
+        print(
+            f"{'bulk c=' + str(concurrency):<18} {stats.docs_per_second:>10.0f} docs/s   "
+            f"batch p50 {stats.latency_percentile(50) * 1e3:6.1f}ms  "
+            f"p99 {stats.latency_percentile(99) * 1e3:6.1f}ms  retried {stats.retried:>5}  "
+            f"failed {stats.failed}  max in-flight {stub.max_in_flight}"
+        )
+
+    await es.close()
+    await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Elasticsearch 批量写入基准")
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--reject-rate", type=float, default=0.01)
+    parser.add_argument("--max-docs", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(bench(args.records, args.latency_ms / 1000, args.reject_rate, args.max_docs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索记录写入吞吐基准
+对比两种写入方式处理 N 个单条写入请求（并发 C）的吞吐与请求处理耗时：
+- per-request:  每个请求独立开会话、INSERT、COMMIT
+- write-behind: 请求只追加到缓冲区，后台按批写入（计时包含全部落库）
+
+默认使用临时 SQLite 文件（需安装 aiosqlite），设置 DATABASE_URL 可对真实 Postgres 测试
+
+运行: python -m benchmarks.bench_ingest [--records 5000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = (
+        f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_ingest.db')}"
+    )
+    # SQLite 同一时间只允许一个写连接，并发写入会直接报 database is locked
+    os.environ.setdefault("DB_POOL_SIZE", "1")
+    os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+from api.api_v1.search_records import search_record_repository, to_row, write_search_records  # noqa: E402
+from common.write_behind import WriteBehindBuffer  # noqa: E402
+from db.database import build_database_url, dispose_engine, get_engine, get_session_factory  # noqa: E402
+from db.init import init_db  # noqa: E402
+from models import SearchRecordModel  # noqa: E402
+from schemas.search import SearchRecord, SearchResult  # noqa: E402
+
+
+def make_rows(start: int, n: int) -> List[dict]:
+    rng = random.Random(start)
+    return [
+        to_row(
+            SearchRecord(
+                id=start + i,
+                user_id=rng.randint(1, 1_000_000),
+                user_grade_id=f"grade-{rng.randint(1, 12)}",
+                search_content="一元二次方程",
+                search_time="2025-06-01 10:00",
+                search_results_id=SearchResult(id=rng.randint(1, 1_000_000)),
+                search_results_id_list=[rng.randint(1, 10_000_000) for _ in range(20)],
+                search_time_taken=rng.random(),
+                user_device="iPhone 15",
+            )
+        )
+        for i in range(n)
+    ]
+
+
+async def clear_table():
+    async with get_engine().begin() as conn:
+        await conn.execute(SearchRecordModel.__table__.delete())
+
+
+async def run_concurrently(handler, rows: List[dict], concurrency: int) -> List[float]:
+    """以固定并发处理所有请求，返回每个请求的处理耗时（秒）"""
+    latencies: List[float] = []
+    iterator = iter(rows)
+
+    async def worker():
+        for row in iterator:
+            start = time.perf_counter()
+            await handler(row)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def per_request(rows: List[dict], concurrency: int):
+    async def handler(row):
+        async with get_session_factory()() as session:
+            await search_record_repository.upsert(session, [row], update_columns=[])
+            await session.commit()
+
+    start = time.perf_counter()
+    latencies = await run_concurrently(handler, rows, concurrency)
+    return time.perf_counter() - start, latencies
+
+
+async def write_behind(rows: List[dict], concurrency: int, flush_size: int):
+    buffer = WriteBehindBuffer(
+        "bench", write_search_records, max_size=len(rows), flush_size=flush_size
+    )
+    await buffer.start()
+
+    async def handler(row):
+        buffer.add([row])
+        # 让出事件循环，模拟请求之间的调度
+        await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    latencies = await run_concurrently(handler, rows, concurrency)
+    await buffer.stop()
+    return time.perf_counter() - start, latencies
+
+
+def report(name: str, n: int, elapsed: float, latencies: List[float]):
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<14} {n / elapsed:>10.0f} rec/s   total {elapsed:6.2f}s   "
+        f"handler avg {statistics.mean(latencies) * 1e3:7.3f}ms  p99 {p99 * 1e3:7.3f}ms"
+    )
+
+
+async def bench(records: int, concurrency: int, flush_size: int):
+    await init_db()
+    await clear_table()
+    elapsed, latencies = await per_request(make_rows(0, records), concurrency)
+    report("per-request", records, elapsed, latencies)
+
+    await clear_table()
+    elapsed, latencies = await write_behind(make_rows(0, records), concurrency, flush_size)
+    report("write-behind", records, elapsed, latencies)
+    await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索记录写入吞吐基准")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--flush-size", type=int, default=1000)
+    args = parser.parse_args()
+    print(f"database: {build_database_url().render_as_string()}")
+    asyncio.run(bench(args.records, args.concurrency, args.flush_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内倒排索引基准
+用合成的搜索内容（学科 + 长尾话题 + 后缀，均按 Zipf 分布抽样）对比：
+- brute-force: 逐条扫描全部文档（预先分词），按相同的 BM25 公式打分
+- inverted:    common.inverted_index.InvertedIndex
+并报告建索引速度、倒排表大小与快照保存/mmap 加载耗时
+
+运行: python -m benchmarks.bench_inverted_index [--docs 100000] [--queries 200]
+"""
+
+import argparse
+import heapq
+import itertools
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from typing import List, Tuple
+
+from common.inverted_index import InvertedIndex, tokenize
+
+SUBJECTS = [
+    "一元二次方程", "二次函数", "勾股定理", "三角函数", "等差数列", "概率", "平面向量", "导数",
+    "英语语法", "现在完成时", "定语从句", "古诗词", "文言文", "作文", "化学方程式", "牛顿定律",
+]
+SUFFIXES = ["解法", "例题", "公式", "练习", "知识点", "易错题", "讲解", "视频", "期末复习", "答案"]
+GRADES = [f"grade-{i}" for i in range(1, 13)]
+# 长尾的具体话题词（教材、题目名等），3 个汉字
+_rng = random.Random(42)
+TOPICS = ["".join(chr(_rng.randint(0x4E00, 0x6FFF)) for _ in range(3)) for _ in range(20_000)]
+TOPIC_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(len(TOPICS))))
+SUBJECT_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(len(SUBJECTS))))
+
+
+def make_text(rng: random.Random) -> str:
+    """学科（Zipf）+ 长尾话题（Zipf）+ 后缀"""
+    subject = rng.choices(SUBJECTS, cum_weights=SUBJECT_WEIGHTS)[0]
+    topic = rng.choices(TOPICS, cum_weights=TOPIC_WEIGHTS)[0]
+    return f"{subject} {topic} {rng.choice(SUFFIXES)}"
+
+
+def make_documents(n: int) -> List[Tuple[str, dict]]:
+    rng = random.Random(0)
+    return [
+        (str(i), {"search_content": make_text(rng), "user_grade_id": rng.choice(GRADES)})
+        for i in range(n)
+    ]
+
+
+def make_queries(n: int) -> List[str]:
+    """真实查询多为 话题 + 学科/后缀 的组合"""
+    rng = random.Random(1)
+    queries = []
+    for _ in range(n):
+        topic = rng.choices(TOPICS, cum_weights=TOPIC_WEIGHTS)[0]
+        queries.append(f"{topic} {rng.choice(SUFFIXES)}" if rng.random() < 0.5 else topic)
+    return queries
+
+
+class BruteForce:
+    """逐条扫描，打分公式与 InvertedIndex 相同"""
+
+    def __init__(self, documents, k1=1.2, b=0.75):
+        self.ids = [doc_id for doc_id, _ in documents]
+        self.tokens = [Counter(tokenize(document["search_content"])) for _, document in documents]
+        self.lengths = [sum(counter.values()) for counter in self.tokens]
+        self.avgdl = sum(self.lengths) / len(self.lengths)
+        self.df = Counter(term for counter in self.tokens for term in counter)
+        self.k1, self.b = k1, b
+
+    def search(self, query: str, size: int = 10):
+        terms = list(dict.fromkeys(tokenize(query)))
+        n = len(self.ids)
+        idf = {t: math.log(1 + (n - self.df[t] + 0.5) / (self.df[t] + 0.5)) for t in terms}
+        scores = []
+        for docno, counter in enumerate(self.tokens):
+            score = 0.0
+            for term in terms:
+                freq = counter.get(term)
+                if freq:
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[docno] / self.avgdl)
+                    score += idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score:
+                scores.append((score, -docno))
+        top = heapq.nlargest(size, scores)
+        return len(scores), [(self.ids[-docno], score) for score, docno in top]
+
+
+def timed(func, queries) -> List[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: List[float]):
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(
+        f"{name:<14} avg {statistics.mean(latencies) * 1e3:8.3f}ms   p99 {p99 * 1e3:8.3f}ms   "
+        f"{len(latencies) / sum(latencies):>9.0f} qps"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="进程内倒排索引基准")
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    documents = make_documents(args.docs)
+    queries = make_queries(args.queries)
+
+    start = time.perf_counter()
+    index = InvertedIndex("search_content", ["user_grade_id"])
+    index.add_many(documents)
+    elapsed = time.perf_counter() - start
+    usage = index.memory_usage()
+    postings_count = sum(index._df.values())
+    print(
+        f"indexed {args.docs} docs in {elapsed:.2f}s ({args.docs / elapsed:.0f} docs/s), "
+        f"{usage['terms']} terms, postings {usage['postings'] / 1e6:.2f} MB "
+        f"({usage['postings'] / postings_count:.2f} bytes/posting vs 8 uncompressed)"
+    )
+
+    brute = BruteForce(documents)
+    # 结果一致性检查
+    for query in queries[:20]:
+        expected = brute.search(query)
+        actual = index.search(query)
+        assert expected[0] == actual[0], query
+        assert [round(s, 6) for _, s in expected[1]] == [round(s, 6) for _, s in actual[1]], query
+
+    # 逐条扫描太慢，只取一小部分估算
+    brute_queries = queries[:20]
+    report("brute-force", timed(brute.search, brute_queries))
+    report("inverted", timed(index.search, queries))
+    report("inverted+and", timed(lambda q: index.search(q, operator="and"), queries))
+    report("inverted+filter", timed(lambda q: index.search(q, {"user_grade_id": "grade-3"}), queries))
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.idx")
+    start = time.perf_counter()
+    index.save(path)
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded = InvertedIndex.load(path)
+    load_time = time.perf_counter() - start
+    print(
+        f"snapshot {os.path.getsize(path) / 1e6:.1f} MB   save {saved * 1e3:.0f}ms   "
+        f"mmap load {load_time * 1e3:.0f}ms"
+    )
+    report("loaded", timed(loaded.search, queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 响应序列化基准
+对一批 SearchRecord 比较三条路径生成响应体的耗时：
+- default:        FastAPI 默认（jsonable_encoder + JSONResponse，标准库 json）
+- response_model: 声明 response_model 时的重新校验 + pydantic dump_json
+- fast:           FastJSONResponse（pydantic-core 直接序列化模型）
+
+运行: python -m benchmarks.bench_json_response
+"""
+
+import random
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from api.responses import FastJSONResponse
+from schemas.search import SearchRecord, SearchResult
+
+DEVICES = ("iPhone 15", "Pixel 8", "Windows Chrome", "macOS Safari", "iPad")
+
+
+def make_records(n: int, ids_per_record: int = 200, seed: int = 42) -> List[SearchRecord]:
+    """生成接近真实数据的记录，search_results_id_list 为主要体积来源"""
+    rng = random.Random(seed)
+    return [
+        SearchRecord(
+            id=i,
+            user_id=rng.randint(1, 10_000_000),
+            user_grade_id=f"grade-{rng.randint(1, 12)}",
+            search_content=rng.choice(("勾股定理", "一元二次方程", "photosynthesis", "牛顿第二定律")),
+            search_time=f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+            search_results_id=SearchResult(id=rng.randint(1, 10_000_000)),
+            search_results_id_list=[rng.randint(1, 50_000_000) for _ in range(ids_per_record)],
+            search_time_taken=rng.random(),
+            user_device=rng.choice(DEVICES),
+        )
+        for i in range(n)
+    ]
+
+
+def bench(fn, repeat: int) -> float:
+    """返回单次耗时（毫秒）"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    adapter = TypeAdapter(List[SearchRecord])
+    print(f"{'records':>8} {'body':>10} {'default':>10} {'resp_model':>11} {'fast':>10} {'speedup':>8}")
+    for n in (10, 100, 1000, 5000):
+        records = make_records(n)
+        repeat = max(3, 2000 // n)
+
+        default_body = JSONResponse(jsonable_encoder(records)).body
+        fast_body = FastJSONResponse(records).body
+        assert adapter.validate_json(default_body) == adapter.validate_json(fast_body)
+
+        default = bench(lambda: JSONResponse(jsonable_encoder(records)).body, repeat)
+        model = bench(
+            lambda: adapter.dump_json(
+                adapter.validate_python(records, from_attributes=True)
+            ),
+            repeat,
+        )
+        fast = bench(lambda: FastJSONResponse(records).body, repeat)
+        print(
+            f"{n:>8} {len(fast_body) / 1024:>8.0f}KB {default:>8.2f}ms {model:>9.2f}ms "
+            f"{fast:>8.2f}ms {default / fast:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
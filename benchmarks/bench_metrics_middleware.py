@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求指标中间件开销基准
+直接驱动 ASGI 调用链，对比裸应用与套上 PrometheusMiddleware 后的单次请求耗时
+
+运行: python -m benchmarks.bench_metrics_middleware
+"""
+
+import asyncio
+import time
+
+from common.metrics import MetricsRegistry, PrometheusMiddleware
+
+
+class _Route:
+    path = "/api/v1/items/{item_id}"
+
+
+async def plain_app(scope, receive, send):
+    """模拟路由匹配后返回一个小响应"""
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def run(app, n: int) -> float:
+    """返回单次请求耗时（纳秒）"""
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/items/1"}
+        await app(scope, _receive, _send)
+    return (time.perf_counter_ns() - start) / n
+
+
+def main():
+    n = 200_000
+    wrapped = PrometheusMiddleware(plain_app, registry=MetricsRegistry())
+
+    async def bench():
+        # 预热
+        await run(plain_app, 1000)
+        await run(wrapped, 1000)
+        return await run(plain_app, n), await run(wrapped, n)
+
+    baseline, measured = asyncio.run(bench())
+    print(f"requests:            {n}")
+    print(f"bare app:            {baseline:8.0f} ns/req")
+    print(f"with middleware:     {measured:8.0f} ns/req")
+    print(f"middleware overhead: {measured - baseline:8.0f} ns/req")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务冷启动基准与预算
+- import: 以 -X importtime 运行 `import main`，按顶层包汇总自身耗时，列出最重的依赖
+- first response: 启动 uvicorn main:app 子进程，轮询 /hi 直到首次返回 200
+
+超出预算或 `import main` 加载了应按需导入的重型依赖时以非零状态退出，可放进 CI 跟踪。建议先执行 python -m compileall -q . 以排除字节码编译耗时
+
+运行: python -m benchmarks.bench_startup [--runs 5] [--import-budget-ms 900] [--first-response-budget-ms 2000]
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# 启动预算（毫秒），调整依赖后按实测更新
+IMPORT_BUDGET_MS = 900
+FIRST_RESPONSE_BUDGET_MS = 2000
+
+# 只在用到时导入的依赖（数据库、Elasticsearch 客户端、pandas），出现在 import main 中即视为回归，与机器快慢无关
+DEFERRED_PACKAGES = ("sqlalchemy", "asyncpg", "aiosqlite", "elasticsearch", "elastic_transport", "aiohttp", "pandas")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(module: str = "main") -> Tuple[float, Dict[str, float]]:
+    """返回 (导入总耗时ms, {顶层包: 自身耗时ms})"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    total = 0.0
+    by_package: Dict[str, float] = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        by_package[name.split(".")[0]] += int(self_us) / 1000
+        if name == module and len(indent) == 1:
+            total = int(cumulative_us) / 1000
+    return total, dict(by_package)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_response(path: str = "/hi", timeout: float = 30.0) -> float:
+    """从启动进程到首次成功响应的耗时（毫秒）"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn 退出，返回码 {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise TimeoutError(f"{timeout}s 内未收到 {url} 的响应")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务冷启动基准")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="列出自身耗时最高的顶层包数")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument(
+        "--first-response-budget-ms", type=float, default=FIRST_RESPONSE_BUDGET_MS
+    )
+    args = parser.parse_args()
+
+    totals: List[float] = []
+    packages: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(args.runs):
+        total, by_package = importtime()
+        totals.append(total)
+        for name, value in by_package.items():
+            packages[name].append(value)
+
+    print(f"import main (median of {args.runs}): {statistics.median(totals):.0f} ms")
+    ranked = sorted(
+        ((statistics.median(values), name) for name, values in packages.items()),
+        reverse=True,
+    )
+    for value, name in ranked[: args.top]:
+        print(f"  {name:<24} {value:8.1f} ms")
+
+    responses = [first_response() for _ in range(args.runs)]
+    print(f"time to first response (median of {args.runs}): {statistics.median(responses):.0f} ms")
+
+    failures = []
+    eager = [name for name in DEFERRED_PACKAGES if name in packages]
+    if eager:
+        failures.append("imported at startup: " + ", ".join(eager))
+    if statistics.median(totals) > args.import_budget_ms:
+        failures.append(f"import {statistics.median(totals):.0f} ms > {args.import_budget_ms:.0f} ms")
+    if statistics.median(responses) > args.first_response_budget_ms:
+        failures.append(
+            f"first response {statistics.median(responses):.0f} ms > "
+            f"{args.first_response_budget_ms:.0f} ms"
+        )
+    if failures:
+        print("over budget: " + "; ".join(failures))
+        sys.exit(1)
+    print("within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索词补全基准
+合成 N 个不同的查询词（学科 + 长尾话题 + 后缀，出现次数按 Zipf 分布），对比：
+- scan:    在 dict 中逐条检查前缀并取 top-K
+- suggest: common.suggest.SuggestIndex
+并报告重建耗时与内存（每百万个不同查询词的字节数，估算值与 tracemalloc 实测值），
+以及一个重建周期内新增 --updates 条记录（多为已收录查询词）时增量重建与完整重建的耗时
+
+运行: python -m benchmarks.bench_suggest [--queries 1000000] [--lookups 2000] [--updates 50000]
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Dict, List
+
+from common.suggest import SuggestIndex
+
+from .bench_inverted_index import GRADES, SUBJECTS, SUFFIXES, TOPICS
+
+
+def make_queries(n: int) -> Dict[str, int]:
+    """n 个不同的查询词 -> 出现次数"""
+    rng = random.Random(0)
+    queries: Dict[str, int] = {}
+    while len(queries) < n:
+        text = f"{rng.choice(SUBJECTS)} {rng.choice(TOPICS)} {rng.choice(SUFFIXES)}{rng.randint(0, 99)}"
+        queries[text] = max(1, int(1000 / (len(queries) + 1) ** 0.8) + rng.randint(0, 3))
+    return queries
+
+
+def make_prefixes(queries: List[str], n: int) -> List[str]:
+    """用户输入的前缀：取已有查询词的前 1~6 个字符"""
+    rng = random.Random(1)
+    return [text[: rng.randint(1, 6)] for text in rng.choices(queries, k=n)]
+
+
+def timed(func, prefixes) -> List[float]:
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        func(prefix)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: List[float]):
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(
+        f"{name:<10} avg {statistics.mean(latencies) * 1e3:8.3f}ms   p99 {p99 * 1e3:8.3f}ms   "
+        f"{len(latencies) / sum(latencies):>9.0f} qps"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索词补全基准")
+    parser.add_argument("--queries", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=50_000)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    queries = make_queries(args.queries)
+    plain_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rng = random.Random(2)
+
+    def build() -> SuggestIndex:
+        index = SuggestIndex("bench")
+        for text, count in queries.items():
+            index.record(text, rng.choice(GRADES), count=count)
+        index.rebuild_now()
+        return index
+
+    index = build()
+    usage = index.memory_usage()
+    per_million = 1_000_000 / usage["queries"]
+    # 同样的数据在 tracemalloc 下再建一次，实测 Python 对象占用（增量计数已在重建后释放）
+    tracemalloc.start()
+    traced_index = build()
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced_index
+    print(
+        f"rebuilt {usage['queries']} distinct queries (+{len(GRADES)} grade indexes) "
+        f"in {index.last_rebuild_seconds:.2f}s, {usage['hot_prefixes']} hot prefixes\n"
+        f"estimated {usage['bytes'] / 1e6:.1f} MB  ->  {usage['bytes_per_million'] / 1e6:.1f} MB per million queries\n"
+        f"traced    {traced / 1e6:.1f} MB  ->  {traced * per_million / 1e6:.1f} MB per million queries"
+    )
+    print(f"dict[str, int] of the same queries (global only): {plain_bytes * per_million / 1e6:.1f} MB per million")
+
+    normalized = {text.casefold(): count for text, count in queries.items()}
+
+    def scan(prefix: str):
+        prefix = prefix.casefold()
+        return heapq.nlargest(10, ((c, t) for t, c in normalized.items() if t.startswith(prefix)))
+
+    prefixes = make_prefixes(list(queries), args.lookups)
+    for prefix in prefixes[:50]:
+        expected = [count for count, _ in scan(prefix)]
+        assert [count for _, count in index.suggest(prefix)] == expected, prefix
+
+    # 一个重建周期内的新记录：95% 为已收录的查询词（按次数加权），5% 为新查询词
+    repeated = rng.choices(list(queries), list(queries.values()), k=args.updates)
+    updates = [
+        (text if rng.random() < 0.95 else f"新话题 {i}", rng.choice(GRADES)) for i, text in enumerate(repeated)
+    ]
+    for text, grade in updates:
+        index.record(text, grade)
+    index.rebuild_now(full=False)
+    incremental = index.last_rebuild_seconds
+    index.rebuild_now(full=True)
+    print(
+        f"after {args.updates} new records: incremental rebuild {incremental:.2f}s, "
+        f"full rebuild {index.last_rebuild_seconds:.2f}s"
+    )
+
+    report("scan", timed(scan, prefixes[:50]))
+    report("suggest", timed(index.suggest, prefixes))
+    report("by grade", timed(lambda p: index.suggest(p, group="grade-3"), prefixes))
+
+
+if __name__ == "__main__":
+    main()
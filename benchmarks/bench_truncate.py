@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志截断引擎微基准
+对比旧版递归实现与 ContentTruncator 在不同负载大小下的单次耗时，
+新实现的耗时应随预算而不是负载大小增长
+
+运行: python -m benchmarks.bench_truncate
+"""
+
+import json
+import re
+import timeit
+
+from common.log_truncate import ContentTruncator
+
+
+def legacy_truncate(obj, max_length=1000, base64_max_length=100, key_path=""):
+    """旧版 _truncate_large_content，仅用于对比"""
+    sensitive_keys = [
+        "image",
+        "base64",
+        "file",
+        "content",
+        "body",
+        "data",
+        "password",
+        "token",
+    ]
+    base64_pattern = re.compile(r"^[A-Za-z0-9+/]{50,}={0,2}$")
+    is_sensitive = any(key in key_path.lower() for key in sensitive_keys)
+    effective_max_length = base64_max_length if is_sensitive else max_length
+
+    if isinstance(obj, dict):
+        return {
+            key: legacy_truncate(
+                value,
+                max_length,
+                base64_max_length,
+                f"{key_path}.{key}" if key_path else key,
+            )
+            for key, value in obj.items()
+        }
+    elif isinstance(obj, list):
+        return [
+            legacy_truncate(item, max_length, base64_max_length, key_path)
+            for item in obj
+        ]
+    elif isinstance(obj, str):
+        if base64_pattern.match(obj) and len(obj) > base64_max_length:
+            return f"{obj[:base64_max_length]}... [截断,总长度:{len(obj)}字节]"
+        elif obj.strip().startswith("{") and obj.strip().endswith("}"):
+            try:
+                json_obj = json.loads(obj)
+                if isinstance(json_obj, dict) and len(obj) > effective_max_length:
+                    return json.dumps(
+                        legacy_truncate(json_obj, max_length, base64_max_length)
+                    )
+            except Exception:
+                pass
+        if len(obj) > effective_max_length:
+            return f"{obj[:effective_max_length]}... [截断,总长度:{len(obj)}字符]"
+        return obj
+    return obj
+
+
+def build_payload(n_records: int) -> dict:
+    """构造近似真实请求日志的负载：记录列表 + base64 图片 + 内嵌 JSON 字符串"""
+    records = [
+        {
+            "id": i,
+            "search_content": f"query {i}",
+            "search_results_id_list": list(range(20)),
+        }
+        for i in range(n_records)
+    ]
+    return {
+        "user": {"id": 1, "device": "ios"},
+        "image": "QUJD" * (n_records * 10),
+        "records": records,
+        "raw": json.dumps({"records": records[: n_records // 10]}),
+    }
+
+
+def bench(func, payload, number: int) -> float:
+    """返回单次调用耗时（微秒）"""
+    return timeit.timeit(lambda: func(payload), number=number) / number * 1e6
+
+
+def main():
+    truncator = ContentTruncator()
+    print(f"{'records':>8} │ {'payload(B)':>11} │ {'legacy(µs)':>11} │ {'engine(µs)':>11}")
+    for n_records in (10, 100, 1000, 10000):
+        payload = build_payload(n_records)
+        size = len(json.dumps(payload))
+        number = max(3, 20000 // n_records)
+        legacy = bench(legacy_truncate, payload, number)
+        engine = bench(truncator.truncate, payload, number)
+        print(f"{n_records:>8} │ {size:>11} │ {legacy:>11.1f} │ {engine:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
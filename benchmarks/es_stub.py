@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Elasticsearch _bulk 接口桩
+本地 aiohttp 服务，解析 NDJSON 并按条目返回结果，可模拟请求延迟与按比例返回 429，
+用于在没有 Elasticsearch 的环境下测试与压测批量写入（需安装 elasticsearch[async]）
+"""
+
+import asyncio
+import json
+import random
+from typing import Dict, Optional
+
+from aiohttp import web
+
+HEADERS = {"X-Elastic-Product": "Elasticsearch"}
+
+
+class EsStub:
+    """Args:
+    latency: 每个 _bulk 请求的模拟处理时间（秒）
+    reject_rate: 每个条目返回 429 的概率
+    seed: 随机种子
+    """
+
+    def __init__(self, latency: float = 0.0, reject_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.reject_rate = reject_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.items = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.documents: Dict[str, bytes] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def _info(self, request: web.Request) -> web.Response:
+        body = {"name": "stub", "version": {"number": "8.15.0", "build_flavor": "default"}}
+        return web.json_response(body, headers=HEADERS)
+
+    async def _bulk(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            lines = [line for line in (await request.read()).split(b"\n") if line]
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            items, errors = [], False
+            for action_line, source in zip(lines[::2], lines[1::2]):
+                op_type, meta = next(iter(json.loads(action_line).items()))
+                self.items += 1
+                if self.reject_rate and self.random.random() < self.reject_rate:
+                    self.rejected += 1
+                    errors = True
+                    result = {"status": 429, "error": {"type": "es_rejected_execution_exception"}}
+                else:
+                    doc_id = meta.get("_id") or str(self.items)
+                    self.documents[doc_id] = source
+                    result = {"_id": doc_id, "status": 201, "result": "created"}
+                items.append({op_type: {"_index": meta.get("_index"), **result}})
+            return web.json_response(
+                {"took": int(self.latency * 1000), "errors": errors, "items": items}, headers=HEADERS
+            )
+        finally:
+            self.in_flight -= 1
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application(client_max_size=100 * 1024 * 1024)
+        app.router.add_get("/", self._info)
+        for method in ("POST", "PUT"):
+            app.router.add_route(method, "/_bulk", self._bulk)
+            app.router.add_route(method, "/{index}/_bulk", self._bulk)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
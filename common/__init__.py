@@ -1 +1,7 @@
-from .log import Log
+def __getattr__(name: str):
+    # 延迟导入日志模块，只用到 common 下其它工具模块时不初始化日志系统
+    if name == "Log":
+        from .log import Log
+
+        return Log
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
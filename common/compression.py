@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应压缩中间件
+纯 ASGI 实现，按 Accept-Encoding 协商 br / zstd / gzip（br、zstd 需安装 brotli、zstandard），
+小于阈值的响应、非文本类型和已编码的响应原样返回；流式响应逐块压缩并立即刷出，不缓存整个响应体。
+压缩级别可按路由前缀单独配置，也可对某些路由关闭压缩
+"""
+
+import zlib
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# 服务端偏好顺序
+PREFERRED_ENCODINGS: Tuple[str, ...] = ("br", "zstd", "gzip")
+
+DEFAULT_LEVELS: Dict[str, int] = {"gzip": 6, "br": 4, "zstd": 3}
+
+# 值得压缩的内容类型，其它类型（图片、压缩包等）直接透传
+COMPRESSIBLE_TYPES: FrozenSet[str] = frozenset(
+    {
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "application/x-ndjson",
+        "image/svg+xml",
+    }
+)
+
+
+def parse_accept_encoding(header: Optional[str]) -> FrozenSet[str]:
+    """解析 Accept-Encoding，返回可接受（q>0）的编码"""
+    if not header:
+        return frozenset()
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(token.strip().lower())
+    return frozenset(accepted)
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """当前环境支持的编码（按偏好排序）"""
+    return tuple(
+        encoding
+        for encoding in PREFERRED_ENCODINGS
+        if encoding == "gzip"
+        or (encoding == "br" and BROTLI_AVAILABLE)
+        or (encoding == "zstd" and ZSTD_AVAILABLE)
+    )
+
+
+def encoded_etag(etag: bytes, encoding: str) -> bytes:
+    """压缩后的表示字节不同，强 ETag 加上编码后缀（如 "abc" -> "abc-gzip"）区分各个变体；弱 ETag 不变"""
+    if etag.startswith(b"W/") or not etag.endswith(b'"'):
+        return etag
+    return etag[:-1] + b"-" + encoding.encode("latin-1") + b'"'
+
+
+def strip_etag_encoding(etag: str) -> str:
+    """去掉 encoded_etag 加上的编码后缀，得到原始表示的 ETag"""
+    for encoding in PREFERRED_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith(("+json", "+xml"))
+    )
+
+
+class StreamCompressor:
+    """逐块压缩，每块都做同步刷新，客户端可以立即解码已收到的数据"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = self._compressor
+        if self.encoding == "gzip":
+            return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return compressor.process(data) + compressor.flush()
+        return compressor.compress(data) + compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self, data: bytes = b"") -> bytes:
+        compressor = self._compressor
+        if self.encoding == "gzip":
+            return compressor.compress(data) + compressor.flush(zlib.Z_FINISH)
+        if self.encoding == "br":
+            return compressor.process(data) + compressor.finish()
+        return compressor.compress(data) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """响应压缩中间件
+
+    Args:
+        app: ASGI 应用
+        minimum_size: 小于该字节数的响应不压缩
+        levels: 各编码的默认压缩级别
+        route_levels: 按路由前缀覆盖压缩级别，值为 None 表示该前缀下不压缩，
+            如 {"/api/v1": {"gzip": 5, "br": 5}, "/metrics": None}
+        encodings: 启用的编码（按偏好排序），默认为当前环境支持的全部编码
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        levels: Optional[Dict[str, int]] = None,
+        route_levels: Optional[Dict[str, Optional[Dict[str, int]]]] = None,
+        encodings: Optional[Iterable[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        supported = available_encodings()
+        self.encodings = tuple(
+            encoding for encoding in (encodings or supported) if encoding in supported
+        )
+        # 最长前缀优先
+        self.route_levels = sorted(
+            (
+                (prefix, None if value is None else {**self.levels, **value})
+                for prefix, value in (route_levels or {}).items()
+            ),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+
+    def _select_encoding(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accepted = parse_accept_encoding(value.decode("latin-1"))
+                return next((enc for enc in self.encodings if enc in accepted), None)
+        return None
+
+    def _levels_for(self, scope) -> Optional[Dict[str, int]]:
+        """按路由模板（路由匹配后写入 scope）或原始路径查找压缩级别"""
+        path = getattr(scope.get("route"), "path", None) or scope["path"]
+        for prefix, levels in self.route_levels:
+            if path.startswith(prefix):
+                return levels
+        return self.levels
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._select_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = self._original_if_none_match(scope)
+        if if_none_match is not None:
+            # 原地替换：路由匹配后写入的 route 要留在同一个 scope 上，外层的指标中间件据此取路由标签
+            scope["headers"] = self._strip_if_none_match(scope["headers"])
+
+        start_message = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            message_type = message["type"]
+
+            if message_type == "http.response.start":
+                start_message = message
+                headers = message.get("headers", [])
+                content_type = content_length = None
+                for name, value in headers:
+                    if name == b"content-encoding":
+                        passthrough = True
+                    elif name == b"content-type":
+                        content_type = value.decode("latin-1")
+                    elif name == b"content-length":
+                        content_length = int(value)
+                if message["status"] == 304 and not passthrough:
+                    # 304 沿用客户端所持变体的 ETag，与压缩的 200 保持一致
+                    message = dict(message, headers=self._not_modified_headers(if_none_match, headers, encoding))
+                if (
+                    passthrough
+                    or message["status"] in (204, 304)
+                    or not content_type
+                    or not is_compressible(content_type)
+                    or (content_length is not None and content_length < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(message)
+                # 其余情况等第一个 body 块到达后再决定
+                return
+
+            if message_type != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                levels = self._levels_for(scope)
+                if levels is None or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = StreamCompressor(encoding, levels[encoding])
+                await send(
+                    dict(start_message, headers=self._compressed_headers(start_message, encoding))
+                )
+
+            if more_body:
+                chunk = compressor.compress(body) if body else b""
+            else:
+                chunk = compressor.finish(body)
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _original_if_none_match(scope) -> Optional[bytes]:
+        return next((value for name, value in scope["headers"] if name == b"if-none-match"), None)
+
+    @staticmethod
+    def _strip_if_none_match(headers):
+        """下游（页面缓存、StaticFiles）按原始表示的 ETag 比较，去掉 If-None-Match 中的编码后缀"""
+        rewritten = []
+        for name, value in headers:
+            if name == b"if-none-match":
+                value = ", ".join(
+                    strip_etag_encoding(candidate.strip()) for candidate in value.decode("latin-1").split(",")
+                ).encode("latin-1")
+            rewritten.append((name, value))
+        return rewritten
+
+    @staticmethod
+    def _not_modified_headers(if_none_match: Optional[bytes], headers, encoding: str):
+        """If-None-Match 中带有本编码变体的 ETag 时，304 返回该变体的 ETag"""
+        candidates = {candidate.strip() for candidate in (if_none_match or b"").split(b",")}
+        rewritten = []
+        for name, value in headers:
+            if name == b"etag":
+                encoded = encoded_etag(value, encoding)
+                if encoded in candidates:
+                    value = encoded
+            rewritten.append((name, value))
+        return rewritten
+
+    @staticmethod
+    def _compressed_headers(start_message, encoding: str):
+        headers = [(b"content-encoding", encoding.encode("latin-1"))]
+        vary = None
+        for name, value in start_message.get("headers", []):
+            if name == b"content-length":
+                continue
+            if name == b"etag":
+                value = encoded_etag(value, encoding)
+            if name == b"vary":
+                vary = value
+                continue
+            headers.append((name, value))
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif b"accept-encoding" not in vary.lower():
+            vary = vary + b", Accept-Encoding"
+        headers.append((b"vary", vary))
+        return headers
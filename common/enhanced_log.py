@@ -12,16 +12,23 @@ import sys
 import time
 import shutil
 import functools
-import re
+import inspect
 import socket
-import json
 import threading
+import queue
+import atexit
 from datetime import datetime, timedelta, time as dt_time
 from functools import wraps
 from pathlib import Path
 from typing import Any, Callable, TypeVar, Optional, Dict
 from enum import Enum
 
+from .log_archive import LogArchiver
+from .log_sampling import LogSamplingFilter, SamplingPolicy
+from .log_shipper import BatchingSocketHandler
+from .log_truncate import get_truncator
+from .timing import PeriodicDumper, timing_registry
+
 F = TypeVar("F", bound=Callable[..., Any])
 
 # 尝试导入多进程安全的日志处理器
@@ -43,52 +50,79 @@ class LogLevel(str, Enum):
     CRITICAL = "CRITICAL"
 
 
+class QueueOverflowPolicy(str, Enum):
+    """日志队列溢出策略"""
+
+    BLOCK = "block"  # 队列满时阻塞调用方，直到监听线程腾出空间
+    DROP_OLDEST = "drop_oldest"  # 丢弃队列中最旧的记录，为新记录腾出空间
+    DROP_DEBUG = "drop_debug"  # 丢弃低级别记录（<= drop_level），高级别记录阻塞等待
+
+
 def _truncate_large_content(obj, max_length=1000, base64_max_length=100, key_path=""):
     """截断日志中的大型内容，特别是base64编码的内容"""
-    sensitive_keys = [
-        "image",
-        "base64",
-        "file",
-        "content",
-        "body",
-        "data",
-        "password",
-        "token",
-    ]
-    base64_pattern = re.compile(r"^[A-Za-z0-9+/]{50,}={0,2}$")
-    is_sensitive = any(key in key_path.lower() for key in sensitive_keys)
-    effective_max_length = base64_max_length if is_sensitive else max_length
-
-    if isinstance(obj, dict):
-        result = {}
-        for key, value in obj.items():
-            new_key_path = f"{key_path}.{key}" if key_path else key
-            result[key] = _truncate_large_content(
-                value, max_length, base64_max_length, new_key_path
-            )
-        return result
-    elif isinstance(obj, list):
-        return [
-            _truncate_large_content(item, max_length, base64_max_length, key_path)
-            for item in obj
-        ]
-    elif isinstance(obj, str):
-        if base64_pattern.match(obj) and len(obj) > base64_max_length:
-            return f"{obj[:base64_max_length]}... [截断,总长度:{len(obj)}字节]"
-        elif obj.strip().startswith("{") and obj.strip().endswith("}"):
-            try:
-                json_obj = json.loads(obj)
-                if isinstance(json_obj, dict) and len(obj) > effective_max_length:
-                    return json.dumps(
-                        _truncate_large_content(json_obj, max_length, base64_max_length)
-                    )
-            except:
-                pass
-        if len(obj) > effective_max_length:
-            return f"{obj[:effective_max_length]}... [截断,总长度:{len(obj)}字符]"
-        return obj
-    else:
-        return obj
+    return get_truncator(max_length, base64_max_length).truncate(obj, key_path)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """有界队列处理器 - 调用方只入队，格式化与文件I/O交给监听线程"""
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        overflow: QueueOverflowPolicy = QueueOverflowPolicy.BLOCK,
+        drop_level: int = logging.INFO,
+    ):
+        super().__init__(log_queue)
+        self.overflow = QueueOverflowPolicy(overflow)
+        self.drop_level = drop_level
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 同进程内的监听线程直接消费记录，无需像默认实现那样提前格式化
+        return record
+
+    def enqueue(self, record):
+        """按溢出策略入队"""
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow == QueueOverflowPolicy.DROP_OLDEST:
+            while True:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                try:
+                    self.queue.put_nowait(record)
+                    return
+                except queue.Full:
+                    continue
+        elif (
+            self.overflow == QueueOverflowPolicy.DROP_DEBUG
+            and record.levelno <= self.drop_level
+        ):
+            self.dropped += 1
+            return
+
+        self.queue.put(record)
+
+
+class BlockingQueueListener(logging.handlers.QueueListener):
+    """队列监听器 - 停止时阻塞写入哨兵，保证队列满时也能完整刷新"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
 
 
 class EnhancedLog:
@@ -96,11 +130,60 @@ class EnhancedLog:
 
     dir_name: str = "logs"
     _service_name: str = None
-    _use_socket_handler: bool = False
-    _log_server_host: str = "localhost"
-    _log_server_port: int = 9020
+    # 轮转文件的后台压缩归档（默认关闭；开启后由应用生命周期调用 start_archiver 启动归档线程）
+    _archive_enabled: bool = os.getenv("LOG_ARCHIVE_ENABLED", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    _archive_codec: str = os.getenv("LOG_ARCHIVE_CODEC", "gzip")
+    _archive_max_bytes: int = int(
+        os.getenv("LOG_ARCHIVE_MAX_BYTES", str(1024 * 1024 * 1024))
+    )
+    _archive_max_age_days: float = float(os.getenv("LOG_ARCHIVE_MAX_AGE_DAYS", "30"))
+    _archiver: Optional[LogArchiver] = None
+
+    # Socket投递模式：日志批量发往 common.log_collector，由单一进程写文件
+    _use_socket_handler: bool = os.getenv(
+        "LOG_SOCKET_ENABLED", "false"
+    ).lower() in ("1", "true", "yes")
+    _log_server_host: str = os.getenv("LOG_SERVER_HOST", "localhost")
+    _log_server_port: int = int(os.getenv("LOG_SERVER_PORT", "9020"))
+    _socket_compress: bool = os.getenv("LOG_SOCKET_COMPRESS", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    _socket_handlers: Dict[str, BatchingSocketHandler] = {}
     _loggers: Dict[str, logging.Logger] = {}
 
+    # 共享处理器池：键为目标文件的绝对路径（控制台为 "<stdout>"）
+    _formatter: Optional[logging.Formatter] = None
+    _handler_pool: Dict[str, logging.Handler] = {}
+    _handler_pool_lock = threading.Lock()
+
+    # per-worker 文件模式：每个 worker 写自己的 app.w<id>.log，可用 common.log_merge 合并
+    _per_worker_files: bool = os.getenv("LOG_PER_WORKER_FILES", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+    # 异步队列模式：日志调用只入队，由后台线程完成格式化与写盘
+    _use_queue_handler: bool = os.getenv("LOG_QUEUE_ENABLED", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    _queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    _queue_overflow: str = os.getenv("LOG_QUEUE_OVERFLOW", QueueOverflowPolicy.BLOCK)
+    _queue_drop_level: int = logging.INFO
+    _queue_handlers: Dict[str, BoundedQueueHandler] = {}
+    _queue_listeners: Dict[str, BlockingQueueListener] = {}
+
+    # 采样/限流过滤器，按日志器名称保存
+    _sampling_filters: Dict[str, LogSamplingFilter] = {}
+
     @classmethod
     def get_service_name(cls) -> str:
         """获取服务名称"""
@@ -119,7 +202,14 @@ class EnhancedLog:
     def get_logger(
         cls, module_name: str = None, file_name: str = None, **kwargs
     ) -> logging.Logger:
-        """获取增强的日志记录器"""
+        """获取增强的日志记录器
+
+        可选参数:
+            multiprocess_safe: 是否使用多进程安全的文件处理器
+            sampling: 日志器级别的 SamplingPolicy
+            call_site_sampling: 调用点级别的策略，键为 "文件名:行号" 或函数名
+            sampling_report_interval: 抑制计数的汇总输出间隔（秒）
+        """
         logger_key = f"{module_name or 'default'}_{file_name or 'app'}"
 
         if logger_key not in cls._loggers:
@@ -131,6 +221,14 @@ class EnhancedLog:
 
         logger = cls._loggers[logger_key]
 
+        if "sampling" in kwargs or "call_site_sampling" in kwargs:
+            cls._configure_sampling(
+                logger,
+                kwargs.get("sampling"),
+                kwargs.get("call_site_sampling"),
+                kwargs.get("sampling_report_interval", 60.0),
+            )
+
         # 返回模块适配器
         if module_name:
 
@@ -146,31 +244,135 @@ class EnhancedLog:
 
         return logger
 
+    @classmethod
+    def _configure_sampling(
+        cls,
+        logger: logging.Logger,
+        policy: Optional[SamplingPolicy],
+        call_site_policies: Optional[Dict[str, SamplingPolicy]],
+        report_interval: float,
+    ):
+        """为日志器安装或更新采样过滤器"""
+        sampling_filter = cls._sampling_filters.get(logger.name)
+        if sampling_filter is None:
+            sampling_filter = LogSamplingFilter(
+                logger.name, policy, call_site_policies, report_interval
+            )
+            cls._sampling_filters[logger.name] = sampling_filter
+            logger.addFilter(sampling_filter)
+        else:
+            sampling_filter.report_interval = report_interval
+            sampling_filter.configure(policy, call_site_policies)
+
     @classmethod
     def _create_enhanced_logger(
         cls, name: str, file_name: str, multiprocess_safe: bool
     ) -> logging.Logger:
         """创建增强的日志器"""
-        logging.Formatter.converter = lambda *args: datetime.now().timetuple()
+        # 使用记录的创建时间而非格式化时间，队列/Socket模式下格式化发生在后台线程
+        logging.Formatter.converter = lambda *args: datetime.fromtimestamp(
+            args[-1]
+        ).timetuple()
 
         logger = logging.getLogger(name)
         logger.setLevel(logging.INFO)
         logger.propagate = False
         logger.handlers.clear()
 
-        # 创建格式化器
-        formatter = cls._create_formatter()
+        # 格式化器与处理器在所有日志器之间共享
+        if cls._formatter is None:
+            cls._formatter = cls._create_formatter()
+        formatter = cls._formatter
 
         # 控制台处理器
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        def create_console_handler():
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(formatter)
+            return handler
 
-        # 文件处理器
-        cls._setup_file_handlers(logger, file_name, formatter, multiprocess_safe)
+        logger.addHandler(cls._get_pooled_handler("<stdout>", create_console_handler))
+
+        # 文件处理器（Socket模式下由收集进程统一写文件）
+        if cls._use_socket_handler:
+            cls._setup_socket_handler(logger, file_name, formatter)
+        else:
+            cls._setup_file_handlers(logger, file_name, formatter, multiprocess_safe)
+
+        if cls._use_queue_handler:
+            cls._attach_queue_handler(logger)
 
         return logger
 
+    @classmethod
+    def _attach_queue_handler(cls, logger: logging.Logger):
+        """将日志器的处理器移交给后台监听线程，日志器本身只保留队列处理器"""
+        handlers = list(logger.handlers)
+        logger.handlers.clear()
+
+        log_queue = queue.Queue(maxsize=cls._queue_size)
+        queue_handler = BoundedQueueHandler(
+            log_queue, cls._queue_overflow, cls._queue_drop_level
+        )
+        listener = BlockingQueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        listener.start()
+
+        old_listener = cls._queue_listeners.pop(logger.name, None)
+        if old_listener is not None:
+            old_listener.stop()
+
+        logger.addHandler(queue_handler)
+        cls._queue_handlers[logger.name] = queue_handler
+        cls._queue_listeners[logger.name] = listener
+
+    @classmethod
+    def get_queue_stats(cls) -> Dict[str, Dict[str, int]]:
+        """获取各日志器的队列积压与丢弃统计"""
+        return {
+            name: {
+                "pending": handler.queue.qsize(),
+                "capacity": handler.queue.maxsize,
+                "dropped": handler.dropped,
+            }
+            for name, handler in cls._queue_handlers.items()
+        }
+
+    @classmethod
+    def shutdown(cls):
+        """停止所有监听线程并刷新积压的日志，可重复调用"""
+        for sampling_filter in cls._sampling_filters.values():
+            sampling_filter.flush()
+
+        for name in list(cls._queue_listeners):
+            listener = cls._queue_listeners.pop(name)
+            handler = cls._queue_handlers.pop(name)
+            listener.stop()
+
+            # 停止后降级为同步写入，避免关闭阶段的日志堆积在无人消费的队列中
+            logger = logging.getLogger(name)
+            logger.removeHandler(handler)
+            for target in listener.handlers:
+                logger.addHandler(target)
+
+            if handler.dropped:
+                sys.stderr.write(
+                    f"[EnhancedLog] logger '{name}' dropped {handler.dropped} records\n"
+                )
+
+        if cls._archiver is not None:
+            cls._archiver.stop()
+            cls._archiver = None
+
+        for file_name in list(cls._socket_handlers):
+            socket_handler = cls._socket_handlers.pop(file_name)
+            socket_handler.close()
+            if socket_handler.dropped:
+                sys.stderr.write(
+                    f"[EnhancedLog] socket handler '{file_name}' dropped "
+                    f"{socket_handler.dropped} records\n"
+                )
+
     @classmethod
     def _create_formatter(cls):
         """创建增强的格式化器"""
@@ -210,49 +412,94 @@ class EnhancedLog:
         return CustomFormatter()
 
     @classmethod
-    def _setup_file_handlers(
-        cls, logger: logging.Logger, file_name: str, formatter, multiprocess_safe: bool
-    ):
-        """设置文件处理器"""
-        log_dir = Path(cls.dir_name)
-        log_dir.mkdir(exist_ok=True)
+    def _setup_socket_handler(cls, logger: logging.Logger, file_name: str, formatter):
+        """设置批量Socket处理器，同一目标文件复用一个连接"""
+        socket_handler = cls._socket_handlers.get(file_name)
+        if socket_handler is None:
+            socket_handler = BatchingSocketHandler(
+                cls._log_server_host,
+                cls._log_server_port,
+                file_name,
+                compress=cls._socket_compress,
+            )
+            socket_handler.setFormatter(formatter)
+            cls._socket_handlers[file_name] = socket_handler
+        logger.addHandler(socket_handler)
 
-        # 主日志文件
-        log_file_path = log_dir / file_name
+    @classmethod
+    def get_worker_id(cls) -> str:
+        """获取当前 worker 标识，优先使用 LOG_WORKER_ID（如 worker 序号），否则为进程号"""
+        return os.getenv("LOG_WORKER_ID") or str(os.getpid())
 
-        if multiprocess_safe and CONCURRENT_HANDLER_AVAILABLE:
-            file_handler = ConcurrentRotatingFileHandler(
-                str(log_file_path),
-                maxBytes=10 * 1024 * 1024,
-                backupCount=30,
-                encoding="utf-8",
-            )
-        else:
-            file_handler = logging.handlers.TimedRotatingFileHandler(
-                str(log_file_path),
-                when="midnight",
-                interval=1,
-                backupCount=30,
-                encoding="utf-8",
-                atTime=dt_time(0, 0, 0),
+    @classmethod
+    def _resolve_file_name(cls, file_name: str) -> str:
+        """按命名模式解析实际写入的文件名，per-worker 模式下 app.log -> app.w<id>.log"""
+        if not cls._per_worker_files:
+            return file_name
+        stem, dot, suffix = file_name.rpartition(".")
+        if not dot:
+            return f"{file_name}.w{cls.get_worker_id()}"
+        return f"{stem}.w{cls.get_worker_id()}.{suffix}"
+
+    @classmethod
+    def _get_pooled_handler(
+        cls, key: str, factory: Callable[[], logging.Handler]
+    ) -> logging.Handler:
+        """按目标获取共享处理器，同一文件只打开一次、只轮转一次"""
+        with cls._handler_pool_lock:
+            handler = cls._handler_pool.get(key)
+            if handler is None:
+                handler = factory()
+                cls._handler_pool[key] = handler
+            return handler
+
+    @classmethod
+    def get_archiver(cls) -> Optional[LogArchiver]:
+        """获取日志归档器（不启动线程），未启用归档时返回 None
+
+        创建 logger 时只挂上 rotator；脚本、基准测试等进程不会因此启动归档线程，
+        轮转出的文件留给下一个调用 start_archiver 的进程处理
+        """
+        if not cls._archive_enabled:
+            return None
+        if cls._archiver is None:
+            cls._archiver = LogArchiver(
+                cls.dir_name,
+                codec=cls._archive_codec,
+                max_total_bytes=cls._archive_max_bytes,
+                max_age_days=cls._archive_max_age_days,
             )
+        return cls._archiver
 
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+    @classmethod
+    def start_archiver(cls) -> Optional[LogArchiver]:
+        """启动归档线程并立即扫描一次已轮转的文件，由应用生命周期调用"""
+        archiver = cls.get_archiver()
+        if archiver is not None:
+            archiver.start()
+            archiver.notify()
+        return archiver
 
-        # 错误日志文件
-        error_file_path = log_dir / f"{file_name.replace('.log', '_error.log')}"
+    @classmethod
+    def get_archive_stats(cls) -> Optional[Dict[str, Any]]:
+        """获取归档统计"""
+        return cls._archiver.stats() if cls._archiver is not None else None
 
+    @classmethod
+    def _create_file_handler(
+        cls, file_path: Path, multiprocess_safe: bool
+    ) -> logging.Handler:
+        """创建文件处理器"""
         if multiprocess_safe and CONCURRENT_HANDLER_AVAILABLE:
-            error_handler = ConcurrentRotatingFileHandler(
-                str(error_file_path),
+            handler = ConcurrentRotatingFileHandler(
+                str(file_path),
                 maxBytes=10 * 1024 * 1024,
                 backupCount=30,
                 encoding="utf-8",
             )
         else:
-            error_handler = logging.handlers.TimedRotatingFileHandler(
-                str(error_file_path),
+            handler = logging.handlers.TimedRotatingFileHandler(
+                str(file_path),
                 when="midnight",
                 interval=1,
                 backupCount=30,
@@ -260,26 +507,148 @@ class EnhancedLog:
                 atTime=dt_time(0, 0, 0),
             )
 
-        error_handler.setLevel(logging.ERROR)
-        error_handler.setFormatter(formatter)
-        logger.addHandler(error_handler)
+        # 轮转时只唤醒归档线程，压缩在后台完成
+        archiver = cls.get_archiver()
+        if archiver is not None:
+            handler.rotator = archiver.rotator
+        return handler
+
+    @classmethod
+    def _setup_file_handlers(
+        cls, logger: logging.Logger, file_name: str, formatter, multiprocess_safe: bool
+    ):
+        """设置文件处理器"""
+        log_dir = Path(cls.dir_name)
+        log_dir.mkdir(exist_ok=True)
+
+        # 每个 worker 独占自己的文件时无需跨进程加锁
+        if cls._per_worker_files:
+            multiprocess_safe = False
+
+        # 主日志文件
+        log_file_path = log_dir / cls._resolve_file_name(file_name)
+
+        def create_file_handler():
+            handler = cls._create_file_handler(log_file_path, multiprocess_safe)
+            handler.setFormatter(formatter)
+            return handler
+
+        logger.addHandler(
+            cls._get_pooled_handler(str(log_file_path.resolve()), create_file_handler)
+        )
+
+        # 错误日志文件
+        error_file_path = log_dir / cls._resolve_file_name(
+            file_name.replace(".log", "_error.log")
+        )
+
+        def create_error_handler():
+            handler = cls._create_file_handler(error_file_path, multiprocess_safe)
+            handler.setLevel(logging.ERROR)
+            handler.setFormatter(formatter)
+            return handler
+
+        logger.addHandler(
+            cls._get_pooled_handler(
+                str(error_file_path.resolve()), create_error_handler
+            )
+        )
 
 
 # 向后兼容的Log类
 Log = EnhancedLog
 
+# 进程退出时刷新队列中尚未写出的日志
+atexit.register(EnhancedLog.shutdown)
 
-def log_time(logger: logging.Logger) -> Callable[[F], F]:
-    """执行时间装饰器"""
+
+def log_time(
+    logger: Optional[logging.Logger] = None,
+    name: Optional[str] = None,
+    dump_interval: float = 60.0,
+) -> Callable[[F], F]:
+    """执行时间装饰器
+
+    支持普通函数、协程、生成器与异步生成器，耗时以 perf_counter_ns 计量并按函数聚合到
+    timing_registry，不再逐次写日志。传入 logger 时每隔 dump_interval 秒输出一次汇总；
+    生成器统计从首次迭代到迭代结束的总时长
+
+    Args:
+        logger: 输出周期汇总的日志器，None 表示只聚合（可通过 /metrics 查看）
+        name: 统计名称，默认为 模块.函数限定名
+        dump_interval: 汇总输出间隔（秒）
+    """
 
     def decorator(func: F) -> F:
+        stats = timing_registry.get(name or f"{func.__module__}.{func.__qualname__}")
+        dumper = PeriodicDumper(dump_interval) if logger is not None else None
+
+        def finish(start: int, failed: bool):
+            stats.record(time.perf_counter_ns() - start, failed)
+            if dumper is not None and dumper.due():
+                summary = stats.snapshot()
+                logger.info(
+                    f"{stats.name} 执行时间: count={summary['count']} "
+                    f"avg={summary['avg_ms']:.2f}ms p50={summary['p50_ms']:.2f}ms "
+                    f"p99={summary['p99_ms']:.2f}ms max={summary['max_ms']:.2f}ms "
+                    f"errors={summary['errors']}"
+                )
+
+        if inspect.isasyncgenfunction(func):
+
+            @wraps(func)
+            async def async_gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter_ns()
+                failed = True
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    failed = False
+                finally:
+                    finish(start, failed)
+
+            return async_gen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter_ns()
+                failed = True
+                try:
+                    result = await func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    finish(start, failed)
+
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(func):
+
+            @wraps(func)
+            def gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter_ns()
+                failed = True
+                try:
+                    result = yield from func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    finish(start, failed)
+
+            return gen_wrapper
+
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
-            start_time = time.time()
-            result = func(*args, **kwargs)
-            elapsed_time = (time.time() - start_time) * 1000
-            logger.debug(f"{func.__name__} 执行时间: {elapsed_time:.2f} ms")
-            return result
+            start = time.perf_counter_ns()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                finish(start, failed)
 
         return wrapper
 
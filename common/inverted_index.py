@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内倒排索引
+对一个全文字段分词建立倒排表并按 BM25 打分，另可把若干 keyword 字段建为精确匹配的过滤词项
+（数组的每个元素各为一个词项，数值字段按数值匹配）。
+倒排表按文档号递增追加，文档号差值与词频以 varint 编码存放在 bytearray 中；
+删除只做标记（查询时跳过），删除比例较高时 compact 重写倒排表。
+高频词项的解码结果按 LRU 缓存。快照以单文件保存，加载时 mmap 映射，倒排表与文档原文直接引用映射内存，不做复制
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from pydantic_core import to_json
+
+SNAPSHOT_MAGIC = b"IIDX\x01"
+# 英文/数字按词切分，CJK 字符按相邻两字（bigram）切分，单字成段时保留单字
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_TOKEN_PATTERN = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+_CJK_PATTERN = re.compile(f"[{_CJK}]")
+# 文档频率达到该值的倒排表缓存解码结果
+DECODE_CACHE_MIN_DF = 256
+# keyword 字段的词项前缀，与全文词项分开
+_KEYWORD_SEPARATOR = "\x00"
+
+Postings = Union[bytearray, memoryview]
+
+
+def _keyword_values(value: Any, numeric: bool = False) -> List[str]:
+    """keyword 字段取值对应的词项：数组展开为各元素，布尔值为 true / false，
+    数值字段取数值的规范形式（1、1.0、"1" 为同一词项），与 Elasticsearch 的精确匹配一致"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [term for item in value for term in _keyword_values(item, numeric)]
+    if isinstance(value, bool):
+        return ["true" if value else "false"]
+    if numeric and not isinstance(value, int):
+        try:
+            number = int(value) if isinstance(value, str) else value
+        except ValueError:
+            try:
+                number = float(value)
+            except ValueError:
+                return [str(value)]
+        if isinstance(number, float) and number.is_integer():
+            number = int(number)
+        return [str(number) if isinstance(number, int) else repr(float(number))]
+    return [str(value)]
+
+
+def tokenize(text: str) -> List[str]:
+    """NFKC + 大小写折叠后切分：英文/数字为整词，中日韩文为相邻两字"""
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if _CJK_PATTERN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _encode_varint(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_postings(data: Postings) -> Iterator[Tuple[int, int]]:
+    """解码倒排表，依次产出 (文档号, 词频)"""
+    doc = 0
+    value = shift = 0
+    first = True
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if first:
+            doc += value
+            first = False
+        else:
+            yield doc, value
+            first = True
+        value = shift = 0
+
+
+class InvertedIndex:
+    """倒排索引
+
+    Args:
+        text_field: 分词并按 BM25 打分的字段
+        keyword_fields: 精确匹配过滤的字段（不分词，不参与打分）
+        k1: BM25 词频饱和参数
+        b: BM25 文档长度归一化参数
+        decode_cache_size: 缓存解码结果的（高频）词项数，按 LRU 淘汰
+        numeric_fields: keyword_fields 中按数值匹配的字段
+    """
+
+    def __init__(
+        self,
+        text_field: str,
+        keyword_fields: Sequence[str] = (),
+        k1: float = 1.2,
+        b: float = 0.75,
+        decode_cache_size: int = 4096,
+        numeric_fields: Sequence[str] = (),
+    ):
+        self.text_field = text_field
+        self.keyword_fields = tuple(keyword_fields)
+        self.numeric_fields = frozenset(numeric_fields)
+        self.k1 = k1
+        self.b = b
+        self.decode_cache_size = decode_cache_size
+
+        # 词项 -> 倒排表 / 文档频率 / 最后一个文档号（追加时计算差值）
+        self._postings: Dict[str, Postings] = {}
+        self._df: Dict[str, int] = {}
+        self._last: Dict[str, int] = {}
+        # 文档号 -> 外部 id / 全文字段词数 / 原文 JSON
+        self._ids: List[Optional[str]] = []
+        self._lengths = array("I")
+        self._sources: List[Union[bytes, memoryview, None]] = []
+        self._docnos: Dict[str, int] = {}
+        self._deleted: Set[int] = set()
+        self._total_length = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._decoded_cache: "OrderedDict[str, Tuple[array, array]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._docnos)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docnos
+
+    # ------------------------------------------------------------------ 写入
+
+    def _append(self, term: str, docno: int, freq: int):
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = self._postings[term] = bytearray()
+        elif not isinstance(postings, bytearray):
+            # 快照中的只读倒排表，首次修改时复制
+            postings = self._postings[term] = bytearray(postings)
+        self._decoded_cache.pop(term, None)
+        _encode_varint(docno - self._last.get(term, 0), postings)
+        _encode_varint(freq, postings)
+        self._last[term] = docno
+        self._df[term] = self._df.get(term, 0) + 1
+
+    def add(self, doc_id: str, document: Mapping[str, Any]):
+        """添加文档，id 已存在时替换"""
+        doc_id = str(doc_id)
+        if doc_id in self._docnos:
+            self.delete(doc_id)
+        docno = len(self._ids)
+        tokens = tokenize(str(document.get(self.text_field) or ""))
+        for term, freq in Counter(tokens).items():
+            self._append(term, docno, freq)
+        for name in self.keyword_fields:
+            values = _keyword_values(document.get(name), name in self.numeric_fields)
+            for value in dict.fromkeys(values):
+                self._append(f"{name}{_KEYWORD_SEPARATOR}{value}", docno, 1)
+
+        self._ids.append(doc_id)
+        self._lengths.append(len(tokens))
+        self._sources.append(to_json(document))
+        self._docnos[doc_id] = docno
+        self._total_length += len(tokens)
+
+    def add_many(self, documents: Iterable[Tuple[str, Mapping[str, Any]]]):
+        for doc_id, document in documents:
+            self.add(doc_id, document)
+
+    def delete(self, doc_id: str) -> bool:
+        """标记删除，返回文档是否存在"""
+        docno = self._docnos.pop(str(doc_id), None)
+        if docno is None:
+            return False
+        self._deleted.add(docno)
+        self._total_length -= self._lengths[docno]
+        self._sources[docno] = None
+        return True
+
+    def compact(self):
+        """重写倒排表，去掉已删除文档并重新编号"""
+        if not self._deleted:
+            return
+        remap: Dict[int, int] = {}
+        ids: List[Optional[str]] = []
+        lengths = array("I")
+        sources: List[Union[bytes, memoryview, None]] = []
+        for docno, doc_id in enumerate(self._ids):
+            if docno in self._deleted:
+                continue
+            remap[docno] = len(ids)
+            ids.append(doc_id)
+            lengths.append(self._lengths[docno])
+            sources.append(self._sources[docno])
+
+        postings, df, last = {}, {}, {}
+        for term, data in self._postings.items():
+            out = bytearray()
+            previous = 0
+            count = 0
+            for docno, freq in decode_postings(data):
+                new = remap.get(docno)
+                if new is None:
+                    continue
+                _encode_varint(new - previous, out)
+                _encode_varint(freq, out)
+                previous = new
+                count += 1
+            if count:
+                postings[term], df[term], last[term] = out, count, previous
+
+        self._postings, self._df, self._last = postings, df, last
+        self._ids, self._lengths, self._sources = ids, lengths, sources
+        self._docnos = {doc_id: docno for docno, doc_id in enumerate(ids)}
+        self._deleted = set()
+        self._decoded_cache.clear()
+
+    # ------------------------------------------------------------------ 查询
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        docno = self._docnos.get(str(doc_id))
+        return None if docno is None else self._source(docno)
+
+    def _source(self, docno: int) -> Dict[str, Any]:
+        return json.loads(bytes(self._sources[docno]))
+
+    def _idf(self, term: str) -> float:
+        df = self._df.get(term, 0)
+        n = len(self._ids)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _decoded(self, term: str) -> Tuple[array, array]:
+        """解码后的 (文档号数组, 词频数组)，较长的倒排表缓存解码结果（词项被追加时失效）"""
+        cached = self._decoded_cache.get(term)
+        if cached is not None:
+            self._decoded_cache.move_to_end(term)
+            return cached
+        docs, freqs = array("I"), array("I")
+        for docno, freq in decode_postings(self._postings[term]):
+            docs.append(docno)
+            freqs.append(freq)
+        if len(docs) >= DECODE_CACHE_MIN_DF:
+            self._decoded_cache[term] = (docs, freqs)
+            if len(self._decoded_cache) > self.decode_cache_size:
+                self._decoded_cache.popitem(last=False)
+        return docs, freqs
+
+    def _filter_docs(self, filters: Mapping[str, Any]) -> Optional[Set[int]]:
+        allowed: Optional[Set[int]] = None
+        for name, value in filters.items():
+            if value is None:
+                continue
+            # 取值为数组时匹配其中任一个
+            docs: Set[int] = set()
+            for term in _keyword_values(value, name in self.numeric_fields):
+                term = f"{name}{_KEYWORD_SEPARATOR}{term}"
+                if term in self._postings:
+                    docs.update(self._decoded(term)[0])
+            allowed = docs if allowed is None else allowed & docs
+        return allowed
+
+    def search(
+        self,
+        query: str,
+        filters: Optional[Mapping[str, Any]] = None,
+        size: int = 10,
+        operator: str = "or",
+    ) -> Tuple[int, List[Tuple[str, float]]]:
+        """BM25 检索，返回 (命中总数, [(id, 分数)])
+
+        Args:
+            query: 查询文本，与文档使用相同的分词
+            filters: keyword 字段的精确匹配条件
+            size: 返回条数
+            operator: or 匹配任一词项；and 要求包含全部词项
+        """
+        allowed = self._filter_docs(filters or {})
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            # 无查询词：只按过滤条件匹配（分数为 0），与 match_all 一致
+            docs = allowed if allowed is not None else range(len(self._ids))
+            live = [docno for docno in docs if docno not in self._deleted]
+            return len(live), [(self._ids[docno], 0.0) for docno in sorted(live)[:size]]
+
+        if operator == "and" and any(term not in self._postings for term in terms):
+            return 0, []
+        # 文档频率低的词项在前，and 查询时候选集尽早缩小
+        terms.sort(key=lambda term: self._df.get(term, 0))
+        avgdl = self._total_length / len(self._docnos) if self._total_length else 1.0
+        k1, b = self.k1, self.b
+        lengths = self._lengths
+        deleted = self._deleted
+
+        scores: Dict[int, float] = {}
+        for index, term in enumerate(terms):
+            if term not in self._postings:
+                continue
+            idf = self._idf(term)
+            docs, freqs = self._decoded(term)
+            if operator == "and" and index > 0:
+                # 候选集已经很小：在有序的文档号数组上二分查找，不遍历整个倒排表
+                matched: Dict[int, float] = {}
+                for docno, score in scores.items():
+                    position = bisect_left(docs, docno)
+                    if position < len(docs) and docs[position] == docno:
+                        freq = freqs[position]
+                        norm = k1 * (1 - b + b * lengths[docno] / avgdl)
+                        matched[docno] = score + idf * freq * (k1 + 1) / (freq + norm)
+                scores = matched
+                if not scores:
+                    return 0, []
+                continue
+            for docno, freq in zip(docs, freqs):
+                if docno in deleted or (allowed is not None and docno not in allowed):
+                    continue
+                norm = k1 * (1 - b + b * lengths[docno] / avgdl)
+                scores[docno] = scores.get(docno, 0.0) + idf * freq * (k1 + 1) / (freq + norm)
+
+        top = heapq.nlargest(size, scores.items(), key=lambda item: (item[1], -item[0]))
+        return len(scores), [(self._ids[docno], score) for docno, score in top]
+
+    def search_documents(
+        self,
+        query: str,
+        filters: Optional[Mapping[str, Any]] = None,
+        size: int = 10,
+        operator: str = "or",
+    ) -> Tuple[int, List[Tuple[str, float, Dict[str, Any]]]]:
+        """同 search，同时返回文档原文"""
+        total, hits = self.search(query, filters, size, operator)
+        return total, [(doc_id, score, self.get(doc_id)) for doc_id, score in hits]
+
+    # ------------------------------------------------------------------ 快照
+
+    def memory_usage(self) -> Dict[str, int]:
+        """倒排表、原文与文档号表占用的字节数（不含 Python 对象开销）"""
+        return {
+            "postings": sum(len(data) for data in self._postings.values()),
+            "sources": sum(len(source) for source in self._sources if source is not None),
+            "lengths": len(self._lengths) * self._lengths.itemsize,
+            "terms": len(self._postings),
+            "documents": len(self._docnos),
+        }
+
+    def save(self, path: str):
+        """保存快照（先压缩再写临时文件后替换，已 mmap 的旧快照不受影响）"""
+        self.compact()
+        terms: Dict[str, List[int]] = {}
+        postings_blob = bytearray()
+        for term, data in self._postings.items():
+            terms[term] = [len(postings_blob), len(data), self._df[term], self._last[term]]
+            postings_blob += data
+        source_offsets = array("Q", [0])
+        sources_blob = bytearray()
+        for source in self._sources:
+            sources_blob += source
+            source_offsets.append(len(sources_blob))
+
+        header = to_json(
+            {
+                "text_field": self.text_field,
+                "keyword_fields": list(self.keyword_fields),
+                "numeric_fields": sorted(self.numeric_fields),
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self._ids,
+                "terms": terms,
+                "sections": [
+                    len(self._lengths) * self._lengths.itemsize,
+                    len(source_offsets) * source_offsets.itemsize,
+                    len(sources_blob),
+                    len(postings_blob),
+                ],
+            }
+        )
+        temp = f"{path}.tmp"
+        with open(temp, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.write(self._lengths.tobytes())
+            f.write(source_offsets.tobytes())
+            f.write(sources_blob)
+            f.write(postings_blob)
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "InvertedIndex":
+        """mmap 方式加载快照，倒排表与原文在首次修改前直接引用映射内存"""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        if bytes(view[: len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise ValueError(f"不是倒排索引快照: {path}")
+        offset = len(SNAPSHOT_MAGIC)
+        (header_length,) = struct.unpack_from("<Q", view, offset)
+        offset += 8
+        header = json.loads(bytes(view[offset : offset + header_length]))
+        offset += header_length
+
+        index = cls(
+            header["text_field"],
+            header["keyword_fields"],
+            header["k1"],
+            header["b"],
+            numeric_fields=header.get("numeric_fields", ()),
+        )
+        lengths_size, offsets_size, sources_size, postings_size = header["sections"]
+        index._lengths.frombytes(view[offset : offset + lengths_size])
+        offset += lengths_size
+        source_offsets = array("Q")
+        source_offsets.frombytes(view[offset : offset + offsets_size])
+        offset += offsets_size
+        sources = view[offset : offset + sources_size]
+        offset += sources_size
+        postings = view[offset : offset + postings_size]
+
+        index._ids = header["ids"]
+        index._docnos = {doc_id: docno for docno, doc_id in enumerate(index._ids)}
+        index._sources = [
+            sources[source_offsets[i] : source_offsets[i + 1]] for i in range(len(index._ids))
+        ]
+        for term, (start, length, df, last) in header["terms"].items():
+            index._postings[term] = postings[start : start + length]
+            index._df[term] = df
+            index._last[term] = last
+        index._total_length = sum(index._lengths)
+        index._mmap = mapped
+        return index
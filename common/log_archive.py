@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志归档
+后台线程扫描日志目录中已轮转的文件，压缩（gzip，安装 zstandard 时可选 zstd）后移入归档目录，
+并按总大小和保存天数清理旧归档。轮转时只唤醒归档线程，压缩与磁盘I/O不会发生在日志调用路径上
+"""
+
+import gzip
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# 已轮转文件: app.log.2025-01-01（TimedRotatingFileHandler）或 app.log.3（按大小轮转）
+ROTATED_FILE_PATTERN = re.compile(
+    r"^(?P<base>.+\.log)\.(?P<suffix>\d{4}-\d{2}-\d{2}(?:_\d{2}-\d{2}(?:-\d{2})?)?|\d+)$"
+)
+
+CODEC_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+class LogArchiver:
+    """日志归档器
+
+    Args:
+        log_dir: 日志目录
+        archive_dir: 归档目录，默认为 log_dir/archive
+        codec: 压缩算法，"gzip" 或 "zstd"（未安装 zstandard 时回退为 gzip）
+        interval: 兜底扫描间隔（秒），轮转时会被立即唤醒
+        max_total_bytes: 归档目录总大小上限，None 表示不限制
+        max_age_days: 归档保留天数，None 表示不限制
+        min_age_seconds: 轮转后至少静置的秒数，避免处理仍在写入的文件
+    """
+
+    def __init__(
+        self,
+        log_dir: str = "logs",
+        archive_dir: Optional[str] = None,
+        codec: str = "gzip",
+        interval: float = 300.0,
+        max_total_bytes: Optional[int] = 1024 * 1024 * 1024,
+        max_age_days: Optional[float] = 30,
+        min_age_seconds: float = 1.0,
+    ):
+        self.log_dir = Path(log_dir)
+        self.archive_dir = Path(archive_dir) if archive_dir else self.log_dir / "archive"
+        self.codec = codec if codec == "gzip" or ZSTD_AVAILABLE else "gzip"
+        self.interval = interval
+        self.max_total_bytes = max_total_bytes
+        self.max_age_days = max_age_days
+        self.min_age_seconds = min_age_seconds
+
+        self.archived = 0
+        self.deleted = 0
+        self.original_bytes = 0
+        self.compressed_bytes = 0
+        self.errors = 0
+        self.last_run: Optional[float] = None
+
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="log-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def notify(self):
+        """通知有文件完成轮转，只设置事件，不做任何I/O"""
+        self._wakeup.set()
+
+    def rotator(self, source: str, dest: str):
+        """用作 handler.rotator：保持默认的重命名行为，并唤醒归档线程"""
+        if os.path.exists(source):
+            os.rename(source, dest)
+        self.notify()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            # 给轮转留出完成时间，同时合并短时间内的多次唤醒
+            time.sleep(self.min_age_seconds)
+            self.run_once()
+
+    def find_rotated_files(self) -> List[Path]:
+        """列出待归档的已轮转文件"""
+        if not self.log_dir.is_dir():
+            return []
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.log_dir):
+            if not entry.is_file() or not ROTATED_FILE_PATTERN.match(entry.name):
+                continue
+            if now - entry.stat().st_mtime < self.min_age_seconds:
+                continue
+            files.append(Path(entry.path))
+        return sorted(files)
+
+    def run_once(self):
+        """执行一轮归档与清理"""
+        with self._lock:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            for path in self.find_rotated_files():
+                try:
+                    self._compress(path)
+                except OSError:
+                    # 文件可能在扫描后被轮转逻辑重命名，下一轮再处理
+                    self.errors += 1
+            self._apply_retention()
+            self.last_run = time.time()
+
+    def _archive_path(self, file_name: str, mtime: float) -> Path:
+        # 按大小轮转的序号会不断平移，归档名统一使用文件的最后修改时间
+        match = ROTATED_FILE_PATTERN.match(file_name)
+        stamp = datetime.fromtimestamp(mtime).strftime("%Y%m%d-%H%M%S")
+        name = f"{match.group('base')}.{stamp}"
+        suffix = CODEC_SUFFIXES[self.codec]
+        target = self.archive_dir / f"{name}{suffix}"
+        counter = 1
+        while target.exists() or target.with_name(target.name + ".tmp").exists():
+            target = self.archive_dir / f"{name}-{counter}{suffix}"
+            counter += 1
+        return target
+
+    def _compress(self, path: Path):
+        # 先原子重命名认领文件，多个 worker 各自运行归档线程时只有一个能拿到
+        claimed = path.with_name(f"{path.name}.archiving.{os.getpid()}")
+        os.rename(path, claimed)
+        mtime = claimed.stat().st_mtime
+        size = claimed.stat().st_size
+
+        target = self._archive_path(path.name, mtime)
+        tmp = target.with_name(target.name + ".tmp")
+
+        with open(claimed, "rb") as src:
+            if self.codec == "zstd":
+                compressor = zstandard.ZstdCompressor(level=3)
+                with open(tmp, "wb") as raw, compressor.stream_writer(raw) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            else:
+                with gzip.open(tmp, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        os.replace(tmp, target)
+        os.utime(target, (time.time(), mtime))
+        claimed.unlink()
+
+        self.archived += 1
+        self.original_bytes += size
+        self.compressed_bytes += target.stat().st_size
+
+    def _list_archives(self) -> List[os.DirEntry]:
+        suffixes = tuple(CODEC_SUFFIXES.values())
+        return [
+            entry
+            for entry in os.scandir(self.archive_dir)
+            if entry.is_file() and entry.name.endswith(suffixes)
+        ]
+
+    def _apply_retention(self):
+        entries = sorted(self._list_archives(), key=lambda entry: entry.stat().st_mtime)
+        now = time.time()
+
+        if self.max_age_days is not None:
+            cutoff = now - self.max_age_days * 86400
+            while entries and entries[0].stat().st_mtime < cutoff:
+                self._delete(entries.pop(0))
+
+        if self.max_total_bytes is not None:
+            total = sum(entry.stat().st_size for entry in entries)
+            while entries and total > self.max_total_bytes:
+                entry = entries.pop(0)
+                total -= entry.stat().st_size
+                self._delete(entry)
+
+    def _delete(self, entry: os.DirEntry):
+        try:
+            os.unlink(entry.path)
+            self.deleted += 1
+        except OSError:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, object]:
+        """归档统计"""
+        try:
+            entries = self._list_archives()
+        except FileNotFoundError:
+            entries = []
+        return {
+            "codec": self.codec,
+            "archive_dir": str(self.archive_dir),
+            "files": len(entries),
+            "total_bytes": sum(entry.stat().st_size for entry in entries),
+            "archived": self.archived,
+            "deleted": self.deleted,
+            "errors": self.errors,
+            "original_bytes": self.original_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "compression_ratio": (
+                round(self.compressed_bytes / self.original_bytes, 4)
+                if self.original_bytes
+                else None
+            ),
+            "last_run": (
+                datetime.fromtimestamp(self.last_run).isoformat(timespec="seconds")
+                if self.last_run
+                else None
+            ),
+        }
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志收集进程
+接收各 worker 通过 BatchingSocketHandler 投递的批量日志，在短暂的重排窗口内按时间戳排序后，
+由单一进程写入 logs/ 下的轮转文件，worker 之间不再争用同一组日志文件
+
+运行: python -m common.log_collector --host 127.0.0.1 --port 9020 --dir logs
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import logging
+import logging.handlers
+import os
+import signal
+import time
+from datetime import time as dt_time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .log_archive import LogArchiver
+from .log_shipper import FRAME_HEADER, MAX_FRAME_SIZE, decode_payload
+
+
+class LogCollector:
+    """日志收集器
+
+    Args:
+        log_dir: 日志目录
+        reorder_window: 重排窗口（秒），窗口内到达的记录按时间戳排序后写出
+        backup_count: 轮转文件保留个数
+        archive: 是否在后台压缩归档已轮转的文件
+    """
+
+    def __init__(
+        self,
+        log_dir: str = "logs",
+        reorder_window: float = 1.0,
+        backup_count: int = 30,
+        archive: bool = True,
+    ):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.reorder_window = reorder_window
+        self.backup_count = backup_count
+        self.received = 0
+        self.written = 0
+        self._heap: List[Tuple[float, int, str, int, str]] = []
+        self._seq = itertools.count()
+        self._handlers: Dict[str, logging.Handler] = {}
+        self.archiver = LogArchiver(str(self.log_dir)) if archive else None
+
+    def _get_handler(self, file_name: str) -> logging.Handler:
+        handler = self._handlers.get(file_name)
+        if handler is None:
+            handler = logging.handlers.TimedRotatingFileHandler(
+                str(self.log_dir / file_name),
+                when="midnight",
+                interval=1,
+                backupCount=self.backup_count,
+                encoding="utf-8",
+                atTime=dt_time(0, 0, 0),
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            if self.archiver is not None:
+                handler.rotator = self.archiver.rotator
+            self._handlers[file_name] = handler
+        return handler
+
+    def add(self, records: List[dict]):
+        """加入一批记录，等待重排后写出"""
+        for item in records:
+            # 文件名来自网络，只保留基本名，防止写出日志目录
+            file_name = os.path.basename(str(item.get("f") or "app.log"))
+            heapq.heappush(
+                self._heap,
+                (
+                    float(item.get("t", time.time())),
+                    next(self._seq),
+                    file_name,
+                    int(item.get("l", logging.INFO)),
+                    str(item.get("m", "")),
+                ),
+            )
+        self.received += len(records)
+
+    def flush(self, force: bool = False):
+        """写出重排窗口之外的记录，force=True 时全部写出"""
+        deadline = float("inf") if force else time.time() - self.reorder_window
+        heap = self._heap
+        while heap and heap[0][0] <= deadline:
+            created, _, file_name, levelno, line = heapq.heappop(heap)
+            record = logging.makeLogRecord(
+                {"msg": line, "levelno": levelno, "created": created}
+            )
+            self._get_handler(file_name).handle(record)
+            if levelno >= logging.ERROR:
+                self._get_handler(file_name.replace(".log", "_error.log")).handle(
+                    record
+                )
+            self.written += 1
+
+    def close(self):
+        self.flush(force=True)
+        for handler in self._handlers.values():
+            handler.close()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                length, flags = FRAME_HEADER.unpack(header)
+                if length > MAX_FRAME_SIZE:
+                    print(f"❌ 帧过大，断开连接: {peer} ({length} bytes)")
+                    break
+                payload = await reader.readexactly(length)
+                try:
+                    self.add(decode_payload(flags, payload))
+                except Exception as e:
+                    print(f"❌ 无法解析来自 {peer} 的日志批次: {e}")
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int, flush_interval: float = 0.2):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"✅ 日志收集器已启动: {host}:{port} -> {self.log_dir.resolve()}")
+
+        if self.archiver is not None:
+            self.archiver.start()
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        try:
+            async with server:
+                while not stop.is_set():
+                    try:
+                        await asyncio.wait_for(stop.wait(), flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self.flush()
+        finally:
+            self.close()
+            if self.archiver is not None:
+                self.archiver.stop()
+            print(f"✅ 日志收集器已停止 | 接收 {self.received} 条, 写出 {self.written} 条")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FastAPI Starter 日志收集器")
+    parser.add_argument("--host", default=os.getenv("LOG_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.getenv("LOG_SERVER_PORT", "9020"))
+    )
+    parser.add_argument("--dir", default="logs", help="日志目录")
+    parser.add_argument(
+        "--reorder-window", type=float, default=1.0, help="按时间戳重排的窗口（秒）"
+    )
+    parser.add_argument(
+        "--no-archive", action="store_true", help="不压缩归档已轮转的文件"
+    )
+    args = parser.parse_args()
+
+    collector = LogCollector(
+        args.dir, args.reorder_window, archive=not args.no_archive
+    )
+    try:
+        asyncio.run(collector.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+per-worker 日志合并工具
+把 LOG_PER_WORKER_FILES 模式下各 worker 写出的 app.w<id>.log 按时间戳归并为一条有序日志流，
+逐行流式处理，内存占用只与文件个数有关
+
+运行: python -m common.log_merge logs/app.w*.log -o logs/app.merged.log
+"""
+
+import argparse
+import heapq
+import re
+import sys
+from typing import Iterable, Iterator, List, TextIO, Tuple
+
+# 与 EnhancedLog 格式一致的行首时间戳: 2025-01-01 12:00:00.123
+TIMESTAMP_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3}")
+
+
+def iter_entries(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """把行序列切分为日志条目，不以时间戳开头的行（如异常堆栈）归入上一条"""
+    timestamp = ""
+    block: List[str] = []
+    for line in lines:
+        match = TIMESTAMP_PATTERN.match(line)
+        if match and block:
+            yield timestamp, "".join(block)
+            block = []
+        if match:
+            timestamp = match.group(0)
+        block.append(line if line.endswith("\n") else line + "\n")
+    if block:
+        yield timestamp, "".join(block)
+
+
+def _keyed_entries(source: Iterable[str], index: int) -> Iterator[Tuple[str, int, str]]:
+    for timestamp, entry in iter_entries(source):
+        yield timestamp, index, entry
+
+
+def merge_logs(sources: List[Iterable[str]], output: TextIO) -> int:
+    """按时间戳归并多个日志源，时间戳相同时保持源的先后顺序，返回写出的条目数"""
+    streams = [_keyed_entries(source, index) for index, source in enumerate(sources)]
+    count = 0
+    for _, _, entry in heapq.merge(*streams):
+        output.write(entry)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按时间戳合并 per-worker 日志文件")
+    parser.add_argument("files", nargs="+", help="待合并的日志文件")
+    parser.add_argument("-o", "--output", help="输出文件，默认标准输出")
+    args = parser.parse_args()
+
+    handles = [open(path, encoding="utf-8", errors="replace") for path in args.files]
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        count = merge_logs(handles, output)
+    finally:
+        for handle in handles:
+            handle.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"✅ 已合并 {len(handles)} 个文件, 共 {count} 条日志", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
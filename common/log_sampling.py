@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志采样与限流
+按日志器和调用点（文件:行号 或 函数名）配置采样比例、令牌桶限流和"先N条后每K条"策略，
+被抑制的记录按调用点计数并周期性输出汇总，不会无声丢失
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class SamplingPolicy:
+    """采样策略，多个条件同时配置时需全部满足才输出
+
+    Args:
+        ratio: 采样比例，0~1
+        rate: 令牌桶每秒补充的令牌数，None 表示不限流
+        burst: 令牌桶容量，默认等于 rate
+        first_n: 每个调用点前 N 条全部输出
+        every_k: 超过 first_n 之后每 K 条输出一条
+        exempt_level: 达到该级别的记录不参与采样
+    """
+
+    ratio: float = 1.0
+    rate: Optional[float] = None
+    burst: Optional[float] = None
+    first_n: Optional[int] = None
+    every_k: Optional[int] = None
+    exempt_level: int = logging.WARNING
+
+
+class _CallSiteState:
+    """单个调用点的采样状态"""
+
+    __slots__ = ("policy", "count", "tokens", "updated_at", "suppressed")
+
+    def __init__(self, policy: SamplingPolicy):
+        self.policy = policy
+        self.count = 0
+        self.tokens = policy.burst if policy.burst is not None else policy.rate
+        self.updated_at = time.monotonic()
+        self.suppressed = 0
+
+    def allow(self, now: float) -> bool:
+        policy = self.policy
+        self.count += 1
+
+        if policy.first_n is not None or policy.every_k is not None:
+            first_n = policy.first_n or 0
+            if self.count > first_n:
+                every_k = policy.every_k or 0
+                if every_k <= 0 or (self.count - first_n) % every_k != 0:
+                    return False
+
+        if policy.ratio < 1.0 and random.random() >= policy.ratio:
+            return False
+
+        if policy.rate is not None:
+            capacity = policy.burst if policy.burst is not None else policy.rate
+            self.tokens = min(
+                capacity, self.tokens + (now - self.updated_at) * policy.rate
+            )
+            self.updated_at = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+
+        return True
+
+
+class LogSamplingFilter(logging.Filter):
+    """挂在日志器上的采样过滤器，在记录进入处理器/队列之前丢弃"""
+
+    def __init__(
+        self,
+        logger_name: str,
+        policy: Optional[SamplingPolicy] = None,
+        call_site_policies: Optional[Dict[str, SamplingPolicy]] = None,
+        report_interval: float = 60.0,
+    ):
+        super().__init__()
+        self.logger_name = logger_name
+        self.policy = policy
+        self.call_site_policies = dict(call_site_policies or {})
+        self.report_interval = report_interval
+        self._states: Dict[Tuple[str, int, str], Optional[_CallSiteState]] = {}
+        self._lock = threading.Lock()
+        self._last_report = time.monotonic()
+
+    def configure(
+        self,
+        policy: Optional[SamplingPolicy],
+        call_site_policies: Optional[Dict[str, SamplingPolicy]],
+    ):
+        """更新策略，策略未变化的调用点保留原有计数，其余调用点先汇报再重置"""
+        summary = {}
+        with self._lock:
+            self.policy = policy
+            self.call_site_policies = dict(call_site_policies or {})
+            for site, state in list(self._states.items()):
+                if state is not None and self._resolve_policy(*site) == state.policy:
+                    continue
+                if state is not None and state.suppressed:
+                    summary[f"{os.path.basename(site[0])}:{site[1]}"] = state.suppressed
+                del self._states[site]
+        if summary:
+            self._emit_summary(self.logger_name, summary)
+
+    def _resolve_policy(
+        self, pathname: str, lineno: int, func_name: Optional[str]
+    ) -> Optional[SamplingPolicy]:
+        site_policies = self.call_site_policies
+        if site_policies:
+            location = f"{os.path.basename(pathname)}:{lineno}"
+            if location in site_policies:
+                return site_policies[location]
+            if func_name and func_name in site_policies:
+                return site_policies[func_name]
+        return self.policy
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampling_summary", False):
+            return True
+
+        site = (record.pathname, record.lineno, record.funcName)
+        now = time.monotonic()
+        summary = None
+
+        with self._lock:
+            if site not in self._states:
+                policy = self._resolve_policy(*site)
+                self._states[site] = _CallSiteState(policy) if policy else None
+            state = self._states[site]
+
+            if state is None or record.levelno >= state.policy.exempt_level:
+                allowed = True
+            else:
+                allowed = state.allow(now)
+                if not allowed:
+                    state.suppressed += 1
+
+            if now - self._last_report >= self.report_interval:
+                self._last_report = now
+                summary = self._collect_suppressed()
+
+        if summary:
+            self._emit_summary(self.logger_name, summary)
+        return allowed
+
+    def _collect_suppressed(self) -> Dict[str, int]:
+        summary = {}
+        for (pathname, lineno, _), state in self._states.items():
+            if state is not None and state.suppressed:
+                summary[f"{os.path.basename(pathname)}:{lineno}"] = state.suppressed
+                state.suppressed = 0
+        return summary
+
+    def flush(self):
+        """立即输出尚未汇报的抑制计数，用于关闭前收尾"""
+        with self._lock:
+            summary = self._collect_suppressed()
+            self._last_report = time.monotonic()
+        if summary:
+            self._emit_summary(self.logger_name, summary)
+
+    @staticmethod
+    def _emit_summary(logger_name: str, summary: Dict[str, int]):
+        details = ", ".join(f"{site} x{count}" for site, count in summary.items())
+        logging.getLogger(logger_name).info(
+            f"📉 采样抑制统计 | {details}",
+            extra={"sampling_summary": True},
+        )
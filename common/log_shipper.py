@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量Socket日志投递
+日志调用只把记录放进有界内存缓冲区，后台线程按条数/字节/时间打包，可选压缩后通过TCP发往
+日志收集进程（common.log_collector）。收集端不可用时按指数退避重连，缓冲区满则丢弃最旧记录，
+请求处理永远不会被慢速收集端阻塞
+"""
+
+import json
+import logging
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from typing import List, Optional
+
+# 帧格式: 4字节负载长度 + 1字节标志位 + 负载(JSON数组)
+FRAME_HEADER = struct.Struct("!IB")
+FLAG_ZLIB = 0x01
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+def encode_frame(records: List[dict], compress: bool, compress_min_size: int) -> bytes:
+    """把一批记录编码为一帧"""
+    payload = json.dumps(records, ensure_ascii=False).encode("utf-8")
+    flags = 0
+    if compress and len(payload) >= compress_min_size:
+        payload = zlib.compress(payload, 6)
+        flags |= FLAG_ZLIB
+    return FRAME_HEADER.pack(len(payload), flags) + payload
+
+
+def decode_payload(flags: int, payload: bytes) -> List[dict]:
+    """解码一帧的负载"""
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    return json.loads(payload.decode("utf-8"))
+
+
+class BatchingSocketHandler(logging.Handler):
+    """批量Socket日志处理器
+
+    Args:
+        host: 收集端地址
+        port: 收集端端口
+        file_name: 收集端写入的目标日志文件名
+        buffer_size: 内存缓冲区可容纳的最大记录数
+        batch_size: 每批最多记录数
+        batch_bytes: 每批最多字节数（按格式化后的文本估算）
+        flush_interval: 未攒满一批时的最长等待时间（秒）
+        compress: 是否对批量负载做 zlib 压缩
+        max_backoff: 重连退避的最长间隔（秒）
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        file_name: str,
+        buffer_size: int = 50000,
+        batch_size: int = 500,
+        batch_bytes: int = 256 * 1024,
+        flush_interval: float = 0.5,
+        compress: bool = True,
+        compress_min_size: int = 1024,
+        max_backoff: float = 30.0,
+        close_timeout: float = 5.0,
+    ):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.file_name = file_name
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.compress_min_size = compress_min_size
+        self.max_backoff = max_backoff
+        self.close_timeout = close_timeout
+
+        self.dropped = 0
+        self.sent = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._closing = False
+        self._sock: Optional[socket.socket] = None
+        self._pending_frame: Optional[bytes] = None
+        self._pending_count = 0
+        self._backoff = 0.0
+        self._next_connect_at = 0.0
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"log-shipper-{file_name}", daemon=True
+        )
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord):
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def _take_batch(self) -> List[dict]:
+        """从缓冲区取出一批记录并格式化（在后台线程执行）"""
+        batch = []
+        size = 0
+        while len(batch) < self.batch_size and size < self.batch_bytes:
+            try:
+                record = self._buffer.popleft()
+            except IndexError:
+                break
+            try:
+                line = self.format(record)
+            except Exception:
+                self.handleError(record)
+                continue
+            size += len(line)
+            batch.append(
+                {
+                    "t": record.created,
+                    "l": record.levelno,
+                    "f": self.file_name,
+                    "m": line,
+                }
+            )
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if (
+                    self._pending_frame is None
+                    and len(self._buffer) < self.batch_size
+                    and not self._closing
+                ):
+                    self._cond.wait(self.flush_interval)
+                if self._closing and not self._buffer and self._pending_frame is None:
+                    return
+
+            if self._pending_frame is None:
+                batch = self._take_batch()
+                if not batch:
+                    continue
+                self._pending_frame = encode_frame(
+                    batch, self.compress, self.compress_min_size
+                )
+                self._pending_count = len(batch)
+
+            if not self._send_pending():
+                if self._closing:
+                    return
+                time.sleep(min(self._backoff, self.flush_interval) or 0.05)
+
+    def _connect(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_connect_at:
+            return False
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=5)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            self._backoff = min(self.max_backoff, max(0.5, self._backoff * 2))
+            self._next_connect_at = now + self._backoff
+            return False
+        self._sock = sock
+        self._backoff = 0.0
+        return True
+
+    def _send_pending(self) -> bool:
+        if self._sock is None and not self._connect():
+            return False
+        try:
+            self._sock.sendall(self._pending_frame)
+        except OSError:
+            self._sock.close()
+            self._sock = None
+            return False
+        self.sent += self._pending_count
+        self._pending_frame = None
+        self._pending_count = 0
+        return True
+
+    def close(self):
+        """刷新缓冲区后关闭连接，收集端不可用时最多等待 close_timeout 秒"""
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(self.close_timeout)
+        unsent = len(self._buffer) + self._pending_count
+        if unsent:
+            sys.stderr.write(
+                f"[BatchingSocketHandler] {self.file_name}: {unsent} records not shipped\n"
+            )
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        super().close()
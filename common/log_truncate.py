@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志内容截断引擎
+规则预编译、迭代遍历，单条日志的处理开销受总预算约束而与原始负载大小无关
+"""
+
+import json
+import re
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Tuple
+
+# 敏感/大字段关键字，键路径中包含这些关键字的字符串使用更短的截断长度
+SENSITIVE_KEYS: Tuple[str, ...] = (
+    "image",
+    "base64",
+    "file",
+    "content",
+    "body",
+    "data",
+    "password",
+    "token",
+)
+
+_BASE64_PATTERN = re.compile(r"[A-Za-z0-9+/]{50,}={0,2}")
+_BASE64_BODY = re.compile(r"[A-Za-z0-9+/]+")
+_BASE64_TAIL = re.compile(r"[A-Za-z0-9+/]*={0,2}")
+
+# 只探测字符串首尾的固定长度，避免对超长字符串做全量扫描
+_PROBE_LENGTH = 256
+
+_BUDGET_MARKER = "... [超出日志预算]"
+
+# 栈中的收尾任务标记：容器元素被截断时追加说明
+_TAIL = object()
+
+
+class ContentTruncator:
+    """日志内容截断器
+
+    Args:
+        max_length: 普通字符串的最大长度
+        base64_max_length: base64 及敏感字段字符串的最大长度
+        budget: 单条日志输出的总字符预算
+        max_depth: 最大嵌套深度，超出部分以占位符代替
+        max_items: 单个 dict/list 保留的最大元素个数
+        max_json_length: 尝试按 JSON 重新解析的字符串长度上限
+    """
+
+    def __init__(
+        self,
+        max_length: int = 1000,
+        base64_max_length: int = 100,
+        budget: int = 8192,
+        max_depth: int = 8,
+        max_items: int = 100,
+        max_json_length: int = 64 * 1024,
+    ):
+        self.max_length = max_length
+        self.base64_max_length = base64_max_length
+        self.budget = budget
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.max_json_length = max_json_length
+
+    @staticmethod
+    def is_sensitive_key(key: Any) -> bool:
+        """判断键名是否命中敏感关键字"""
+        lowered = str(key).lower()
+        return any(word in lowered for word in SENSITIVE_KEYS)
+
+    @staticmethod
+    def _looks_like_base64(value: str) -> bool:
+        if len(value) <= _PROBE_LENGTH:
+            return _BASE64_PATTERN.fullmatch(value) is not None
+        return (
+            _BASE64_BODY.fullmatch(value, 0, _PROBE_LENGTH) is not None
+            and _BASE64_TAIL.fullmatch(value, len(value) - 4) is not None
+        )
+
+    @staticmethod
+    def _looks_like_json_object(value: str) -> bool:
+        head = value[:_PROBE_LENGTH].lstrip()
+        tail = value[-_PROBE_LENGTH:].rstrip()
+        return head[:1] == "{" and tail[-1:] == "}"
+
+    def _truncate_str(self, value: str, sensitive: bool, budget: int) -> str:
+        limit = self.base64_max_length if sensitive else self.max_length
+        length = len(value)
+
+        if length > self.base64_max_length and self._looks_like_base64(value):
+            return f"{value[:self.base64_max_length]}... [截断,总长度:{length}字节]"
+
+        # 长度未超限时直接返回，不再尝试 JSON 解析
+        if length <= limit:
+            return value
+
+        if length <= self.max_json_length and self._looks_like_json_object(value):
+            try:
+                parsed = json.loads(value)
+            except ValueError:
+                parsed = None
+            if isinstance(parsed, dict):
+                return json.dumps(self.truncate(parsed, budget=budget))
+
+        return f"{value[:limit]}... [截断,总长度:{length}字符]"
+
+    def truncate(self, obj: Any, key_path: str = "", budget: int = None) -> Any:
+        """截断对象中的大型内容，返回新对象，不修改原对象"""
+        remaining = self.budget if budget is None else budget
+        root = []
+        # 任务: (值, 父容器, 键, 是否敏感, 深度)；父容器为 list 时键为 None
+        stack = [(obj, root, None, self.is_sensitive_key(key_path), 0)]
+
+        while stack:
+            value, parent, key, sensitive, depth = stack.pop()
+
+            if value is _TAIL:
+                # 收尾任务复用"是否敏感"位置携带截断说明
+                if key is None:
+                    parent.append(sensitive)
+                else:
+                    parent[key] = sensitive
+                continue
+
+            if remaining <= 0:
+                if key is None:
+                    parent.append(_BUDGET_MARKER)
+                else:
+                    parent[key] = _BUDGET_MARKER
+                break
+
+            if isinstance(value, dict):
+                if depth >= self.max_depth:
+                    out = f"[dict,{len(value)}项]"
+                    remaining -= len(out)
+                else:
+                    out = {}
+                    remaining -= 2
+                    if len(value) > self.max_items:
+                        stack.append(
+                            (_TAIL, out, "...", f"[截断,共{len(value)}项]", depth)
+                        )
+                    items = list(islice(value.items(), self.max_items))
+                    for child_key, child in reversed(items):
+                        remaining -= len(str(child_key)) + 4
+                        stack.append(
+                            (
+                                child,
+                                out,
+                                child_key,
+                                sensitive or self.is_sensitive_key(child_key),
+                                depth + 1,
+                            )
+                        )
+            elif isinstance(value, (list, tuple)):
+                if depth >= self.max_depth:
+                    out = f"[list,{len(value)}项]"
+                    remaining -= len(out)
+                else:
+                    out = []
+                    remaining -= 2
+                    if len(value) > self.max_items:
+                        stack.append(
+                            (_TAIL, out, None, f"[截断,共{len(value)}项]", depth)
+                        )
+                    for child in reversed(value[: self.max_items]):
+                        stack.append((child, out, None, sensitive, depth + 1))
+            elif isinstance(value, str):
+                out = self._truncate_str(value, sensitive, remaining)
+                remaining -= len(out)
+            else:
+                out = value
+                remaining -= 8
+
+            if key is None:
+                parent.append(out)
+            else:
+                parent[key] = out
+
+        return root[0] if root else _BUDGET_MARKER
+
+
+@lru_cache(maxsize=32)
+def get_truncator(
+    max_length: int = 1000, base64_max_length: int = 100
+) -> ContentTruncator:
+    """按参数缓存截断器实例"""
+    return ContentTruncator(max_length=max_length, base64_max_length=base64_max_length)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求指标采集
+纯 ASGI 中间件按 路由模板 × 方法 × 状态码 记录固定分桶的延迟直方图与在途请求数，
+以 Prometheus 文本格式输出。计数只在事件循环线程上更新，无需加锁
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# 延迟分桶上界（秒），与 Prometheus 客户端默认分桶一致
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _format_float(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    """固定分桶直方图，分桶计数按桶存放（非累积），输出时再累加"""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: Dict[str, str]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            bucket_labels = dict(labels, le=_format_float(bound))
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {self.total!r}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，除内置的请求指标外，其它模块可注册采集函数追加输出"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.request_latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.in_flight: Dict[str, int] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float):
+        key = (route, method, str(status))
+        histogram = self.request_latency.get(key)
+        if histogram is None:
+            histogram = self.request_latency[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """注册采集函数，函数返回 Prometheus 文本格式的行"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        lines = [
+            "# HELP http_request_duration_seconds HTTP request latency by route, method and status.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (route, method, status), histogram in list(self.request_latency.items()):
+            lines.extend(
+                histogram.render(
+                    "http_request_duration_seconds",
+                    {"route": route, "method": method, "status": status},
+                )
+            )
+
+        lines.append("# HELP http_requests_in_flight HTTP requests currently being served.")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        for method, value in list(self.in_flight.items()):
+            lines.append(
+                f"http_requests_in_flight{_format_labels({'method': method})} {value}"
+            )
+
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def _route_label(scope) -> str:
+    """取路由模板；挂载的子应用（如 /static）没有 route，取挂载前缀"""
+    path = getattr(scope.get("route"), "path", None)
+    if path:
+        return path
+    mount_path = scope.get("root_path", "")[len(scope.get("app_root_path", "")) :]
+    return mount_path or UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """请求指标中间件
+
+    路由取自路由匹配后写入 scope 的路由模板（如 /api/v1/items/{id}），未匹配的请求统一记为
+    <unmatched>，避免原始路径造成标签基数爆炸
+    """
+
+    def __init__(self, app, registry: "MetricsRegistry" = None):
+        self.app = app
+        self.registry = registry or metrics_registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        method = scope["method"]
+        in_flight = registry.in_flight
+        in_flight[method] = in_flight.get(method, 0) + 1
+        status_code = 500
+        start = time.perf_counter_ns()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = (time.perf_counter_ns() - start) / 1e9
+            in_flight[method] -= 1
+            registry.observe_request(_route_label(scope), method, status_code, elapsed)
+
+
+# 进程内全局注册表
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染结果缓存
+对内容与请求无关的模板页面只渲染一次，按 模板 × 上下文键 缓存字节与强 ETag，
+支持 If-None-Match -> 304；模板文件变化时（按间隔检查 mtime）自动失效重渲染
+"""
+
+import hashlib
+import time
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from fastapi.templating import Jinja2Templates
+
+from .compression import strip_etag_encoding
+
+
+class CachedPage:
+    """一次渲染的结果"""
+
+    __slots__ = ("body", "etag", "uptodate", "checked_at")
+
+    def __init__(self, body: bytes, uptodate: Optional[Callable[[], bool]]):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self.uptodate = uptodate
+        self.checked_at = time.monotonic()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 比较（弱比较，按 RFC 9110 忽略 W/ 前缀；压缩中间件加的编码后缀也视为同一资源）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if strip_etag_encoding(candidate) == etag:
+            return True
+    return False
+
+
+class RenderedPageCache:
+    """模板渲染缓存
+
+    Args:
+        templates: Jinja2Templates 实例
+        check_interval: 检查模板文件是否变化的最短间隔（秒）
+        cache_control: 响应的 Cache-Control，默认要求客户端每次用 ETag 协商
+    """
+
+    def __init__(
+        self,
+        templates: Jinja2Templates,
+        check_interval: float = 1.0,
+        cache_control: str = "no-cache",
+    ):
+        self.templates = templates
+        self.check_interval = check_interval
+        self.cache_control = cache_control
+        self.hits = 0
+        self.renders = 0
+        self._pages: Dict[Tuple[str, Hashable], CachedPage] = {}
+
+    def get(
+        self,
+        name: str,
+        context: Optional[Mapping[str, Any]] = None,
+        context_key: Hashable = None,
+    ) -> CachedPage:
+        """获取渲染结果，context 必须与请求无关，context_key 标识不同的上下文"""
+        key = (name, context_key)
+        page = self._pages.get(key)
+        if page is not None:
+            now = time.monotonic()
+            if now - page.checked_at < self.check_interval:
+                self.hits += 1
+                return page
+            page.checked_at = now
+            if page.uptodate is None or page.uptodate():
+                self.hits += 1
+                return page
+
+        env = self.templates.env
+        _, _, uptodate = env.loader.get_source(env, name)
+        body = env.get_template(name).render(**(context or {})).encode("utf-8")
+        page = self._pages[key] = CachedPage(body, uptodate)
+        self.renders += 1
+        return page
+
+    def response(
+        self,
+        request: Request,
+        name: str,
+        context: Optional[Mapping[str, Any]] = None,
+        context_key: Hashable = None,
+        media_type: str = "text/html; charset=utf-8",
+    ) -> Response:
+        """返回缓存页面，客户端 ETag 一致时返回 304"""
+        page = self.get(name, context, context_key)
+        headers = {"ETag": page.etag, "Cache-Control": self.cache_control}
+        if etag_matches(request.headers.get("if-none-match"), page.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=page.body, media_type=media_type, headers=headers)
+
+    def clear(self):
+        self._pages.clear()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按需单请求性能剖析
+请求携带正确的 X-Profile 头，或通过管理接口为某个路径预约接下来的 N 次请求时，对该请求运行
+cProfile（输出 .pstats）或栈采样（输出 collapsed stack，可直接生成火焰图）。结果写入 logs/profiles/，
+并受每分钟剖析次数上限约束，未触发时中间件只多一次字典查找，可以常驻
+"""
+
+import asyncio
+import cProfile
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_MODE_HEADER = b"x-profile-mode"
+MODES = ("cprofile", "sample")
+
+
+class StackSampler:
+    """栈采样器：后台线程按固定间隔抓取目标线程的调用栈并计数"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, path: Path):
+        """写出 collapsed stack 格式（每行: 栈;帧 次数）"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilerControl:
+    """剖析开关与限额
+
+    Args:
+        token: 触发剖析所需的密钥，为空时禁用请求头触发与管理接口
+        output_dir: 结果目录
+        max_per_minute: 每分钟最多剖析的请求数
+        default_mode: 默认剖析方式，"cprofile" 或 "sample"
+        sample_interval: 栈采样间隔（秒）
+        exclude_paths: 不参与剖析的路径（如管理接口自身）
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        output_dir: str = "logs/profiles",
+        max_per_minute: int = 6,
+        default_mode: str = "cprofile",
+        sample_interval: float = 0.005,
+        exclude_paths: Tuple[str, ...] = ("/admin/profile",),
+    ):
+        self.token = token or ""
+        self.output_dir = Path(output_dir)
+        self.max_per_minute = max_per_minute
+        self.default_mode = default_mode if default_mode in MODES else "cprofile"
+        self.sample_interval = sample_interval
+        self.exclude_paths = frozenset(exclude_paths)
+        self.profiled = 0
+        self.rejected = 0
+
+        self._armed: Dict[str, Tuple[int, str]] = {}
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._active = False
+        self._seq = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def check_token(self, value: Optional[str]) -> bool:
+        return self.enabled and value is not None and hmac.compare_digest(
+            value.encode("utf-8"), self.token.encode("utf-8")
+        )
+
+    def arm(self, path: str, count: int = 1, mode: Optional[str] = None):
+        """预约对 path 接下来的 count 次请求做剖析，count<=0 表示取消"""
+        if count <= 0:
+            self._armed.pop(path, None)
+            return
+        self._armed[path] = (count, mode if mode in MODES else self.default_mode)
+
+    def armed(self) -> Dict[str, Dict[str, object]]:
+        return {
+            path: {"remaining": count, "mode": mode}
+            for path, (count, mode) in self._armed.items()
+        }
+
+    def armed_mode(self, path: str) -> Optional[str]:
+        """path 已预约时返回剖析方式，不消耗预约；未预约时返回 None"""
+        if not self._armed:
+            return None
+        entry = self._armed.get(path)
+        return entry[1] if entry is not None else None
+
+    def consume_armed(self, path: str):
+        """消耗一次预约，在 acquire 成功后调用，被限额拒绝的请求不占用预约次数"""
+        entry = self._armed.get(path)
+        if entry is None:
+            return
+        count, mode = entry
+        if count <= 1:
+            del self._armed[path]
+        else:
+            self._armed[path] = (count - 1, mode)
+
+    def acquire(self) -> bool:
+        """检查限额，同一时刻只允许一个剖析（cProfile 不能嵌套）"""
+        if self._active:
+            self.rejected += 1
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start = now
+            self._window_count = 0
+        if self._window_count >= self.max_per_minute:
+            self.rejected += 1
+            return False
+        self._window_count += 1
+        self._active = True
+        return True
+
+    def release(self):
+        self._active = False
+        self.profiled += 1
+
+    def output_path(self, method: str, path: str, suffix: str) -> Path:
+        slug = path.strip("/").replace("/", "_") or "root"
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        return self.output_dir / f"{stamp}_{method}_{slug}_{next(self._seq)}{suffix}"
+
+
+class ProfilingMiddleware:
+    """按需剖析中间件"""
+
+    def __init__(self, app, control: ProfilerControl):
+        self.app = app
+        self.control = control
+
+    def _requested_mode(self, scope) -> Tuple[Optional[str], bool]:
+        """返回 (剖析方式, 是否来自预约)；不需要剖析时方式为 None"""
+        control = self.control
+        if not control.enabled or scope["path"] in control.exclude_paths:
+            return None, False
+
+        mode = control.armed_mode(scope["path"])
+        if mode is not None:
+            return mode, True
+
+        token = mode_header = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                token = value.decode("latin-1")
+            elif name == PROFILE_MODE_HEADER:
+                mode_header = value.decode("latin-1").lower()
+        if token is None or not control.check_token(token):
+            return None, False
+        return (mode_header if mode_header in MODES else control.default_mode), False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode, armed = self._requested_mode(scope)
+        if mode is None or not self.control.acquire():
+            await self.app(scope, receive, send)
+            return
+
+        control = self.control
+        if armed:
+            control.consume_armed(scope["path"])
+        suffix = ".pstats" if mode == "cprofile" else ".collapsed"
+        output = control.output_path(scope["method"], scope["path"], suffix)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", output.name.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        # 注意：剖析期间事件循环上并发执行的其它协程也会被计入
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), control.sample_interval)
+            profiler.start()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if mode == "cprofile":
+                profiler.disable()
+            else:
+                profiler.stop()
+            try:
+                await asyncio.to_thread(self._dump, profiler, output)
+            finally:
+                control.release()
+
+    @staticmethod
+    def _dump(profiler, output: Path):
+        output.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(str(output))
+        else:
+            profiler.dump(output)
+
+
+# 进程内全局剖析控制
+profiler_control = ProfilerControl(
+    token=os.getenv("PROFILE_TOKEN"),
+    output_dir=os.getenv("PROFILE_DIR", "logs/profiles"),
+    max_per_minute=int(os.getenv("PROFILE_MAX_PER_MINUTE", "6")),
+    default_mode=os.getenv("PROFILE_MODE", "cprofile"),
+)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询结果缓存
+按 规范化查询词 + 过滤条件 缓存搜索结果：容量有限的 LRU + TTL，空结果单独使用较短的 TTL（负缓存）；
+过期后的一段时间内先返回旧结果并在后台刷新（stale-while-revalidate），同一个键同时只加载一次；
+条目按标签（如索引别名）分组，别名切换到新索引时整组失效。所有方法都在事件循环线程上调用
+"""
+
+import asyncio
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .log import EnhancedLog
+
+logger = EnhancedLog.get_logger("query_cache")
+
+# get 返回的缓存状态
+HIT, MISS, STALE = "HIT", "MISS", "STALE"
+
+
+def normalize_query(text: str) -> str:
+    """全角转半角、大小写折叠、合并空白，使等价的查询词命中同一条缓存"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def cache_key(query: str, filters: Optional[Mapping[str, Any]] = None, **extra: Any) -> Tuple:
+    """规范化查询词 + 过滤条件（忽略值为 None 的条件，与顺序无关）"""
+    items = {**(filters or {}), **extra}
+    return (normalize_query(query),) + tuple(
+        sorted((name, value) for name, value in items.items() if value is not None)
+    )
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until", "tags")
+
+    def __init__(self, value: Any, ttl: float, stale_ttl: float, tags: Tuple[str, ...]):
+        now = time.monotonic()
+        self.value = value
+        self.expires_at = now + ttl
+        self.stale_until = self.expires_at + stale_ttl
+        self.tags = tags
+
+
+class QueryCache:
+    """搜索结果缓存
+
+    Args:
+        name: 名称，用于日志与指标标签
+        max_entries: 最多缓存的条目数，超出时淘汰最久未使用的条目
+        ttl: 条目新鲜时间（秒）
+        negative_ttl: 空结果的新鲜时间（秒）
+        stale_ttl: 过期后仍可返回旧结果（同时后台刷新）的时间（秒），0 表示不使用
+        is_empty: 判断结果是否为空（决定是否按负缓存处理），默认 not value
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 10_000,
+        ttl: float = 60.0,
+        negative_ttl: float = 10.0,
+        stale_ttl: float = 30.0,
+        is_empty: Callable[[Any], bool] = lambda value: not value,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.is_empty = is_empty
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.refreshes = 0
+        self.load_errors = 0
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        # 正在加载的键（首次加载与后台刷新共用），并发请求等待同一个结果
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Iterable[str] = (),
+    ) -> Tuple[Any, str]:
+        """返回 (结果, 缓存状态 HIT/STALE/MISS)；loader 的异常不缓存，直接抛给调用方"""
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            if now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if self.is_empty(entry.value):
+                    self.negative_hits += 1
+                return entry.value, HIT
+            if now < entry.stale_until:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._loading:
+                    self._start_load(key, loader, tuple(tags), background=True)
+                return entry.value, STALE
+            self._remove(key)
+
+        self.misses += 1
+        future = self._loading.get(key)
+        if future is None:
+            future = self._start_load(key, loader, tuple(tags), background=False)
+        return await asyncio.shield(future), MISS
+
+    def _start_load(self, key, loader, tags: Tuple[str, ...], background: bool) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generation
+
+        async def load():
+            try:
+                value = await loader()
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self.load_errors += 1
+                if background:
+                    logger.warning(f"⚠️ {self.name} 后台刷新失败，继续使用旧结果: {e}")
+                future.set_exception(e)
+                return
+            finally:
+                self._loading.pop(key, None)
+            # 加载期间发生过失效时不写入，避免把旧索引的结果放回缓存
+            if generation == self._generation:
+                self.set(key, value, tags)
+            if background:
+                self.refreshes += 1
+            future.set_result(value)
+
+        asyncio.get_running_loop().create_task(load(), name=f"query-cache-{self.name}")
+        # 后台刷新失败时 future 无人等待，预先取出异常避免告警
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        ttl = self.negative_ttl if self.is_empty(value) else self.ttl
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, ttl, self.stale_ttl, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, key: Hashable):
+        if key in self._entries:
+            self._remove(key)
+            self.invalidations += 1
+
+    def invalidate_tag(self, tag: str) -> int:
+        """使带有该标签的全部条目失效，返回失效条数"""
+        self._generation += 1
+        keys = list(self._tags.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tags.clear()
+
+    def render_prometheus(self) -> List[str]:
+        """缓存指标（Prometheus 文本格式），可注册到 MetricsRegistry"""
+        label = f'{{cache="{self.name}"}}'
+        lines = [
+            "# HELP query_cache_entries Entries in the query cache.",
+            "# TYPE query_cache_entries gauge",
+            f"query_cache_entries{label} {len(self._entries)}",
+        ]
+        for key, help_text in (
+            ("hits", "Fresh cache hits (including negative hits)."),
+            ("negative_hits", "Cache hits on cached empty results."),
+            ("stale_hits", "Stale results served while refreshing in the background."),
+            ("misses", "Cache misses."),
+            ("evictions", "Entries evicted because the cache was full."),
+            ("invalidations", "Entries invalidated explicitly or by tag."),
+            ("refreshes", "Background refreshes completed."),
+            ("load_errors", "Failed loads and refreshes."),
+        ):
+            name = f"query_cache_{key}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{label} {getattr(self, key)}")
+        return lines
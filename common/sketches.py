@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式统计用的概率数据结构，内存占用固定且可合并（多个 worker / 多个时间窗口的状态相加即得总体结果）：
+- CountMinSketch: 任意键的出现次数估计（保守更新，只会高估，误差不超过 总数 * e / width）
+- TopK:           借助 CountMinSketch 估计值维护的高频键（heavy hitters）候选集
+- LatencyHistogram: 对数分桶的延迟直方图（DDSketch / HDR 思路），分位数的相对误差不超过 relative_accuracy
+状态可通过 to_dict / from_dict 转为 JSON 兼容的字典
+"""
+
+import base64
+import hashlib
+import math
+import sys
+import zlib
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+@lru_cache(maxsize=16384)
+def _hash_pair(key: str) -> Tuple[int, int]:
+    """与进程无关的稳定哈希（内置 hash 对字符串加盐，不同 worker 的结果无法合并），
+    拆为两个 32 位整数用于双重哈希；高频键（及合并时反复评估的候选键）命中缓存"""
+    digest = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest & 0xFFFFFFFF, (digest >> 32) | 1
+
+
+def _encode_array(values: array) -> str:
+    return base64.b64encode(zlib.compress(values.tobytes())).decode("ascii")
+
+
+def _decode_array(typecode: str, data: str) -> array:
+    values = array(typecode)
+    values.frombytes(zlib.decompress(base64.b64decode(data)))
+    return values
+
+
+class CountMinSketch:
+    """Count-Min Sketch
+
+    Args:
+        width: 每行计数器个数，误差上限约为 总数 * e / width
+        depth: 行数（哈希函数个数），误差超过上限的概率约为 e ** -depth
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+
+    def _positions(self, key: str) -> List[int]:
+        h1, h2 = _hash_pair(key)
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """计数并返回该键的新估计值
+
+        保守更新：只把低于 新估计值 的计数器抬到新估计值，高估明显减少；
+        各计数器仍不低于所有映射到它的键的真实次数之和中的最大者，合并（相加）后估计值依然只高不低
+        """
+        self.total += count
+        positions = self._positions(key)
+        estimate = min(row[position] for row, position in zip(self._rows, positions)) + count
+        for row, position in zip(self._rows, positions):
+            if row[position] < estimate:
+                row[position] = estimate
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[position] for row, position in zip(self._rows, self._positions(key)))
+
+    @property
+    def error_bound(self) -> float:
+        """估计值高出真实值的上限（以 1 - e ** -depth 的概率成立）"""
+        return math.e / self.width * self.total
+
+    def merge(self, *others: "CountMinSketch"):
+        """把一个或多个 sketch 的计数加到本 sketch
+
+        每行按本机字节序整体转为一个大整数相加：各计数器占 64 位，和不超过总记录数，不会向相邻计数器进位，
+        相加由 C 实现的大整数运算完成，比逐个计数器相加快两个数量级
+        """
+        if not others:
+            return
+        for other in others:
+            if (other.width, other.depth) != (self.width, self.depth):
+                raise ValueError("CountMinSketch 尺寸不同，无法合并")
+        self.total += sum(other.total for other in others)
+        size = self.width * 8
+        rows = []
+        for depth, mine in enumerate(self._rows):
+            value = int.from_bytes(mine.tobytes(), sys.byteorder)
+            for other in others:
+                value += int.from_bytes(other._rows[depth].tobytes(), sys.byteorder)
+            row = array("Q")
+            row.frombytes(value.to_bytes(size, sys.byteorder))
+            rows.append(row)
+        self._rows = rows
+
+    def memory_usage(self) -> int:
+        return sum(len(row) * row.itemsize for row in self._rows)
+
+    def to_dict(self) -> dict:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "total": self.total,
+            "rows": [_encode_array(row) for row in self._rows],
+        }
+
+    @classmethod
+    def from_dict(cls, state: Mapping) -> "CountMinSketch":
+        sketch = cls(state["width"], state["depth"])
+        sketch.total = state["total"]
+        sketch._rows = [_decode_array("Q", row) for row in state["rows"]]
+        return sketch
+
+
+class TopK:
+    """高频键：候选集最多 capacity 个，按 CountMinSketch 估计值淘汰最小者
+
+    只有估计值超过候选集当前最小值的新键才会进入候选集，长尾键只需一次字典查找与比较
+
+    Args:
+        capacity: 候选集大小，应大于需要返回的条数
+        width: 见 CountMinSketch
+        depth: 见 CountMinSketch
+    """
+
+    def __init__(self, capacity: int = 100, width: int = 4096, depth: int = 4):
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        self._candidates: Dict[str, int] = {}
+        self._floor = 0
+
+    def add(self, key: str, count: int = 1):
+        estimate = self.sketch.add(key, count)
+        candidates = self._candidates
+        if key in candidates:
+            candidates[key] = estimate
+        elif len(candidates) < self.capacity:
+            candidates[key] = estimate
+            self._floor = min(self._floor, estimate) if len(candidates) > 1 else estimate
+        elif estimate > self._floor:
+            # 候选的估计值只增不减，_floor 可能偏低，淘汰前按实际最小值确认
+            victim = min(candidates, key=candidates.__getitem__)
+            if candidates[victim] < estimate:
+                del candidates[victim]
+                candidates[key] = estimate
+            self._floor = min(candidates.values())
+
+    @property
+    def total(self) -> int:
+        return self.sketch.total
+
+    def estimate(self, key: str) -> int:
+        return self.sketch.estimate(key)
+
+    def top(self, size: int = 10) -> List[Tuple[str, int]]:
+        ranked = sorted(self._candidates.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:size]
+
+    def merge(self, *others: "TopK"):
+        """合并计数后用合并后的估计值重新评估各方候选集的并集（多个一起合并时只评估一次）"""
+        if not others:
+            return
+        self.sketch.merge(*(other.sketch for other in others))
+        keys = set(self._candidates).union(*(other._candidates for other in others))
+        estimates = sorted(((self.sketch.estimate(key), key) for key in keys), reverse=True)[: self.capacity]
+        self._candidates = {key: estimate for estimate, key in estimates}
+        self._floor = min(self._candidates.values(), default=0)
+
+    def memory_usage(self) -> int:
+        return self.sketch.memory_usage() + sum(len(key.encode("utf-8")) + 8 for key in self._candidates)
+
+    def to_dict(self) -> dict:
+        return {"capacity": self.capacity, "sketch": self.sketch.to_dict(), "candidates": self._candidates}
+
+    @classmethod
+    def from_dict(cls, state: Mapping) -> "TopK":
+        top = cls(state["capacity"])
+        top.sketch = CountMinSketch.from_dict(state["sketch"])
+        top._candidates = dict(state["candidates"])
+        top._floor = min(top._candidates.values(), default=0)
+        return top
+
+
+class LatencyHistogram:
+    """对数分桶直方图：桶边界按 gamma = (1 + a) / (1 - a) 等比增长，桶数由取值范围决定，与样本数无关
+
+    Args:
+        relative_accuracy: 分位数估计的相对误差上限 a
+        min_value: 小于该值的样本计入零桶（秒）
+        max_value: 大于该值的样本按该值计（秒）
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-4, max_value: float = 600.0):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float, count: int = 1):
+        """计入样本；NaN、无穷大与负数不是有效耗时，直接忽略（计入后 sum / max 无法序列化为 JSON）"""
+        if not math.isfinite(value) or value < 0:
+            return
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value < self.min_value:
+            self.zero_count += count
+            return
+        key = math.ceil(math.log(min(value, self.max_value)) / self._log_gamma)
+        self._buckets[key] = self._buckets.get(key, 0) + count
+
+    def _value(self, key: int) -> float:
+        """桶 (gamma^(k-1), gamma^k] 的代表值，相对误差不超过 a"""
+        return 2 * self._gamma**key / (self._gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return self.min
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                return min(max(self._value(key), self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[str, Optional[float]]:
+        return {f"p{q * 100:g}": self.quantile(q) for q in qs}
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def merge(self, *others: "LatencyHistogram"):
+        buckets = self._buckets
+        for other in others:
+            if other.relative_accuracy != self.relative_accuracy:
+                raise ValueError("LatencyHistogram 精度不同，无法合并")
+            for key, count in other._buckets.items():
+                buckets[key] = buckets.get(key, 0) + count
+            self.zero_count += other.zero_count
+            self.count += other.count
+            self.sum += other.sum
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+
+    def memory_usage(self) -> int:
+        return len(self._buckets) * 16
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "buckets": {str(key): count for key, count in self._buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Mapping) -> "LatencyHistogram":
+        histogram = cls(state["relative_accuracy"], state["min_value"], state["max_value"])
+        histogram._buckets = {int(key): count for key, count in state["buckets"].items()}
+        histogram.zero_count = state["zero_count"]
+        histogram.count = state["count"]
+        histogram.sum = state["sum"]
+        histogram.min = state["min"] if state["min"] is not None else math.inf
+        histogram.max = state["max"]
+        return histogram
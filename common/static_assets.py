@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态资源构建与预压缩分发
+构建步骤把 static/ 下的文件复制为带内容哈希的文件名（style.1a2b3c4d5e.css），并生成 .gz/.br
+压缩副本与 manifest.json；运行时按 Accept-Encoding 直接返回预压缩文件，带哈希的资源使用
+Cache-Control: immutable，客户端无需再重新验证。模板中通过 static_url('style.css') 引用
+
+构建：python -m common.static_assets --src static
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .compression import parse_accept_encoding
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 值得压缩的文本类资源，图片/字体等已压缩格式只做指纹
+COMPRESSIBLE_SUFFIXES = frozenset(
+    {".css", ".js", ".mjs", ".map", ".svg", ".html", ".json", ".txt", ".xml"}
+)
+
+# 服务端偏好顺序
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def _fingerprint(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=5).hexdigest()
+
+
+def _iter_sources(src_dir: Path, out_dir: Path):
+    for root, dirs, files in os.walk(src_dir):
+        root_path = Path(root)
+        dirs[:] = sorted(
+            d for d in dirs if not d.startswith(".") and root_path / d != out_dir
+        )
+        for name in sorted(files):
+            if not name.startswith("."):
+                yield root_path / name
+
+
+def build_assets(src_dir: str = "static", clean: bool = False) -> Dict[str, Dict[str, object]]:
+    """构建带指纹的静态资源及其压缩副本，返回写入 manifest.json 的内容
+
+    Args:
+        src_dir: 静态资源目录，结果写入 src_dir/dist/
+        clean: 构建前清空 dist 目录（默认保留旧版本，滚动发布期间旧页面仍可访问）
+    """
+    src = Path(src_dir)
+    out = src / DIST_DIR
+    if clean and out.exists():
+        shutil.rmtree(out)
+    out.mkdir(parents=True, exist_ok=True)
+
+    manifest: Dict[str, Dict[str, object]] = {}
+    for source in _iter_sources(src, out):
+        logical = source.relative_to(src).as_posix()
+        data = source.read_bytes()
+        hashed_name = f"{source.stem}.{_fingerprint(data)}{source.suffix}"
+        relative = Path(logical).parent / hashed_name
+        target = out / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+
+        encodings: List[str] = []
+        if source.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+            if BROTLI_AVAILABLE:
+                variants["br"] = brotli.compress(data, quality=11)
+            for encoding, compressed in variants.items():
+                # 压缩后不更小就不生成，运行时直接返回原文件
+                if len(compressed) < len(data):
+                    target.with_name(target.name + ENCODING_SUFFIXES[encoding]).write_bytes(
+                        compressed
+                    )
+                    encodings.append(encoding)
+
+        manifest[logical] = {
+            "path": f"{DIST_DIR}/{relative.as_posix()}",
+            "size": len(data),
+            "encodings": sorted(encodings, key=list(ENCODING_SUFFIXES).index),
+        }
+
+    (out / MANIFEST_NAME).write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8"
+    )
+    return manifest
+
+
+class AssetManifest:
+    """构建结果清单，提供模板中使用的 static_url
+
+    Args:
+        directory: 静态资源目录
+        url_prefix: 静态资源挂载路径
+    """
+
+    def __init__(self, directory: str = "static", url_prefix: str = "/static"):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.entries: Dict[str, Dict[str, object]] = {}
+        self.load()
+
+    def load(self):
+        """读取 manifest.json，未构建时回退为原始文件名"""
+        path = self.directory / DIST_DIR / MANIFEST_NAME
+        try:
+            self.entries = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self.entries = {}
+
+    def url(self, name: str) -> str:
+        """资源 URL：已构建时返回带指纹的地址"""
+        name = name.lstrip("/")
+        entry = self.entries.get(name)
+        return f"{self.url_prefix}/{entry['path'] if entry else name}"
+
+
+class _Variant:
+    __slots__ = ("media_type", "files")
+
+    def __init__(self, media_type: str, files: Dict[str, Tuple[str, os.stat_result]]):
+        self.media_type = media_type
+        self.files = files
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """优先返回预压缩副本的 StaticFiles
+
+    带指纹的资源在启动时登记其各编码副本，请求时只做一次字典查找与编码协商，
+    其它文件沿用 StaticFiles 的默认行为（ETag / Last-Modified 重新验证）
+    """
+
+    def __init__(self, *args, manifest: Optional[AssetManifest] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._variants: Dict[str, _Variant] = {}
+        if manifest is not None and self.directory is not None:
+            self._register(manifest)
+
+    def _register(self, manifest: AssetManifest):
+        root = Path(self.directory)
+        for logical, entry in manifest.entries.items():
+            relative = os.path.normpath(entry["path"])
+            media_type = mimetypes.guess_type(logical)[0] or "application/octet-stream"
+            files = {}
+            for encoding in ("", *entry.get("encodings", ())):
+                full_path = root / (relative + ENCODING_SUFFIXES.get(encoding, ""))
+                try:
+                    files[encoding] = (str(full_path), full_path.stat())
+                except FileNotFoundError:
+                    continue
+            if "" in files:
+                self._variants[relative] = _Variant(media_type, files)
+
+    async def get_response(self, path: str, scope) -> Response:
+        variant = self._variants.get(path)
+        if variant is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        accepted = parse_accept_encoding(request_headers.get("accept-encoding"))
+        encoding = next(
+            (enc for enc in ENCODING_SUFFIXES if enc in accepted and enc in variant.files), ""
+        )
+        full_path, stat_result = variant.files[encoding]
+
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if len(variant.files) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        response = FileResponse(
+            full_path,
+            stat_result=stat_result,
+            media_type=variant.media_type,
+            headers=headers,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="构建带指纹与预压缩副本的静态资源")
+    parser.add_argument("--src", default="static", help="静态资源目录")
+    parser.add_argument("--clean", action="store_true", help="构建前清空 dist 目录")
+    args = parser.parse_args()
+
+    manifest = build_assets(args.src, clean=args.clean)
+    for logical, entry in manifest.items():
+        encodings = ",".join(entry["encodings"]) or "-"
+        print(f"{logical} -> {entry['path']} ({entry['size']} bytes, {encodings})")
+    if not BROTLI_AVAILABLE:
+        print("brotli 未安装，仅生成 gzip 副本（pip install brotli）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式搜索分析
+每条记录在写入时计入当前时间窗口（按接收时间，固定长度的滚动窗口）：查询词进入 TopK（Count-Min Sketch），
+延迟按 全部 / 设备 / 年级 分别进入对数分桶直方图（见 common/sketches.py）。
+只保留最近 windows 个窗口，内存与记录数无关；最近 N 秒的滑动窗口由这些窗口合并得到。
+多 worker 部署时配置 state_dir，各 worker 定期把窗口状态写到该目录，查询时与其它 worker 的状态合并
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from .log import EnhancedLog
+from .query_cache import normalize_query
+from .sketches import LatencyHistogram, TopK
+
+logger = EnhancedLog.get_logger("stream_analytics")
+
+# 延迟统计的维度；超过 max_groups 个取值后其余计入 OTHER
+DIMENSIONS = ("all", "device", "grade")
+OTHER = "other"
+
+# 缓存已结束窗口合并结果的滑动窗口范围个数（不同的 minutes 参数各占一个）
+RANGE_CACHE_SIZE = 8
+
+
+@dataclass(frozen=True)
+class SketchOptions:
+    """单个窗口内各结构的尺寸"""
+
+    top_capacity: int = 200
+    cms_width: int = 4096
+    cms_depth: int = 4
+    relative_accuracy: float = 0.01
+    max_groups: int = 32
+
+
+class WindowState:
+    """一个时间窗口的统计状态，可与其它窗口 / 其它 worker 的状态合并"""
+
+    def __init__(self, start: float, end: float, options: SketchOptions):
+        self.start = start
+        self.end = end
+        self.options = options
+        self.queries = TopK(options.top_capacity, options.cms_width, options.cms_depth)
+        self.latency: Dict[str, Dict[str, LatencyHistogram]] = {dimension: {} for dimension in DIMENSIONS}
+
+    def _histogram(self, dimension: str, group: str) -> LatencyHistogram:
+        groups = self.latency[dimension]
+        histogram = groups.get(group)
+        if histogram is None:
+            if len(groups) >= self.options.max_groups and group != OTHER:
+                return self._histogram(dimension, OTHER)
+            histogram = groups[group] = LatencyHistogram(self.options.relative_accuracy)
+        return histogram
+
+    def observe(self, query: str, latency: Optional[float], device: Optional[str], grade: Optional[str]):
+        if query:
+            self.queries.add(query)
+        if latency is not None and math.isfinite(latency) and latency >= 0:
+            self._histogram("all", "all").add(latency)
+            if device:
+                self._histogram("device", device).add(latency)
+            if grade:
+                self._histogram("grade", grade).add(latency)
+
+    @property
+    def count(self) -> int:
+        histogram = self.latency["all"].get("all")
+        return max(self.queries.total, histogram.count if histogram else 0)
+
+    def merge(self, *others: "WindowState"):
+        """合并一个或多个状态；多个一起合并时 TopK 的候选集只重新评估一次"""
+        if not others:
+            return
+        self.start = min(self.start, *(other.start for other in others))
+        self.end = max(self.end, *(other.end for other in others))
+        self.queries.merge(*(other.queries for other in others))
+        for other in others:
+            for dimension, groups in other.latency.items():
+                for group, histogram in groups.items():
+                    self._histogram(dimension, group).merge(histogram)
+
+    def memory_usage(self) -> int:
+        return self.queries.memory_usage() + sum(
+            histogram.memory_usage() for groups in self.latency.values() for histogram in groups.values()
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "start": self.start,
+            "end": self.end,
+            "queries": self.queries.to_dict(),
+            "latency": {
+                dimension: {group: histogram.to_dict() for group, histogram in groups.items()}
+                for dimension, groups in self.latency.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, state: Mapping, options: SketchOptions) -> "WindowState":
+        window = cls(state["start"], state["end"], options)
+        window.queries = TopK.from_dict(state["queries"])
+        for dimension, groups in state["latency"].items():
+            window.latency[dimension] = {
+                group: LatencyHistogram.from_dict(histogram) for group, histogram in groups.items()
+            }
+        return window
+
+
+class StreamAnalytics:
+    """按时间窗口聚合搜索记录，所有方法都在事件循环线程上调用
+
+    Args:
+        name: 名称，用于日志、指标标签与状态文件名
+        window_seconds: 滚动窗口长度（秒）
+        windows: 保留的窗口个数，滑动窗口最长为 window_seconds * windows
+        options: 单个窗口内各结构的尺寸
+        state_dir: 多 worker 共享状态的目录，为空时只统计本进程
+        worker_id: 本 worker 的标识，用于状态文件名
+        publish_interval: 写出本 worker 状态的间隔（秒）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: int = 60,
+        windows: int = 60,
+        options: SketchOptions = SketchOptions(),
+        state_dir: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        publish_interval: float = 5.0,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self.options = options
+        self.state_dir = state_dir
+        self.worker_id = worker_id or str(os.getpid())
+        self.publish_interval = publish_interval
+
+        self._windows: Dict[int, WindowState] = {}
+        # 已结束窗口的序列化结果不再变化，写状态文件时复用
+        self._encoded: Dict[int, dict] = {}
+        # 其它 worker 的状态：文件路径 -> (mtime, 写出时的当前窗口序号, {窗口序号: 状态})
+        self._peers: Dict[str, Tuple[float, int, Dict[int, WindowState]]] = {}
+        # 已结束窗口的合并结果。已结束的窗口不再变化，重新读取其它 worker 的状态文件时也复用原对象，
+        # 因此以参与合并的状态对象本身作为版本
+        # 滑动窗口：(首窗口, 末窗口) -> {来源（None 为本进程，否则为状态文件路径）: (版本, 合并结果)}
+        self._range_cache: "OrderedDict[Tuple[int, int], Dict[Optional[str], Tuple[tuple, WindowState]]]" = (
+            OrderedDict()
+        )
+        # 滚动窗口（有其它 worker 时）：窗口序号 -> (版本, 合并结果)
+        self._window_cache: Dict[int, Tuple[tuple, WindowState]] = {}
+        # 缓存中包含的最新窗口序号，写入该窗口及更早窗口（时钟回拨或显式传入 now）时清空缓存
+        self._cached_through = -1
+        self._task: Optional[asyncio.Task] = None
+
+        self.observed = 0
+        self.publishes = 0
+        self.publish_failures = 0
+
+    # ------------------------------------------------------------------ 写入
+
+    def _window_number(self, now: Optional[float] = None) -> int:
+        return int((time.time() if now is None else now) // self.window_seconds)
+
+    def _window(self, number: int) -> WindowState:
+        window = self._windows.get(number)
+        if window is None:
+            start = number * self.window_seconds
+            window = self._windows[number] = WindowState(start, start + self.window_seconds, self.options)
+            for old in [n for n in self._windows if n <= number - self.windows]:
+                del self._windows[old]
+                self._encoded.pop(old, None)
+        return window
+
+    def observe(
+        self,
+        query: str,
+        latency: Optional[float] = None,
+        device: Optional[str] = None,
+        grade: Optional[str] = None,
+        now: Optional[float] = None,
+    ):
+        """计入一次搜索；now 为空时取当前时间"""
+        number = self._window_number(now)
+        self._window(number).observe(normalize_query(query), latency, device, grade)
+        self._encoded.pop(number, None)
+        if number <= self._cached_through:
+            self._range_cache.clear()
+            self._window_cache.clear()
+            self._cached_through = -1
+        self.observed += 1
+
+    # ------------------------------------------------------------------ 查询
+
+    def _numbers(self, seconds: float, now: Optional[float] = None) -> List[int]:
+        """覆盖最近 seconds 秒的窗口序号（含当前窗口，最多 windows 个）"""
+        current = self._window_number(now)
+        count = min(self.windows, max(1, math.ceil(seconds / self.window_seconds)))
+        return list(range(current - count + 1, current + 1))
+
+    def _states(self, number: int) -> List[WindowState]:
+        """本进程与其它 worker 在该窗口的状态"""
+        states = [self._windows[number]] if number in self._windows else []
+        for _, _, windows in self._peers.values():
+            if number in windows:
+                states.append(windows[number])
+        return states
+
+    def _merged(self, numbers: List[int]) -> WindowState:
+        merged = WindowState(
+            numbers[0] * self.window_seconds, (numbers[-1] + 1) * self.window_seconds, self.options
+        )
+        merged.merge(*(state for number in numbers for state in self._states(number)))
+        return merged
+
+    def _closed_sources(self, first: int, last: int) -> List[WindowState]:
+        """已结束窗口 first..last 按来源（本进程、各 worker）分别合并的结果；来源的窗口未变时复用缓存，
+        某个 worker 的窗口变化（通常是刚结束一个窗口）时只重新合并该 worker 的部分"""
+        key = (first, last)
+        cached = self._range_cache.pop(key, {})
+        numbers = range(first, last + 1)
+        sources = [(None, self._windows)] + [(path, windows) for path, (_, _, windows) in self._peers.items()]
+        entries: Dict[Optional[str], Tuple[tuple, WindowState]] = {}
+        for source, windows in sources:
+            version = tuple(windows.get(number) for number in numbers)
+            entry = cached.get(source)
+            if entry is None or entry[0] != version:
+                state = WindowState(first * self.window_seconds, (last + 1) * self.window_seconds, self.options)
+                state.merge(*(window for window in version if window is not None))
+                entry = (version, state)
+            entries[source] = entry
+        self._range_cache[key] = entries
+        while len(self._range_cache) > RANGE_CACHE_SIZE:
+            self._range_cache.popitem(last=False)
+        self._cached_through = max(self._cached_through, last)
+        return [state for _, state in entries.values()]
+
+    def sliding(self, seconds: float, now: Optional[float] = None) -> WindowState:
+        """最近 seconds 秒（按窗口取整）的合并状态；多 worker 时先调用 refresh_peers
+
+        已结束窗口的合并结果按来源缓存，每次请求只需合并当前窗口与缓存结果
+        """
+        numbers = self._numbers(seconds, now)
+        current = numbers[-1]
+        merged = WindowState(numbers[0] * self.window_seconds, (current + 1) * self.window_seconds, self.options)
+        closed = self._closed_sources(numbers[0], current - 1) if len(numbers) > 1 else []
+        merged.merge(*closed, *self._states(current))
+        return merged
+
+    def _closed_window(self, number: int) -> WindowState:
+        """单个已结束窗口的状态：只有一份时直接返回（不再变化，调用方只读），多份时缓存合并结果"""
+        states = tuple(self._states(number))
+        if len(states) == 1:
+            return states[0]
+        cached = self._window_cache.get(number)
+        if cached is None or cached[0] != states:
+            cached = self._window_cache[number] = (states, self._merged([number]))
+            self._cached_through = max(self._cached_through, number)
+        return cached[1]
+
+    def tumbling(self, limit: Optional[int] = None, now: Optional[float] = None) -> List[WindowState]:
+        """最近 limit 个滚动窗口各自的状态，按时间倒序（返回的状态只读）；多 worker 时先调用 refresh_peers"""
+        numbers = self._numbers(self.window_seconds * (limit or self.windows), now)
+        current = numbers[-1]
+        for number in [n for n in self._window_cache if n <= current - self.windows]:
+            del self._window_cache[number]
+        return [self._merged([current])] + [self._closed_window(number) for number in reversed(numbers[:-1])]
+
+    # ------------------------------------------------------------------ 多 worker
+
+    def _state_path(self, worker_id: str) -> str:
+        return os.path.join(self.state_dir, f"{self.name}.w{worker_id}.json")
+
+    def snapshot(self) -> dict:
+        """本进程全部窗口的状态（JSON 兼容）"""
+        current = self._window_number()
+        windows = {}
+        for number, window in self._windows.items():
+            encoded = self._encoded.get(number)
+            if encoded is None:
+                encoded = window.to_dict()
+                if number < current:
+                    self._encoded[number] = encoded
+            windows[str(number)] = encoded
+        return {
+            "worker": self.worker_id,
+            "window_seconds": self.window_seconds,
+            "current": current,
+            "windows": windows,
+        }
+
+    @staticmethod
+    def _write(path: str, snapshot: dict):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    async def publish(self):
+        """把本进程的状态写入 state_dir（先写临时文件再替换，读方不会读到半个文件）"""
+        if not self.state_dir:
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        await asyncio.to_thread(self._write, self._state_path(self.worker_id), self.snapshot())
+        self.publishes += 1
+
+    def _read_peers(self, cached: Mapping[str, Tuple[float, int, Dict[int, WindowState]]]):
+        """读取其它 worker 的状态文件；文件未变化时复用上次的解析结果，
+        文件变化时上次已结束的窗口复用原对象（不再变化），过期文件（worker 已退出）忽略"""
+        peers: Dict[str, Tuple[float, int, Dict[int, WindowState]]] = {}
+        if not self.state_dir or not os.path.isdir(self.state_dir):
+            return peers
+        own = os.path.basename(self._state_path(self.worker_id))
+        retention = self.window_seconds * self.windows
+        now = time.time()
+        for filename in os.listdir(self.state_dir):
+            if not (filename.startswith(f"{self.name}.w") and filename.endswith(".json")) or filename == own:
+                continue
+            path = os.path.join(self.state_dir, filename)
+            try:
+                mtime = os.path.getmtime(path)
+                if now - mtime > retention:
+                    continue
+                previous = cached.get(path)
+                if previous is not None and previous[0] == mtime:
+                    peers[path] = previous
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                if snapshot.get("window_seconds") != self.window_seconds:
+                    continue
+                closed_before, old_windows = (previous[1], previous[2]) if previous is not None else (0, {})
+                windows = {}
+                for key, state in snapshot["windows"].items():
+                    number = int(key)
+                    if number < closed_before and number in old_windows:
+                        windows[number] = old_windows[number]
+                    else:
+                        windows[number] = WindowState.from_dict(state, self.options)
+                peers[path] = (mtime, snapshot.get("current", 0), windows)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ 读取 {path} 失败: {e}")
+        return peers
+
+    async def refresh_peers(self):
+        """在线程池中重新读取其它 worker 的状态，完成后整体替换"""
+        if self.state_dir:
+            self._peers = await asyncio.to_thread(self._read_peers, dict(self._peers))
+
+    async def start(self):
+        if self.state_dir and self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"analytics-{self.name}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            # 退出前写出最后一次状态，其它 worker 在保留期内仍可合并
+            try:
+                await self.publish()
+            except OSError as e:
+                logger.error(f"❌ {self.name} 状态写出失败: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            try:
+                await self.publish()
+            except OSError as e:
+                self.publish_failures += 1
+                logger.error(f"❌ {self.name} 状态写出失败: {e}")
+
+    # ------------------------------------------------------------------ 指标
+
+    def memory_usage(self) -> int:
+        return sum(window.memory_usage() for window in self._windows.values())
+
+    def render_prometheus(self) -> List[str]:
+        """流式分析指标（Prometheus 文本格式），可注册到 MetricsRegistry"""
+        label = f'{{stream="{self.name}"}}'
+        return [
+            "# HELP stream_analytics_observed_total Records counted by this process.",
+            "# TYPE stream_analytics_observed_total counter",
+            f"stream_analytics_observed_total{label} {self.observed}",
+            "# HELP stream_analytics_windows Windows held by this process.",
+            "# TYPE stream_analytics_windows gauge",
+            f"stream_analytics_windows{label} {len(self._windows)}",
+            "# HELP stream_analytics_bytes Approximate size of the window state.",
+            "# TYPE stream_analytics_bytes gauge",
+            f"stream_analytics_bytes{label} {self.memory_usage()}",
+            "# HELP stream_analytics_peers Other workers whose state is merged.",
+            "# TYPE stream_analytics_peers gauge",
+            f"stream_analytics_peers{label} {len(self._peers)}",
+            "# HELP stream_analytics_publish_failures_total Failed state writes.",
+            "# TYPE stream_analytics_publish_failures_total counter",
+            f"stream_analytics_publish_failures_total{label} {self.publish_failures}",
+        ]
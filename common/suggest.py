@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索词前缀补全
+历史查询词（规范化后）按字典序拼接存放在一个字符串中，配合偏移量与次数数组（array）按前缀二分出区间；
+区间较大的前缀（热点节点）在重建时预先计算按次数排序的 top-K，其余前缀的区间很小，查询时现算。
+新增的计数先累积在增量中，定期在线程池中并入快照后整体替换：已收录查询词的次数增加只复制次数数组、
+修补受影响的热点前缀；新查询词需要完整重建，完整重建的频率按上次耗时自适应，CPU 占用有上限
+"""
+
+import asyncio
+import heapq
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+from .log import EnhancedLog
+from .query_cache import normalize_query
+
+logger = EnhancedLog.get_logger("suggest")
+
+# 前缀区间上界：所有以 prefix 开头的字符串都小于 prefix + MAX_CHAR
+MAX_CHAR = "\U0010ffff"
+
+
+class _Keys(Sequence[str]):
+    """拼接字符串 + 偏移量数组组成的只读有序字符串序列，可直接用于 bisect"""
+
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, blob: str, offsets: array):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:  # type: ignore[override]
+        return self._blob[self._offsets[index] : self._offsets[index + 1]]
+
+
+class PrefixIndex:
+    """不可变的前缀索引
+
+    Args:
+        entries: (查询词, 次数)，查询词需已规范化且不重复，顺序不限
+        top_k: 每个前缀最多返回的条数
+        hot_threshold: 区间条数超过该值的前缀预先计算 top-K，其余前缀查询时在区间内现算
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[Tuple[str, int]],
+        top_k: int = 10,
+        hot_threshold: int = 64,
+    ):
+        self.top_k = top_k
+        self.hot_threshold = hot_threshold
+
+        ordered = sorted(entries)
+        offsets = array("I", [0])
+        counts = array("I")
+        parts: List[str] = []
+        position = 0
+        for text, count in ordered:
+            parts.append(text)
+            position += len(text)
+            offsets.append(position)
+            counts.append(min(count, 0xFFFFFFFF))
+        self._keys = _Keys("".join(parts), offsets)
+        self._counts = counts
+        self._hot: Dict[str, array] = self._build_hot([text for text, _ in ordered])
+
+    def with_counts(self, delta: Mapping[str, int]) -> Tuple["PrefixIndex", Dict[str, int]]:
+        """已收录查询词的次数加上增量，返回 (新索引, 未收录的查询词)
+
+        新索引与当前索引共用拼接字符串和偏移量，只复制次数数组；
+        次数只增不减，受影响的热点前缀在原 top-K 与变化的查询词中重新取 top-K 即可，不必扫描整个区间。
+        未收录的查询词会改变排序位置，需要完整重建才能加入
+        """
+        keys = self._keys
+        size = len(keys)
+        counts = array("I", self._counts)
+        changed: Dict[str, List[int]] = {}
+        missing: Dict[str, int] = {}
+        position = 0
+        # 增量按字典序处理，从上一个位置起倍增步长再二分（galloping），比每次全区间二分少比较很多次
+        for text, count in sorted(delta.items()):
+            lo, step = position, 1
+            while lo + step < size and keys[lo + step] < text:
+                lo += step
+                step *= 2
+            position = bisect_left(keys, text, lo, min(lo + step, size))
+            if position == size or keys[position] != text:
+                missing[text] = count
+                continue
+            counts[position] = min(counts[position] + count, 0xFFFFFFFF)
+            # 热点前缀逐级嵌套：某一级不是热点时更长的前缀也不是
+            for length in range(1, len(text) + 1):
+                prefix = text[:length]
+                if prefix not in self._hot:
+                    break
+                changed.setdefault(prefix, []).append(position)
+
+        index = PrefixIndex.__new__(PrefixIndex)
+        index.top_k = self.top_k
+        index.hot_threshold = self.hot_threshold
+        index._keys = keys
+        index._counts = counts
+        index._hot = dict(self._hot)
+        for prefix, positions in changed.items():
+            candidates = sorted(set(self._hot[prefix]).union(positions))
+            index._hot[prefix] = array("I", heapq.nlargest(self.top_k, candidates, key=counts.__getitem__))
+        return index, missing
+
+    def _build_hot(self, texts: List[str]) -> Dict[str, array]:
+        """逐级加长前缀扫描有序词表：连续相同前缀即为一个节点，节点足够大时保存 top-K 下标，
+        只在上一级的大节点内继续细分，直到没有大节点为止"""
+        hot: Dict[str, array] = {}
+        counts = self._counts
+        ranges = [(0, len(texts))]
+        length = 0
+        while ranges:
+            length += 1
+            narrowed = []
+            for lo, hi in ranges:
+                start = lo
+                while start < hi:
+                    prefix = texts[start][:length]
+                    if len(prefix) < length:
+                        start += 1
+                        continue
+                    end = bisect_left(texts, prefix + MAX_CHAR, start, hi)
+                    if end - start > self.hot_threshold:
+                        best = heapq.nlargest(self.top_k, range(start, end), key=counts.__getitem__)
+                        hot[prefix] = array("I", best)
+                        narrowed.append((start, end))
+                    start = end
+            ranges = narrowed
+        return hot
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        """按字典序产出 (查询词, 次数)"""
+        for index in range(len(self._counts)):
+            yield self._keys[index], self._counts[index]
+
+    def suggest(self, prefix: str, size: int = 10) -> List[Tuple[str, int]]:
+        """按次数从高到低返回以 prefix 开头的查询词"""
+        size = min(size, self.top_k)
+        hot = self._hot.get(prefix)
+        if hot is not None:
+            best = hot[:size]
+        else:
+            start = bisect_left(self._keys, prefix)
+            end = bisect_left(self._keys, prefix + MAX_CHAR, start)
+            best = heapq.nlargest(size, range(start, end), key=self._counts.__getitem__)
+        return [(self._keys[index], self._counts[index]) for index in best]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """各部分占用的字节数（热点前缀按 UTF-8 估算，不含 dict 本身）"""
+        offsets = self._keys._offsets
+        hot_bytes = sum(len(prefix.encode("utf-8")) + len(ids) * ids.itemsize for prefix, ids in self._hot.items())
+        return {
+            "queries": len(self._counts),
+            "text": sys.getsizeof(self._keys._blob),
+            "offsets": len(offsets) * offsets.itemsize,
+            "counts": len(self._counts) * self._counts.itemsize,
+            "hot_prefixes": len(self._hot),
+            "hot": hot_bytes,
+        }
+
+
+def _merge(index: PrefixIndex, delta: Mapping[str, int], min_count: int) -> Iterator[Tuple[str, int]]:
+    """快照（有序）与增量计数归并，次数相加"""
+    pending = sorted(delta.items())
+    position = 0
+    for text, count in index.items():
+        while position < len(pending) and pending[position][0] < text:
+            if pending[position][1] >= min_count:
+                yield pending[position]
+            position += 1
+        if position < len(pending) and pending[position][0] == text:
+            count += pending[position][1]
+            position += 1
+        if count >= min_count:
+            yield text, count
+    for text, count in pending[position:]:
+        if count >= min_count:
+            yield text, count
+
+
+class SuggestIndex:
+    """可增量更新的补全索引：全局一份，另按分组（如年级）各一份
+
+    Args:
+        name: 名称，用于日志与指标标签
+        top_k: 每次最多返回的条数
+        rebuild_interval: 定期重建间隔（秒）
+        min_count: 重建时丢弃累计次数低于该值的查询词
+        max_length: 超过该长度（字符）的查询词不收录
+        hot_threshold: 见 PrefixIndex
+        max_groups: 分组个数上限，超出后新分组的记录只计入全局
+        rebuild_budget: 完整重建（收录新查询词）最多占用的单核 CPU 比例，
+            两次完整重建的间隔不小于 上次完整重建耗时 / rebuild_budget；其余重建只更新已收录查询词的次数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        top_k: int = 10,
+        rebuild_interval: float = 60.0,
+        min_count: int = 1,
+        max_length: int = 64,
+        hot_threshold: int = 64,
+        max_groups: int = 32,
+        rebuild_budget: float = 0.05,
+    ):
+        self.name = name
+        self.top_k = top_k
+        self.rebuild_interval = rebuild_interval
+        self.min_count = min_count
+        self.max_length = max_length
+        self.max_groups = max_groups
+        self.rebuild_budget = rebuild_budget
+        self._index_options = {"top_k": top_k, "hot_threshold": hot_threshold}
+
+        # 分组 -> 快照；None 为全局
+        self._indexes: Dict[Optional[str], PrefixIndex] = {None: PrefixIndex((), **self._index_options)}
+        self._delta: Dict[Optional[str], Counter] = {}
+        # 尚未收录的新查询词，等下一次完整重建时加入（增量重建不再逐个查找）
+        self._unindexed: Dict[Optional[str], Counter] = {}
+        self._groups: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._rebuild_lock: Optional[asyncio.Lock] = None
+        self._next_full_rebuild = 0.0
+
+        self.recorded = 0
+        self.group_overflow = 0
+        self.rebuilds = 0
+        self.full_rebuilds = 0
+        self.last_rebuild_seconds = 0.0
+        self.last_full_rebuild_seconds = 0.0
+
+    def record(self, text: str, group: Optional[str] = None, count: int = 1):
+        """记录查询词出现 count 次，下次重建后可被补全"""
+        text = normalize_query(text)
+        if not text or len(text) > self.max_length:
+            return
+        self._delta.setdefault(None, Counter())[text] += count
+        self.recorded += count
+        if group is None:
+            return
+        if group not in self._groups:
+            # 分组取值来自请求，限制个数，避免每个新取值都常驻一份索引
+            if len(self._groups) >= self.max_groups:
+                self.group_overflow += count
+                return
+            self._groups.add(group)
+        self._delta.setdefault(group, Counter())[text] += count
+
+    def suggest(self, prefix: str, group: Optional[str] = None, size: int = 10) -> List[Tuple[str, int]]:
+        """按当前快照补全；group 为空时查全局"""
+        prefix = normalize_query(prefix)
+        index = self._indexes.get(group)
+        if not prefix or index is None:
+            return []
+        return index.suggest(prefix, size)
+
+    def _build(
+        self, indexes, delta, full: bool
+    ) -> Tuple[Dict[Optional[str], PrefixIndex], Dict[Optional[str], Dict[str, int]]]:
+        """返回 (新快照, 留待完整重建的新查询词)；只处理有增量的分组"""
+        rebuilt = dict(indexes)
+        pending: Dict[Optional[str], Dict[str, int]] = {}
+        for group, counts in delta.items():
+            index = indexes.get(group)
+            if full or index is None:
+                rebuilt[group] = PrefixIndex(
+                    _merge(index or PrefixIndex((), **self._index_options), counts, self.min_count),
+                    **self._index_options,
+                )
+            else:
+                rebuilt[group], missing = index.with_counts(counts)
+                if missing:
+                    pending[group] = missing
+        return rebuilt, pending
+
+    def _take_delta(self, full: bool) -> Dict[Optional[str], Counter]:
+        delta, self._delta = self._delta, {}
+        if full:
+            for group, counts in self._unindexed.items():
+                delta.setdefault(group, Counter()).update(counts)
+            self._unindexed = {}
+        return delta
+
+    def _finish(self, indexes, pending, full: bool, seconds: float):
+        self._indexes = indexes
+        for group, counts in pending.items():
+            self._unindexed.setdefault(group, Counter()).update(counts)
+        self.rebuilds += 1
+        self.last_rebuild_seconds = seconds
+        if full:
+            self.full_rebuilds += 1
+            self.last_full_rebuild_seconds = seconds
+            self._next_full_rebuild = time.monotonic() + max(
+                self.rebuild_interval, seconds / self.rebuild_budget
+            )
+
+    async def rebuild(self, full: Optional[bool] = None):
+        """把增量计数并入快照，在线程池中构建新快照后整体替换
+
+        Args:
+            full: 是否完整重建（收录新查询词），默认按 rebuild_budget 决定
+        """
+        if self._rebuild_lock is None:
+            self._rebuild_lock = asyncio.Lock()
+        async with self._rebuild_lock:
+            if full is None:
+                full = time.monotonic() >= self._next_full_rebuild
+            if not self._delta and not (full and self._unindexed):
+                return
+            delta = self._take_delta(full)
+            start = time.perf_counter()
+            try:
+                indexes, pending = await asyncio.to_thread(self._build, self._indexes, delta, full)
+            except BaseException:
+                # 增量放回，下次重建时再试
+                for group, counts in delta.items():
+                    self._delta.setdefault(group, Counter()).update(counts)
+                raise
+            self._finish(indexes, pending, full, time.perf_counter() - start)
+
+    def rebuild_now(self, full: bool = True):
+        """同步重建（脚本、基准测试使用）"""
+        delta = self._take_delta(full)
+        start = time.perf_counter()
+        indexes, pending = self._build(self._indexes, delta, full)
+        self._finish(indexes, pending, full, time.perf_counter() - start)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"suggest-{self.name}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"❌ {self.name} 补全索引重建失败: {e}")
+
+    def memory_usage(self) -> Dict[str, int]:
+        """全部快照的字节数合计，以及折算到每百万个不同查询词（按全局快照的查询词数）的字节数"""
+        total: Counter = Counter()
+        for index in self._indexes.values():
+            total.update(index.memory_usage())
+        distinct = len(self._indexes[None])
+        size = total["text"] + total["offsets"] + total["counts"] + total["hot"]
+        return {
+            "queries": distinct,
+            "hot_prefixes": total["hot_prefixes"],
+            "bytes": size,
+            "bytes_per_million": int(size / distinct * 1_000_000) if distinct else 0,
+        }
+
+    def render_prometheus(self) -> List[str]:
+        """补全索引指标（Prometheus 文本格式），可注册到 MetricsRegistry"""
+        label = f'{{index="{self.name}"}}'
+        usage = self.memory_usage()
+        return [
+            "# HELP suggest_queries Distinct queries in the suggestion index.",
+            "# TYPE suggest_queries gauge",
+            f"suggest_queries{label} {usage['queries']}",
+            "# HELP suggest_index_bytes Approximate size of the suggestion index.",
+            "# TYPE suggest_index_bytes gauge",
+            f"suggest_index_bytes{label} {usage['bytes']}",
+            "# HELP suggest_rebuilds_total Completed rebuilds.",
+            "# TYPE suggest_rebuilds_total counter",
+            f"suggest_rebuilds_total{label} {self.rebuilds}",
+            "# HELP suggest_rebuild_seconds Duration of the last rebuild.",
+            "# TYPE suggest_rebuild_seconds gauge",
+            f"suggest_rebuild_seconds{label} {self.last_rebuild_seconds}",
+            "# HELP suggest_full_rebuilds_total Rebuilds that added new queries.",
+            "# TYPE suggest_full_rebuilds_total counter",
+            f"suggest_full_rebuilds_total{label} {self.full_rebuilds}",
+            "# HELP suggest_full_rebuild_seconds Duration of the last full rebuild.",
+            "# TYPE suggest_full_rebuild_seconds gauge",
+            f"suggest_full_rebuild_seconds{label} {self.last_full_rebuild_seconds}",
+            "# HELP suggest_groups Groups with their own index.",
+            "# TYPE suggest_groups gauge",
+            f"suggest_groups{label} {len(self._groups)}",
+            "# HELP suggest_group_overflow_total Records counted only globally because max_groups was reached.",
+            "# TYPE suggest_group_overflow_total counter",
+            f"suggest_group_overflow_total{label} {self.group_overflow}",
+        ]
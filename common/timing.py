@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+函数耗时聚合
+按函数在内存中聚合调用次数、总耗时、最小/最大值和分位数（固定对数分桶估算），
+不再逐次写日志；汇总可周期性输出到日志，也可通过 /metrics 暴露
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _build_bounds() -> Tuple[int, ...]:
+    """对数分桶上界（纳秒）：1µs ~ 约100s，相邻桶相差 25%"""
+    bounds = []
+    value = 1000.0
+    while value < 100 * 1e9:
+        bounds.append(int(value))
+        value *= 1.25
+    return tuple(bounds)
+
+
+BUCKET_BOUNDS_NS = _build_bounds()
+DEFAULT_QUANTILES: Tuple[float, ...] = (0.5, 0.9, 0.99)
+
+
+class TimingStats:
+    """单个函数的耗时统计"""
+
+    __slots__ = (
+        "name",
+        "count",
+        "errors",
+        "total_ns",
+        "min_ns",
+        "max_ns",
+        "buckets",
+        "_lock",
+    )
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.min_ns: Optional[int] = None
+        self.max_ns = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ns: int, failed: bool = False):
+        index = bisect_left(BUCKET_BOUNDS_NS, elapsed_ns)
+        with self._lock:
+            self.count += 1
+            self.total_ns += elapsed_ns
+            if failed:
+                self.errors += 1
+            if self.min_ns is None or elapsed_ns < self.min_ns:
+                self.min_ns = elapsed_ns
+            if elapsed_ns > self.max_ns:
+                self.max_ns = elapsed_ns
+            self.buckets[index] += 1
+
+    def quantile(self, q: float) -> Optional[int]:
+        """估算分位数（纳秒），取所在桶的上界并以实际最大值封顶"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.buckets):
+            cumulative += count
+            if cumulative >= rank and count:
+                if index < len(BUCKET_BOUNDS_NS):
+                    return min(BUCKET_BOUNDS_NS[index], self.max_ns)
+                return self.max_ns
+        return self.max_ns
+
+    def snapshot(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "total_ms": self.total_ns / 1e6,
+                "avg_ms": self.total_ns / self.count / 1e6 if self.count else None,
+                "min_ms": self.min_ns / 1e6 if self.min_ns is not None else None,
+                "max_ms": self.max_ns / 1e6,
+                **{
+                    f"p{int(q * 100)}_ms": (
+                        value / 1e6 if (value := self.quantile(q)) is not None else None
+                    )
+                    for q in quantiles
+                },
+            }
+
+
+class TimingRegistry:
+    """函数耗时注册表"""
+
+    def __init__(self):
+        self._stats: Dict[str, TimingStats] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> TimingStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(name, TimingStats(name))
+        return stats
+
+    def summary(self) -> Dict[str, Dict[str, object]]:
+        """所有函数的耗时汇总"""
+        return {name: stats.snapshot() for name, stats in list(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def render_prometheus(self) -> List[str]:
+        """以 Prometheus summary 格式输出，可注册到 MetricsRegistry"""
+        lines = [
+            "# HELP function_duration_seconds Execution time of functions decorated with log_time.",
+            "# TYPE function_duration_seconds summary",
+        ]
+        errors = [
+            "# HELP function_errors_total Calls of functions decorated with log_time that raised.",
+            "# TYPE function_errors_total counter",
+        ]
+        for name, stats in list(self._stats.items()):
+            with stats._lock:
+                for q in DEFAULT_QUANTILES:
+                    value = stats.quantile(q)
+                    if value is not None:
+                        lines.append(
+                            f'function_duration_seconds{{function="{name}",quantile="{q}"}} '
+                            f"{value / 1e9!r}"
+                        )
+                lines.append(
+                    f'function_duration_seconds_sum{{function="{name}"}} {stats.total_ns / 1e9!r}'
+                )
+                lines.append(
+                    f'function_duration_seconds_count{{function="{name}"}} {stats.count}'
+                )
+                errors.append(f'function_errors_total{{function="{name}"}} {stats.errors}')
+        return lines + errors
+
+
+class PeriodicDumper:
+    """按间隔输出汇总，由被装饰函数的调用顺带检查，无需后台线程"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_at = time.monotonic() + interval
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_at:
+            return False
+        with self._lock:
+            if now < self._next_at:
+                return False
+            self._next_at = now + self.interval
+            return True
+
+
+# 进程内全局注册表
+timing_registry = TimingRegistry()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写后缓冲（write-behind）
+请求只把数据追加到进程内缓冲区即返回，后台任务按条数或时间间隔批量写入下游；
+缓冲区满时拒绝新数据（由调用方返回 429），关闭时把剩余数据全部写完。
+暂时性错误（连接、超时）整批退避重试；数据本身的错误（由 is_permanent 判断）二分拆批，只丢弃写不进去的条目
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, List, Optional, Sequence, TypeVar
+
+from .log import EnhancedLog
+
+T = TypeVar("T")
+
+logger = EnhancedLog.get_logger("write_behind")
+
+# 写入失败后重试间隔的上限（秒）
+MAX_RETRY_BACKOFF = 30.0
+# 丢弃条目时日志里每条内容的最大长度
+DROPPED_ITEM_LOG_CHARS = 500
+
+
+class BufferFull(Exception):
+    """缓冲区已满"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("write-behind buffer is full")
+        self.retry_after = retry_after
+
+
+class WriteBehindBuffer(Generic[T]):
+    """写后缓冲区，所有方法都在事件循环线程上调用
+
+    Args:
+        name: 名称，用于日志与指标标签
+        sink: 批量写入函数 async sink(items)，失败时抛出异常
+        max_size: 缓冲区最多容纳的条数，超出时 add 抛出 BufferFull
+        flush_size: 累积到该条数立即写入，同时也是单批写入的上限
+        flush_interval: 最长写入间隔（秒）
+        retry_backoff: 写入失败后的首次重试间隔（秒），之后指数退避，最长 MAX_RETRY_BACKOFF 秒；
+            关闭时只在 stop() 的超时时间内重试，剩余时间不够再等一次间隔时丢弃剩余数据
+        is_permanent: 判断异常是否由数据本身引起（重试也不会成功），是则把该批二分拆开分别写入，
+            单条仍失败时记录日志后丢弃；为 None 时所有异常都按暂时性错误整批重试。
+            sink 需要幂等：拆批途中遇到暂时性错误时，尚未确认写入的部分会放回缓冲区重试
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sink: Callable[[Sequence[T]], Awaitable[None]],
+        max_size: int = 50_000,
+        flush_size: int = 1000,
+        flush_interval: float = 1.0,
+        retry_backoff: float = 0.5,
+        is_permanent: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        self.sink = sink
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.retry_backoff = retry_backoff
+        self.is_permanent = is_permanent
+
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.dropped = 0
+        self.last_flush_seconds = 0.0
+
+        self._items: List[T] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._stop_requested: Optional[asyncio.Event] = None
+        self._stop_deadline = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, items: Sequence[T]) -> int:
+        """追加数据，整批要么全部接受要么全部拒绝，返回当前缓冲条数"""
+        if len(self._items) + len(items) > self.max_size or self._stopping:
+            self.rejected += len(items)
+            raise BufferFull(retry_after=self.flush_interval)
+        self._items.extend(items)
+        self.accepted += len(items)
+        if len(self._items) >= self.flush_size and self._wakeup is not None:
+            self._wakeup.set()
+        return len(self._items)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._stop_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=f"write-behind-{self.name}")
+
+    async def stop(self, timeout: float = 30.0):
+        """停止接收并写完剩余数据"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._stop_deadline = time.monotonic() + timeout
+        self._wakeup.set()
+        self._stop_requested.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"❌ {self.name} 缓冲区关闭超时，未写入 {len(self._items)} 条")
+        finally:
+            self._task = None
+
+    async def _run(self):
+        backoff = self.retry_backoff
+        while True:
+            if not self._stopping and len(self._items) < self.flush_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+            if not self._items:
+                if self._stopping:
+                    return
+                continue
+
+            if await self.flush():
+                backoff = self.retry_backoff
+                continue
+
+            if self._stopping:
+                # 只在 stop() 的超时时间内重试：等完本次间隔后已来不及写完一批（按上次写入耗时估计）就放弃，
+                # 避免在写入中途被 stop() 的超时取消
+                remaining = self._stop_deadline - time.monotonic() - self.last_flush_seconds
+                if remaining <= backoff:
+                    logger.error(f"❌ {self.name} 关闭时写入持续失败，丢弃 {len(self._items)} 条")
+                    return
+                await asyncio.sleep(backoff)
+            else:
+                try:
+                    # 退避期间调用 stop() 时立即重试，不必等满本次间隔
+                    await asyncio.wait_for(self._stop_requested.wait(), backoff)
+                except asyncio.TimeoutError:
+                    pass
+            backoff = min(backoff * 2, MAX_RETRY_BACKOFF)
+
+    async def flush(self) -> bool:
+        """写入一批，返回是否成功
+
+        暂时性错误时未写入的数据放回缓冲区头部；数据错误时二分拆批，只丢弃单独写入仍失败的条目
+        """
+        batch = self._items[: self.flush_size]
+        del self._items[: len(batch)]
+        start = time.perf_counter()
+        # 待写入的分片，从尾部取出，保持原有顺序
+        parts = [batch]
+        while parts:
+            part = parts.pop()
+            try:
+                await self.sink(part)
+            except Exception as e:
+                if self.is_permanent is not None and self.is_permanent(e):
+                    if len(part) > 1:
+                        middle = len(part) // 2
+                        parts.append(part[middle:])
+                        parts.append(part[:middle])
+                    else:
+                        self._drop(part[0], e)
+                    continue
+                unwritten = [item for rest in [part, *reversed(parts)] for item in rest]
+                self._items[:0] = unwritten
+                self.flush_failures += 1
+                logger.error(f"❌ {self.name} 批量写入失败（{len(unwritten)} 条，稍后重试）: {e}")
+                return False
+            self.flushed += len(part)
+        self.last_flush_seconds = time.perf_counter() - start
+        self.flushes += 1
+        return True
+
+    def _drop(self, item: T, error: BaseException):
+        self.dropped += 1
+        logger.error(
+            f"❌ {self.name} 数据无法写入，已丢弃: {error!r} "
+            f"{repr(item)[:DROPPED_ITEM_LOG_CHARS]}"
+        )
+
+    def render_prometheus(self) -> List[str]:
+        """缓冲区指标（Prometheus 文本格式），可注册到 MetricsRegistry"""
+        label = f'{{buffer="{self.name}"}}'
+        return [
+            "# HELP write_behind_buffered Items waiting in the write-behind buffer.",
+            "# TYPE write_behind_buffered gauge",
+            f"write_behind_buffered{label} {len(self._items)}",
+            "# HELP write_behind_accepted_total Items accepted into the buffer.",
+            "# TYPE write_behind_accepted_total counter",
+            f"write_behind_accepted_total{label} {self.accepted}",
+            "# HELP write_behind_rejected_total Items rejected because the buffer was full.",
+            "# TYPE write_behind_rejected_total counter",
+            f"write_behind_rejected_total{label} {self.rejected}",
+            "# HELP write_behind_flushed_total Items written to the sink.",
+            "# TYPE write_behind_flushed_total counter",
+            f"write_behind_flushed_total{label} {self.flushed}",
+            "# HELP write_behind_flush_failures_total Failed batch writes.",
+            "# TYPE write_behind_flush_failures_total counter",
+            f"write_behind_flush_failures_total{label} {self.flush_failures}",
+            "# HELP write_behind_dropped_total Items dropped because the sink rejected them permanently.",
+            "# TYPE write_behind_dropped_total counter",
+            f"write_behind_dropped_total{label} {self.dropped}",
+        ]
@@ -3,18 +3,32 @@
 """
 应用配置管理模块
 从 config.ini 文件读取配置信息
+
+配置文件变化时（后台线程轮询 mtime）重新解析并构建新的不可变 AppConfig，整体替换引用；
+读取方直接拿到当前快照，无需加锁。订阅者会收到变化的字段，用于调整连接池、超时等运行时参数
 """
 
 import os
 import configparser
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Iterable, List, Tuple
+from dataclasses import dataclass, fields
+
+# 订阅回调：callback(新配置, {字段名: (旧值, 新值)})
+ConfigSubscriber = Callable[["AppConfig", Dict[str, Tuple[Any, Any]]], None]
+
+
+def _get_logger():
+    # 延迟导入，避免配置模块在导入时初始化日志系统
+    from common.log import EnhancedLog
 
+    return EnhancedLog.get_logger("config")
 
-@dataclass
+
+@dataclass(frozen=True)
 class AppConfig:
-    """应用配置数据类"""
+    """应用配置数据类（不可变快照）"""
 
     # 服务配置
     service_port: int = 8080
@@ -52,95 +66,124 @@ class AppConfig:
 
 
 class ConfigManager:
-    """配置管理器"""
-
-    def __init__(self, config_file: str = "config/config.ini"):
+    """配置管理器
+
+    Args:
+        config_file: 配置文件路径
+        watch_interval: 检查配置文件变化的间隔（秒），0 表示不监听
+    """
+
+    def __init__(
+        self,
+        config_file: str = "config/config.ini",
+        watch_interval: float = float(os.getenv("CONFIG_WATCH_INTERVAL", "2")),
+    ):
         self.config_file = Path(config_file)
+        self.watch_interval = watch_interval
         self.config = configparser.ConfigParser()
         self._app_config: Optional[AppConfig] = None
+        self._file_signature: Optional[Tuple[int, int, int]] = None
+        self._subscribers: List[Tuple[ConfigSubscriber, Optional[frozenset]]] = []
+        self._reload_lock = threading.Lock()
+        self._watch_stop = threading.Event()
+        self._watch_thread: Optional[threading.Thread] = None
+        self.reload_count = 0
+        self.reload_errors = 0
         self._load_config()
 
-    def _load_config(self):
-        """加载配置文件"""
+    def _file_stat(self) -> Tuple[int, int, int]:
+        # 编辑器保存时常用"写临时文件再重命名"，inode 也纳入比较
+        stat = self.config_file.stat()
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_config(self) -> Tuple[configparser.ConfigParser, Tuple[int, int, int]]:
+        """解析配置文件，返回新的解析结果，不修改当前状态"""
         if not self.config_file.exists():
             raise FileNotFoundError(f"配置文件不存在: {self.config_file}")
 
+        signature = self._file_stat()
+        parser = configparser.ConfigParser()
         try:
-            self.config.read(self.config_file, encoding="utf-8")
+            with open(self.config_file, encoding="utf-8") as f:
+                parser.read_file(f)
         except Exception as e:
             raise Exception(f"读取配置文件失败: {e}")
+        return parser, signature
+
+    def _load_config(self):
+        """加载配置文件"""
+        self.config, self._file_signature = self._read_config()
 
     def get_current_env(self) -> str:
         """获取当前环境"""
+        return self._current_env(self.config)
+
+    @staticmethod
+    def _current_env(parser: configparser.ConfigParser) -> str:
         # 优先从环境变量获取
         env_from_var = os.getenv("APP_ENV")
         if env_from_var:
             return env_from_var.upper()
 
         # 从配置文件获取
-        if self.config.has_section("ENV") and self.config.has_option("ENV", "ENV"):
-            return self.config.get("ENV", "ENV").upper()
+        if parser.has_section("ENV") and parser.has_option("ENV", "ENV"):
+            return parser.get("ENV", "ENV").upper()
 
         return "DEMO"  # 默认环境
 
     def get_app_config(self) -> AppConfig:
-        """获取应用配置"""
-        if self._app_config is None:
-            self._app_config = self._build_app_config()
-        return self._app_config
+        """获取应用配置
+
+        返回当前的不可变快照，热点路径上直接调用即可（只是一次属性读取）；
+        同一次处理中需要多个字段时，取一次快照后复用，保证字段之间一致
+        """
+        config = self._app_config
+        if config is None:
+            config = self._app_config = self._build_app_config(self.config)
+        return config
 
-    def _build_app_config(self) -> AppConfig:
+    def _build_app_config(self, parser: configparser.ConfigParser) -> AppConfig:
         """构建应用配置"""
-        env = self.get_current_env()
+        env = self._current_env(parser)
 
-        if not self.config.has_section(env):
+        if not parser.has_section(env):
             raise Exception(f"配置文件中没有找到环境 [{env}] 的配置")
 
-        section = self.config[env]
-
-        # 构建配置对象
-        config = AppConfig()
-        config.environment = env
-
-        # 服务配置
-        config.service_port = section.getint("SERVICE_PORT", fallback=8080)
-        config.typo_port = section.getint("TYPO_PORT", fallback=4781)
-
-        # 数据库配置
-        config.host = section.get("HOST", fallback=None)
-        config.port = (
-            section.getint("PORT", fallback=None) if section.get("PORT") else None
-        )
-        config.user = section.get("USER", fallback=None)
-        config.password = section.get("PASSWORD", fallback=None)
-        config.name = section.get("NAME", fallback=None)
-
-        # 服务发现配置
-        config.server_addresses = section.get("SERVER_ADDRESSES", fallback=None)
-        config.namespace = section.get("NAMESPACE", fallback=None)
-
-        # Elasticsearch配置
-        config.elasticsearch_host = section.get("ELASTICSEARCH_HOST", fallback=None)
-        config.elasticsearch_port = (
-            section.getint("ELASTICSEARCH_PORT", fallback=None)
-            if section.get("ELASTICSEARCH_PORT")
-            else None
+        section = parser[env]
+
+        return AppConfig(
+            environment=env,
+            # 服务配置
+            service_port=section.getint("SERVICE_PORT", fallback=8080),
+            typo_port=section.getint("TYPO_PORT", fallback=4781),
+            # 数据库配置
+            host=section.get("HOST", fallback=None),
+            port=section.getint("PORT", fallback=None) if section.get("PORT") else None,
+            user=section.get("USER", fallback=None),
+            password=section.get("PASSWORD", fallback=None),
+            name=section.get("NAME", fallback=None),
+            # 服务发现配置
+            server_addresses=section.get("SERVER_ADDRESSES", fallback=None),
+            namespace=section.get("NAMESPACE", fallback=None),
+            # Elasticsearch配置
+            elasticsearch_host=section.get("ELASTICSEARCH_HOST", fallback=None),
+            elasticsearch_port=(
+                section.getint("ELASTICSEARCH_PORT", fallback=None)
+                if section.get("ELASTICSEARCH_PORT")
+                else None
+            ),
+            # 应用配置
+            prefix=section.get("PREFIX", fallback="app"),
+            disable_rocketmq=section.getboolean("DISABLE_ROCKETMQ", fallback=True),
+            inner_url=section.get("INNER_URL", fallback=None),
+            # LLM配置
+            default_timeout=section.getint("DEFAULT_TIMEOUT", fallback=10),
+            image_timeout=section.getint("IMAGE_TIMEOUT", fallback=15),
+            time_out_fixed=section.getint("TIME_OUT_FIXED", fallback=30),
+            default_model=section.get("DEFAULT_MODEL", fallback="azure-gpt4o"),
+            model_backup=section.get("MODEL_BACKUP", fallback="gpt-4.1"),
         )
 
-        # 应用配置
-        config.prefix = section.get("PREFIX", fallback="app")
-        config.disable_rocketmq = section.getboolean("DISABLE_ROCKETMQ", fallback=True)
-        config.inner_url = section.get("INNER_URL", fallback=None)
-
-        # LLM配置
-        config.default_timeout = section.getint("DEFAULT_TIMEOUT", fallback=10)
-        config.image_timeout = section.getint("IMAGE_TIMEOUT", fallback=15)
-        config.time_out_fixed = section.getint("TIME_OUT_FIXED", fallback=30)
-        config.default_model = section.get("DEFAULT_MODEL", fallback="azure-gpt4o")
-        config.model_backup = section.get("MODEL_BACKUP", fallback="gpt-4.1")
-
-        return config
-
     def get_config_value(self, section: str, key: str, fallback: Any = None) -> Any:
         """获取指定配置值"""
         if not self.config.has_section(section):
@@ -155,10 +198,111 @@ class ConfigManager:
             result[section_name] = dict(self.config[section_name])
         return result
 
-    def reload_config(self):
-        """重新加载配置"""
-        self._app_config = None
-        self._load_config()
+    def subscribe(
+        self, callback: ConfigSubscriber, fields_of_interest: Optional[Iterable[str]] = None
+    ) -> Callable[[], None]:
+        """订阅配置变化，返回取消订阅的函数
+
+        Args:
+            callback: callback(新配置, {字段名: (旧值, 新值)})，在执行重载的线程中同步调用，
+                需要操作事件循环上的对象时请自行通过 loop.call_soon_threadsafe 转交
+            fields_of_interest: 只关心的字段，为 None 时任何字段变化都会通知
+        """
+        entry = (callback, frozenset(fields_of_interest) if fields_of_interest else None)
+        self._subscribers = self._subscribers + [entry]
+
+        def unsubscribe():
+            self._subscribers = [item for item in self._subscribers if item is not entry]
+
+        return unsubscribe
+
+    def reload_config(self) -> Dict[str, Tuple[Any, Any]]:
+        """重新加载配置，返回变化的字段
+
+        新配置完整构建成功后才整体替换，解析失败时抛出异常并保留原配置
+        """
+        with self._reload_lock:
+            parser, signature = self._read_config()
+            new_config = self._build_app_config(parser)
+            old_config = self.get_app_config()
+
+            # 各自一次引用赋值，读取方看到的要么是旧快照要么是新快照
+            self.config = parser
+            self._app_config = new_config
+            self._file_signature = signature
+            self.reload_count += 1
+
+            changed = {
+                field.name: (getattr(old_config, field.name), getattr(new_config, field.name))
+                for field in fields(AppConfig)
+                if getattr(old_config, field.name) != getattr(new_config, field.name)
+            }
+
+        if changed:
+            self._notify(new_config, changed)
+        return changed
+
+    def _notify(self, config: AppConfig, changed: Dict[str, Tuple[Any, Any]]):
+        for callback, interest in self._subscribers:
+            if interest is not None and interest.isdisjoint(changed):
+                continue
+            subset = changed if interest is None else {
+                name: value for name, value in changed.items() if name in interest
+            }
+            try:
+                callback(config, subset)
+            except Exception:
+                _get_logger().exception(f"配置变更订阅者执行失败: {callback!r}")
+
+    def check_for_changes(self) -> bool:
+        """配置文件有变化时重新加载，返回是否发生了重载"""
+        try:
+            signature = self._file_stat()
+        except FileNotFoundError:
+            # 文件被替换的瞬间可能短暂不存在，下一轮再检查
+            return False
+        if signature == self._file_signature:
+            return False
+
+        try:
+            changed = self.reload_config()
+        except Exception as e:
+            # 记下签名，文件修正前不再重复报错
+            self._file_signature = signature
+            self.reload_errors += 1
+            _get_logger().error(f"❌ 配置重载失败，继续使用原配置: {e}")
+            return False
+
+        if changed:
+            summary = ", ".join(
+                f"{name}: ***" if name == "password" else f"{name}: {old!r} -> {new!r}"
+                for name, (old, new) in changed.items()
+            )
+            _get_logger().info(f"🔧 配置已重载 | {summary}")
+        return True
+
+    def start_watching(self, interval: Optional[float] = None):
+        """启动后台线程监听配置文件变化"""
+        interval = self.watch_interval if interval is None else interval
+        if interval <= 0 or self._watch_thread is not None:
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch, args=(interval,), name="config-watcher", daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        """停止监听"""
+        if self._watch_thread is None:
+            return
+        self._watch_stop.set()
+        self._watch_thread.join()
+        self._watch_thread = None
+
+    def _watch(self, interval: float):
+        while not self._watch_stop.wait(interval):
+            self.check_for_changes()
 
     def print_current_config(self):
         """打印当前配置信息"""
@@ -0,0 +1 @@
+from .base import AsyncRepository, Page, UnsupportedDialect, decode_cursor, encode_cursor
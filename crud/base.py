@@ -0,0 +1,380 @@
+"""
+通用异步 CRUD 仓储
+基于 Base 声明式模型提供批量插入、ON CONFLICT 批量 upsert、Postgres COPY 批量导入、
+按索引列的 keyset（seek）分页与列投影，列表查询的代价只与页大小有关，与偏移量无关
+"""
+
+import base64
+import datetime
+import decimal
+import json
+import uuid
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+from sqlalchemy import and_, insert, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+ModelT = TypeVar("ModelT")
+RowT = TypeVar("RowT")
+
+# 单条语句的绑定参数上限
+MAX_BIND_PARAMS = {"postgresql": 32767, "sqlite": 32766}
+DEFAULT_MAX_BIND_PARAMS = 999
+
+
+class UnsupportedDialect(ValueError):
+    """当前数据库方言不支持该操作（如 upsert 仅支持 Postgres 与 SQLite）"""
+
+    def __init__(self, operation: str, dialect: str):
+        super().__init__(f"{operation} 暂不支持 {dialect}")
+        self.operation = operation
+        self.dialect = dialect
+
+
+@dataclass
+class Page:
+    """keyset 分页结果，next_cursor 为 None 表示没有下一页"""
+
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"无法编码游标值: {value!r}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """把排序键的值编码为不透明游标"""
+    raw = json.dumps(list(values), default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"无效的分页游标: {cursor}")
+    return values
+
+
+def _coerce(column, value: Any) -> Any:
+    """游标中的字符串按列类型还原（asyncpg 不做隐式类型转换）"""
+    if value is None or not isinstance(value, str):
+        return value
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    if python_type is datetime.date:
+        return datetime.date.fromisoformat(value)
+    if python_type is datetime.time:
+        return datetime.time.fromisoformat(value)
+    if python_type in (decimal.Decimal, uuid.UUID):
+        return python_type(value)
+    return value
+
+
+def _batches(rows: Iterable[RowT], size: int) -> Iterator[List[RowT]]:
+    batch: List[RowT] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class AsyncRepository(Generic[ModelT]):
+    """通用异步仓储
+
+    Args:
+        model: Base 声明式模型类
+
+    示例:
+        records = AsyncRepository(SearchRecordModel)
+        page = await records.page(session, order_by=["-search_time"], limit=50,
+                                  columns=["id", "user_id", "search_time"])
+        await records.upsert(session, rows, conflict_columns=["id"])
+    """
+
+    def __init__(self, model: Type[ModelT]):
+        self.model = model
+        self.table = model.__table__
+        self.primary_key: Tuple[str, ...] = tuple(c.name for c in self.table.primary_key.columns)
+        # 列名 -> 模型属性名（两者可以不同）
+        mapper = model.__mapper__
+        self._attributes: Dict[str, str] = {
+            column.name: mapper.get_property_by_column(column).key
+            for column in self.table.columns
+        }
+
+    # ------------------------------------------------------------------ 读取
+
+    def _column(self, name: str):
+        try:
+            return self.table.c[name]
+        except KeyError:
+            raise ValueError(f"{self.table.name} 没有列 {name}") from None
+
+    def _select(self, columns: Optional[Sequence[str]]):
+        if columns:
+            return select(*(self._column(name) for name in columns))
+        return select(self.model)
+
+    async def get(self, session: AsyncSession, ident: Any) -> Optional[ModelT]:
+        return await session.get(self.model, ident)
+
+    async def get_many(
+        self,
+        session: AsyncSession,
+        ids: Sequence[Any],
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        """按单列主键批量读取，columns 指定时只查询这些列并返回字典"""
+        if len(self.primary_key) != 1:
+            raise ValueError("get_many 仅支持单列主键")
+        if not ids:
+            return []
+        stmt = self._select(columns).where(self._column(self.primary_key[0]).in_(list(ids)))
+        return await self._fetch(session, stmt, columns)
+
+    async def _fetch(self, session: AsyncSession, stmt, columns) -> List[Any]:
+        result = await session.execute(stmt)
+        if columns:
+            return [dict(row) for row in result.mappings()]
+        return list(result.scalars())
+
+    def _order_columns(self, order_by: Sequence[str]) -> List[Tuple[Any, bool]]:
+        """解析排序键（"-" 前缀表示降序），并补上主键保证排序唯一"""
+        keys: List[Tuple[Any, bool]] = []
+        names = set()
+        for key in order_by:
+            descending = key.startswith("-")
+            name = key.lstrip("-+")
+            keys.append((self._column(name), descending))
+            names.add(name)
+        default_descending = keys[-1][1] if keys else False
+        for name in self.primary_key:
+            if name not in names:
+                keys.append((self._column(name), default_descending))
+        return keys
+
+    @staticmethod
+    def _seek_predicate(keys: List[Tuple[Any, bool]], values: Sequence[Any]) -> ColumnElement:
+        """游标之后的行：方向一致时用行值比较（可直接走复合索引），否则展开为 OR 链"""
+        directions = {descending for _, descending in keys}
+        if len(directions) == 1:
+            left = tuple_(*(column for column, _ in keys))
+            right = tuple_(*values)
+            return left < right if directions.pop() else left > right
+
+        clauses = []
+        for index, (column, descending) in enumerate(keys):
+            equal = [keys[i][0] == values[i] for i in range(index)]
+            step = column < values[index] if descending else column > values[index]
+            clauses.append(and_(*equal, step))
+        return or_(*clauses)
+
+    async def page(
+        self,
+        session: AsyncSession,
+        order_by: Sequence[str] = (),
+        limit: int = 50,
+        after: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+        where: Sequence[ColumnElement] = (),
+        **filters: Any,
+    ) -> Page:
+        """keyset 分页
+
+        Args:
+            session: 数据库会话
+            order_by: 排序列，"-" 前缀为降序；主键自动追加为最后的排序键。排序列上应有（复合）索引
+            limit: 每页条数
+            after: 上一页返回的 next_cursor
+            columns: 只查询这些列（返回字典），为空时返回模型对象
+            where: 额外的过滤条件
+            **filters: 等值过滤条件
+        """
+        keys = self._order_columns(order_by)
+        key_names = [column.name for column, _ in keys]
+
+        selected = list(columns) if columns else None
+        if selected is not None:
+            # 生成游标需要排序列的值，查询后再去掉
+            selected += [name for name in key_names if name not in selected]
+
+        stmt = self._select(selected)
+        conditions = list(where) + [self._column(name) == value for name, value in filters.items()]
+        if after is not None:
+            values = decode_cursor(after)
+            if len(values) != len(keys):
+                raise ValueError("分页游标与排序列不匹配")
+            values = [_coerce(column, value) for (column, _), value in zip(keys, values)]
+            conditions.append(self._seek_predicate(keys, values))
+        if conditions:
+            stmt = stmt.where(*conditions)
+        stmt = stmt.order_by(
+            *(column.desc() if descending else column.asc() for column, descending in keys)
+        ).limit(limit + 1)
+
+        items = await self._fetch(session, stmt, selected)
+        has_more = len(items) > limit
+        items = items[:limit]
+
+        next_cursor = None
+        if has_more and items:
+            last = items[-1]
+            if selected is not None:
+                next_cursor = encode_cursor([last[name] for name in key_names])
+            else:
+                next_cursor = encode_cursor(
+                    [getattr(last, self._attributes[name]) for name in key_names]
+                )
+
+        if columns and selected is not None and len(selected) > len(columns):
+            wanted = list(columns)
+            items = [{name: item[name] for name in wanted} for item in items]
+        return Page(items=items, next_cursor=next_cursor)
+
+    # ------------------------------------------------------------------ 写入
+
+    def _batch_size(self, session: AsyncSession, columns: int, requested: int) -> int:
+        limit = MAX_BIND_PARAMS.get(session.get_bind().dialect.name, DEFAULT_MAX_BIND_PARAMS)
+        return max(1, min(requested, limit // max(columns, 1)))
+
+    async def bulk_insert(
+        self,
+        session: AsyncSession,
+        rows: Iterable[Mapping[str, Any]],
+        batch_size: int = 1000,
+    ) -> int:
+        """分批执行多行 INSERT ... VALUES，返回插入行数；事务由调用方提交"""
+        count = 0
+        size = self._batch_size(session, len(self.table.columns), batch_size)
+        for batch in _batches(rows, size):
+            await session.execute(insert(self.table).values(batch))
+            count += len(batch)
+        return count
+
+    def _dialect_insert(self, session: AsyncSession):
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert
+        if dialect == "sqlite":
+            return sqlite.insert
+        raise UnsupportedDialect("upsert", dialect)
+
+    async def upsert(
+        self,
+        session: AsyncSession,
+        rows: Iterable[Mapping[str, Any]],
+        conflict_columns: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+    ) -> int:
+        """分批 INSERT ... ON CONFLICT DO UPDATE，返回处理行数
+
+        Args:
+            rows: 待写入的行
+            conflict_columns: 冲突判定列（需有唯一约束），默认主键
+            update_columns: 冲突时更新的列，默认除冲突列外的所有列；传空列表表示 DO NOTHING
+        """
+        conflict = list(conflict_columns or self.primary_key)
+        dialect_insert = self._dialect_insert(session)
+        size = self._batch_size(session, len(self.table.columns), batch_size)
+
+        count = 0
+        for batch in _batches(rows, size):
+            stmt = dialect_insert(self.table).values(batch)
+            if update_columns is None:
+                updates = [name for name in batch[0] if name not in conflict]
+            else:
+                updates = list(update_columns)
+            if updates:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=conflict,
+                    set_={name: stmt.excluded[name] for name in updates},
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=conflict)
+            await session.execute(stmt)
+            count += len(batch)
+        return count
+
+    async def copy_insert(
+        self,
+        session: AsyncSession,
+        rows: Iterable[Union[Mapping[str, Any], Sequence[Any]]],
+        columns: Sequence[str],
+        batch_size: int = 10000,
+    ) -> int:
+        """Postgres 使用 COPY 批量导入（asyncpg copy_records_to_table），其它数据库退化为 bulk_insert
+
+        rows 按 batch_size 分块逐块 COPY，内存占用与总行数无关，可传入生成器
+
+        Args:
+            rows: 字典，或与 columns 顺序一致的元组
+            columns: 导入的列
+            batch_size: 每次 COPY 的行数
+        """
+        records = (
+            tuple(row[name] for name in columns) if isinstance(row, Mapping) else tuple(row)
+            for row in rows
+        )
+
+        connection = await session.connection()
+        if connection.dialect.driver != "asyncpg":
+            return await self.bulk_insert(
+                session, (dict(zip(columns, record)) for record in records)
+            )
+
+        raw = await connection.get_raw_connection()
+        count = 0
+        for batch in _batches(records, batch_size):
+            await raw.driver_connection.copy_records_to_table(
+                self.table.name,
+                records=batch,
+                columns=list(columns),
+                schema_name=self.table.schema,
+            )
+            count += len(batch)
+        return count
+
+    async def delete_many(self, session: AsyncSession, ids: Sequence[Any]) -> int:
+        """按单列主键批量删除，返回删除行数"""
+        if len(self.primary_key) != 1:
+            raise ValueError("delete_many 仅支持单列主键")
+        if not ids:
+            return 0
+        result = await session.execute(
+            self.table.delete().where(self._column(self.primary_key[0]).in_(list(ids)))
+        )
+        return result.rowcount
@@ -1 +1,8 @@
-from .database import SessionLocal, Base, engine
\ No newline at end of file
+def __getattr__(name: str):
+    # 按需导入 database（会加载 SQLAlchemy），导入 db.es 等子模块时不受影响；
+    # engine / SessionLocal 为兼容旧代码保留，首次访问时创建
+    if name in ("Base", "dispose_engine", "get_engine", "get_session", "get_session_factory", "engine", "SessionLocal"):
+        from . import database
+
+        return getattr(database, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,27 +1,203 @@
-from config import Config
-from elasticsearch import Elasticsearch
+"""
+Elasticsearch 客户端
+全进程共用一个 AsyncElasticsearch（连接池 + keep-alive），在应用 lifespan 中创建与关闭，
+地址取自 AppConfig（ELASTICSEARCH_HOST/PORT），设置 ELASTICSEARCH_URL 时优先使用（memory:// 为进程内替身）；
+连接池、超时重试与节点嗅探参数取自环境变量。需安装 elasticsearch[async]
+"""
 
+import asyncio
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-def get_es():
-    cfg = Config()
-    ELASTICSEARCH_HOST = cfg.get_config("ELASTICSEARCH_HOST")
-    ELASTICSEARCH_PORT = cfg.get_config("ELASTICSEARCH_PORT")
-    es = Elasticsearch([{"host": ELASTICSEARCH_HOST, "port": ELASTICSEARCH_PORT}])
-    return es
+from fastapi import HTTPException
 
+from config.app_config import AppConfig, config_manager, get_config
 
-def create_index_mapping(es, schema, index_name):
-    # 获取 UserLoginLog 模型的字段信息
-    schema = schema.schema()
+if TYPE_CHECKING:
+    from elasticsearch import AsyncElasticsearch, Elasticsearch
 
-    # 构建 Elasticsearch 的索引映射
-    properties = {
-        field_name: {"type": "keyword"}  # 将所有字段都映射为 keyword 类型
-        for field_name in schema["properties"].keys()
+# 连接池与请求配置
+CONNECTIONS_PER_NODE = int(os.getenv("ES_CONNECTIONS_PER_NODE", "10"))
+KEEPALIVE_TIMEOUT = float(os.getenv("ES_KEEPALIVE_TIMEOUT", "60"))
+REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("ES_MAX_RETRIES", "3"))
+RETRY_ON_TIMEOUT = os.getenv("ES_RETRY_ON_TIMEOUT", "true").lower() == "true"
+HTTP_COMPRESS = os.getenv("ES_HTTP_COMPRESS", "false").lower() == "true"
+# 节点嗅探：启动时 / 节点失败时从集群获取节点列表，单节点或经负载均衡访问时保持关闭
+SNIFF_ON_START = os.getenv("ES_SNIFF_ON_START", "false").lower() == "true"
+SNIFF_ON_NODE_FAILURE = os.getenv("ES_SNIFF_ON_NODE_FAILURE", "false").lower() == "true"
+MIN_DELAY_BETWEEN_SNIFFING = float(os.getenv("ES_MIN_DELAY_BETWEEN_SNIFFING", "60"))
+
+# ELASTICSEARCH_URL 使用该前缀时创建进程内替身
+MEMORY_SCHEME = "memory://"
+
+# 这些字段变化时需要重建客户端
+CONNECTION_FIELDS = ("elasticsearch_host", "elasticsearch_port")
+
+_client: Optional["AsyncElasticsearch"] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_subscribed = False
+_sync_client: Optional["Elasticsearch"] = None
+
+
+def build_hosts(config: Optional[AppConfig] = None) -> List[str]:
+    """根据 ELASTICSEARCH_URL（可用逗号分隔多个节点）或 AppConfig 构建节点地址"""
+    override = os.getenv("ELASTICSEARCH_URL")
+    if override:
+        return [url.strip() for url in override.split(",") if url.strip()]
+
+    config = config or get_config()
+    if not config.elasticsearch_host:
+        raise RuntimeError(
+            f"环境 [{config.environment}] 未配置 ELASTICSEARCH_HOST，可设置 ELASTICSEARCH_URL"
+        )
+    host = config.elasticsearch_host
+    if "://" not in host:
+        host = f"http://{host}"
+    return [f"{host}:{config.elasticsearch_port or 9200}"]
+
+
+@lru_cache(maxsize=None)
+def _keepalive_node_class():
+    """aiohttp 节点类，空闲连接保持 KEEPALIVE_TIMEOUT 秒（aiohttp 默认 15 秒）
+
+    客户端选项不包含 keep-alive 时长：会话仍由 AiohttpHttpNode 创建（保留其 loop、SSL、
+    enable_cleanup_closed 等设置），创建后只调整连接器的空闲保持时间；
+    aiohttp 改动该属性时退回默认值，不影响请求
+    """
+    from elastic_transport import AiohttpHttpNode
+
+    class KeepAliveAiohttpNode(AiohttpHttpNode):
+        def _create_aiohttp_session(self) -> None:
+            super()._create_aiohttp_session()
+            connector = self.session.connector
+            if connector is not None and not connector.force_close and hasattr(connector, "_keepalive_timeout"):
+                connector._keepalive_timeout = KEEPALIVE_TIMEOUT
+
+    return KeepAliveAiohttpNode
+
+
+def client_options() -> Dict[str, Any]:
+    """客户端连接池、超时重试与嗅探参数"""
+    return {
+        "connections_per_node": CONNECTIONS_PER_NODE,
+        "request_timeout": REQUEST_TIMEOUT,
+        "max_retries": MAX_RETRIES,
+        "retry_on_timeout": RETRY_ON_TIMEOUT,
+        "http_compress": HTTP_COMPRESS,
+        "sniff_on_start": SNIFF_ON_START,
+        "sniff_on_node_failure": SNIFF_ON_NODE_FAILURE,
+        "min_delay_between_sniffing": MIN_DELAY_BETWEEN_SNIFFING,
     }
 
-    # 创建索引映射
-    body = {"mappings": {"properties": properties}}
 
-    # 创建索引
-    es.indices.create(index=index_name, body=body)
+def create_es_client(hosts: Optional[List[str]] = None) -> "AsyncElasticsearch":
+    """按当前配置创建一个新的异步客户端（一般应使用共享客户端 get_es_client）
+
+    地址为 memory:// 时使用进程内替身 db.local_es.LocalElasticsearch（memory:///dir 为快照目录）
+    """
+    hosts = hosts or build_hosts()
+    if hosts[0].startswith(MEMORY_SCHEME):
+        from .local_es import LocalElasticsearch
+
+        return LocalElasticsearch(snapshot_dir=hosts[0][len(MEMORY_SCHEME):] or None)
+
+    from elasticsearch import AsyncElasticsearch
+
+    return AsyncElasticsearch(
+        hosts, node_class=_keepalive_node_class(), **client_options()
+    )
+
+
+async def init_es() -> Optional["AsyncElasticsearch"]:
+    """创建进程内共享的异步客户端，在应用启动时调用；未安装 elasticsearch 或未配置地址时跳过"""
+    global _client, _client_loop, _subscribed
+    if _client is not None:
+        return _client
+
+    from common.log import EnhancedLog
+
+    logger = EnhancedLog.get_logger("es")
+    try:
+        hosts = build_hosts()
+        client = create_es_client(hosts)
+    except ImportError:
+        logger.warning("⚠️ 未安装 elasticsearch[async]，跳过 Elasticsearch 客户端初始化")
+        return None
+    except RuntimeError as e:
+        logger.warning(f"⚠️ {e}，跳过 Elasticsearch 客户端初始化")
+        return None
+
+    _client, _client_loop = client, asyncio.get_running_loop()
+    if not _subscribed:
+        config_manager.subscribe(_on_config_change, CONNECTION_FIELDS)
+        _subscribed = True
+    logger.info(f"✅ Elasticsearch 客户端已创建: {', '.join(hosts)}")
+    return client
+
+
+def current_es_client() -> Optional["AsyncElasticsearch"]:
+    """共享的异步客户端，未初始化（未安装或未配置）时返回 None"""
+    return _client
+
+
+def get_es_client() -> "AsyncElasticsearch":
+    """路由依赖：返回共享的异步客户端，未初始化时返回 503"""
+    if _client is None:
+        raise HTTPException(status_code=503, detail="Elasticsearch 不可用")
+    return _client
+
+
+def _on_config_change(config: AppConfig, changed):
+    """地址变化：在事件循环上换用新客户端，关闭旧客户端（进行中的请求会以连接错误结束）"""
+    old, loop = _client, _client_loop
+    if old is None or loop is None or loop.is_closed():
+        return
+
+    def swap():
+        global _client
+        try:
+            _client = create_es_client(build_hosts(config))
+        except RuntimeError:
+            _client = None
+        loop.create_task(old.close())
+
+    loop.call_soon_threadsafe(swap)
+
+
+async def close_es():
+    """关闭连接池，在应用关闭时调用"""
+    global _client, _client_loop
+    client, _client, _client_loop = _client, None, None
+    if client is not None:
+        await client.close()
+
+
+def get_es() -> "Elasticsearch":
+    """同步客户端（脚本、Celery 任务使用），进程内只创建一次"""
+    global _sync_client
+    if _sync_client is None:
+        from elasticsearch import Elasticsearch
+
+        _sync_client = Elasticsearch(build_hosts(), **client_options())
+    return _sync_client
+
+
+def create_index_mapping(es, schema, index_name, overrides=None, settings=None):
+    """按 Pydantic 模型字段类型创建索引（同步客户端）；带版本别名的索引管理见 db.es_index
+
+    Args:
+        es: 同步 Elasticsearch 客户端
+        schema: Pydantic 模型
+        index_name: 索引名
+        overrides: 字段映射覆盖，见 db.es_index.build_mapping
+        settings: 索引设置
+    """
+    from .es_index import build_mapping
+
+    es.indices.create(
+        index=index_name,
+        mappings=build_mapping(schema, overrides),
+        settings=settings,
+    )
@@ -0,0 +1,87 @@
+"""
+搜索记录回填：按主键 keyset 分页读取 search_records 表，并行批量写入 Elasticsearch
+读取速度受写入背压控制，内存占用与表大小无关
+
+运行: python -m db.es_backfill [--concurrency 4] [--max-docs 1000] [--after <cursor>]
+"""
+
+import argparse
+import asyncio
+from typing import AsyncIterator, Optional
+
+from .database import dispose_engine, get_session_factory
+from .es import close_es, init_es
+from .es_bulk import BulkStats, bulk_index
+from .es_index import ensure_index, search_record_index
+
+
+async def iter_search_records(page_size: int = 1000, after: Optional[str] = None) -> AsyncIterator:
+    """按主键顺序逐条产出 SearchRecord，每页使用独立会话，避免长事务"""
+    from api.api_v1.search_records import search_record_repository
+    from schemas.search import SearchRecord, SearchResult
+
+    cursor = after
+    while True:
+        async with get_session_factory()() as session:
+            page = await search_record_repository.page(session, order_by=["id"], limit=page_size, after=cursor)
+        for row in page.items:
+            yield SearchRecord(
+                id=row.id,
+                user_id=row.user_id,
+                user_grade_id=row.user_grade_id,
+                search_content=row.search_content,
+                search_time=row.search_time,
+                search_results_id=SearchResult(id=row.search_results_id),
+                search_results_id_list=row.search_results_id_list,
+                search_time_taken=row.search_time_taken,
+                user_device=row.user_device,
+            )
+        if page.next_cursor is None:
+            return
+        cursor = page.next_cursor
+
+
+async def backfill(
+    page_size: int = 1000,
+    after: Optional[str] = None,
+    **options,
+) -> Optional[BulkStats]:
+    """回填全部搜索记录，options 见 BulkIndexer"""
+    es = await init_es()
+    if es is None:
+        return None
+    try:
+        await ensure_index(es, search_record_index)
+        return await bulk_index(
+            es, search_record_index.alias, iter_search_records(page_size, after), **options
+        )
+    finally:
+        await close_es()
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回填搜索记录到 Elasticsearch")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--after", help="从该分页游标之后继续")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-docs", type=int, default=1000)
+    parser.add_argument("--max-mb", type=float, default=5)
+    args = parser.parse_args()
+    stats = asyncio.run(
+        backfill(
+            page_size=args.page_size,
+            after=args.after,
+            concurrency=args.concurrency,
+            max_docs=args.max_docs,
+            max_bytes=int(args.max_mb * 1024 * 1024),
+        )
+    )
+    if stats is not None:
+        print(stats.summary())
+        for error in stats.errors:
+            print(error)
+
+
+if __name__ == "__main__":
+    main()
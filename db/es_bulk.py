@@ -0,0 +1,253 @@
+"""
+Elasticsearch 并行批量写入
+从同步或异步迭代器逐条读取文档，按字节数与条数打包成 _bulk 请求，最多 N 个请求同时在途；
+在途请求已满时暂停读取上游（背压），单条失败时只重试可重试的条目（429/5xx），按指数退避
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Deque, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from common.log import EnhancedLog
+
+logger = EnhancedLog.get_logger("es_bulk")
+
+# 可重试的状态码：限流与节点暂不可用
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# 保留的失败样本条数
+MAX_ERROR_SAMPLES = 20
+
+Document = Union[BaseModel, Mapping[str, Any]]
+# 一条 bulk 操作：(动作行, 文档行)
+Operation = Tuple[bytes, bytes]
+
+
+class BulkIndexError(Exception):
+    """重试次数用尽后仍有可重试的条目未写入"""
+
+    def __init__(self, stats: "BulkStats"):
+        super().__init__(f"{stats.retry_exhausted} documents were not indexed after retries")
+        self.stats = stats
+
+
+@dataclass
+class BulkStats:
+    """批量写入统计"""
+
+    indexed: int = 0
+    rejected: int = 0
+    retry_exhausted: int = 0
+    retried: int = 0
+    batches: int = 0
+    bytes_sent: int = 0
+    elapsed: float = 0.0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    # 最近一批次请求耗时（秒，含重试）
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=10_000))
+
+    @property
+    def failed(self) -> int:
+        return self.rejected + self.retry_exhausted
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.indexed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def latency_percentile(self, percentile: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def summary(self) -> str:
+        return (
+            f"indexed {self.indexed} docs in {self.elapsed:.2f}s ({self.docs_per_second:.0f} docs/s), "
+            f"{self.batches} batches, {self.bytes_sent / 1e6:.1f} MB, failed {self.failed}, "
+            f"retried {self.retried}, batch p50 {self.latency_percentile(50) * 1e3:.1f}ms "
+            f"p99 {self.latency_percentile(99) * 1e3:.1f}ms"
+        )
+
+
+class BulkIndexer:
+    """并行批量写入器
+
+    Args:
+        es: AsyncElasticsearch
+        index: 目标索引或别名
+        max_bytes: 单个 _bulk 请求的最大字节数
+        max_docs: 单个 _bulk 请求的最大条数
+        concurrency: 同时在途的请求数
+        max_retries: 单条目/整批的最大重试次数
+        retry_backoff: 首次重试间隔（秒），之后指数退避（带随机抖动），最长 30 秒
+        id_field: 作为 _id 的字段，None 表示由 Elasticsearch 生成
+        op_type: index（覆盖）或 create（已存在时跳过）
+    """
+
+    def __init__(
+        self,
+        es,
+        index: str,
+        max_bytes: int = 5 * 1024 * 1024,
+        max_docs: int = 1000,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        id_field: Optional[str] = "id",
+        op_type: str = "index",
+    ):
+        self.es = es
+        self.index = index
+        self.max_bytes = max_bytes
+        self.max_docs = max_docs
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.id_field = id_field
+        self.op_type = op_type
+
+    def _operation(self, document: Document) -> Operation:
+        if isinstance(document, BaseModel):
+            source = document.model_dump_json().encode("utf-8")
+            doc_id = getattr(document, self.id_field) if self.id_field else None
+        else:
+            source = to_json(document)
+            doc_id = document.get(self.id_field) if self.id_field else None
+        meta: Dict[str, Any] = {"_index": self.index}
+        if doc_id is not None:
+            meta["_id"] = str(doc_id)
+        return to_json({self.op_type: meta}), source
+
+    async def run(self, documents: Union[Iterable[Document], AsyncIterable[Document]]) -> BulkStats:
+        """写入全部文档并返回统计；单条目失败记入统计，不抛出异常"""
+        stats = BulkStats()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks: Set[asyncio.Task] = set()
+        failures: List[BaseException] = []
+        start = time.perf_counter()
+
+        def on_done(task: asyncio.Task):
+            tasks.discard(task)
+            slots.release()
+            if not task.cancelled() and task.exception() is not None:
+                failures.append(task.exception())
+
+        async def dispatch(batch: List[Operation], size: int):
+            # 在途请求已满时在这里等待，上游迭代器随之暂停
+            await slots.acquire()
+            if failures:
+                slots.release()
+                raise failures[0]
+            task = asyncio.create_task(self._send(batch, size, stats))
+            tasks.add(task)
+            task.add_done_callback(on_done)
+            # 让新请求立即开始发送，同步迭代器也不会一直占用事件循环
+            await asyncio.sleep(0)
+
+        batch: List[Operation] = []
+        size = 0
+        try:
+            async for document in _iterate(documents):
+                operation = self._operation(document)
+                length = len(operation[0]) + len(operation[1]) + 2
+                if batch and size + length > self.max_bytes:
+                    await dispatch(batch, size)
+                    batch, size = [], 0
+                batch.append(operation)
+                size += length
+                if len(batch) >= self.max_docs:
+                    await dispatch(batch, size)
+                    batch, size = [], 0
+            if batch:
+                await dispatch(batch, size)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            stats.elapsed = time.perf_counter() - start
+        if failures:
+            raise failures[0]
+        return stats
+
+    async def _send(self, batch: List[Operation], size: int, stats: BulkStats):
+        """发送一批，可重试的失败条目退避后单独重发"""
+        from elastic_transport import ConnectionError as TransportConnectionError
+        from elastic_transport import ConnectionTimeout
+        from elasticsearch import ApiError
+
+        start = time.perf_counter()
+        pending = batch
+        attempt = 0
+        while pending:
+            lines = [line for operation in pending for line in operation]
+            stats.bytes_sent += size if attempt == 0 else sum(len(line) + 1 for line in lines)
+            retry: List[Operation] = []
+            try:
+                response = await self.es.bulk(operations=lines)
+            except (ApiError, TransportConnectionError, ConnectionTimeout) as e:
+                status = getattr(e, "status_code", None)
+                if isinstance(e, ApiError) and status not in RETRY_STATUSES:
+                    self._reject(stats, pending, {"status": status, "error": str(e)})
+                    break
+                retry = pending
+            else:
+                if not response.get("errors"):
+                    stats.indexed += len(pending)
+                else:
+                    for operation, item in zip(pending, response["items"]):
+                        result = next(iter(item.values()))
+                        status = result.get("status", 500)
+                        if status < 300:
+                            stats.indexed += 1
+                        elif status in RETRY_STATUSES:
+                            retry.append(operation)
+                        else:
+                            self._reject(stats, [operation], result)
+
+            if not retry:
+                break
+            if attempt >= self.max_retries:
+                stats.retry_exhausted += len(retry)
+                logger.error(f"❌ {len(retry)} 条文档重试 {self.max_retries} 次后仍未写入 {self.index}")
+                break
+            attempt += 1
+            stats.retried += len(retry)
+            delay = min(self.retry_backoff * 2 ** (attempt - 1), 30.0)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            pending = retry
+
+        stats.batches += 1
+        stats.latencies.append(time.perf_counter() - start)
+
+    @staticmethod
+    def _reject(stats: BulkStats, operations: List[Operation], error: Mapping[str, Any]):
+        stats.rejected += len(operations)
+        if len(stats.errors) < MAX_ERROR_SAMPLES:
+            stats.errors.append(dict(error))
+
+
+async def _iterate(documents: Union[Iterable[Document], AsyncIterable[Document]]):
+    if hasattr(documents, "__aiter__"):
+        async for document in documents:
+            yield document
+    else:
+        for document in documents:
+            yield document
+
+
+async def bulk_index(
+    es,
+    index: str,
+    documents: Union[Iterable[Document], AsyncIterable[Document]],
+    **options: Any,
+) -> BulkStats:
+    """批量写入文档，options 见 BulkIndexer"""
+    stats = await BulkIndexer(es, index, **options).run(documents)
+    logger.info(f"📦 {index}: {stats.summary()}")
+    return stats
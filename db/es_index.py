@@ -0,0 +1,403 @@
+"""
+Elasticsearch 索引定义
+按 Pydantic 模型的字段类型生成映射（数值、日期、布尔、嵌套对象、数组），支持按字段覆盖映射参数，
+并以带版本号的具体索引（alias_v1、alias_v2 ...）加别名的方式管理索引：
+读写都通过别名，重建索引时写入新版本后原子切换别名，对调用方无停机
+"""
+
+import asyncio
+import datetime
+import decimal
+import enum
+import hashlib
+import json
+import types
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Literal, Mapping, Optional, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from schemas.search import SearchRecord
+
+# Python 类型 -> Elasticsearch 字段类型（按顺序匹配，bool 必须在 int 之前）
+TYPE_MAPPING = (
+    (bool, {"type": "boolean"}),
+    (int, {"type": "long"}),
+    (float, {"type": "double"}),
+    (decimal.Decimal, {"type": "double"}),
+    (datetime.datetime, {"type": "date"}),
+    (datetime.date, {"type": "date", "format": "strict_date"}),
+    (uuid.UUID, {"type": "keyword"}),
+    (bytes, {"type": "binary"}),
+    (str, {"type": "keyword", "ignore_above": 256}),
+)
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    """Optional[X] / X | None -> X"""
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _field_mapping(annotation: Any, overrides: Mapping[str, Any], path: str) -> Dict[str, Any]:
+    annotation = _unwrap_optional(annotation)
+    origin = get_origin(annotation)
+
+    # Elasticsearch 的字段天然可以是数组，列表/集合按元素类型映射
+    if origin in (list, set, frozenset, tuple):
+        args = [arg for arg in get_args(annotation) if arg is not Ellipsis]
+        item = args[0] if args else str
+        mapping = _field_mapping(item, overrides, path)
+        # 对象数组用 nested，保证同一元素内的字段可以一起查询
+        if mapping.get("type") == "object":
+            mapping["type"] = "nested"
+        return mapping
+    if origin is Literal:
+        values = get_args(annotation)
+        return _field_mapping(type(values[0]) if values else str, overrides, path)
+    if origin in (dict, Mapping):
+        return {"type": "flattened"}
+
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return {"type": "object", "properties": _properties(annotation, overrides, f"{path}.")}
+        if issubclass(annotation, enum.Enum):
+            members = list(annotation)
+            return _field_mapping(type(members[0].value) if members else str, overrides, path)
+        for python_type, mapping in TYPE_MAPPING:
+            if issubclass(annotation, python_type):
+                return dict(mapping)
+    return {"type": "keyword", "ignore_above": 256}
+
+
+def _apply_override(mapping: Dict[str, Any], override: Mapping[str, Any]) -> Dict[str, Any]:
+    """带 type 且类型不同时整体替换（保留子属性），否则合并参数"""
+    if "type" in override and override["type"] != mapping.get("type"):
+        replaced = dict(override)
+        if "properties" in mapping and override["type"] in ("object", "nested"):
+            replaced.setdefault("properties", mapping["properties"])
+        return replaced
+    return {**mapping, **override}
+
+
+def _properties(model: Type[BaseModel], overrides: Mapping[str, Any], prefix: str = "") -> Dict[str, Any]:
+    properties = {}
+    for name, info in model.model_fields.items():
+        name = info.alias or name
+        path = f"{prefix}{name}"
+        mapping = _field_mapping(info.annotation, overrides, path)
+        # 模型上声明的覆盖：Field(json_schema_extra={"es": {...}})
+        extra = info.json_schema_extra if isinstance(info.json_schema_extra, dict) else {}
+        if isinstance(extra.get("es"), Mapping):
+            mapping = _apply_override(mapping, extra["es"])
+        if path in overrides:
+            if overrides[path] is None:
+                continue
+            mapping = _apply_override(mapping, overrides[path])
+        properties[name] = mapping
+    return properties
+
+
+def build_mapping(
+    schema: Type[BaseModel],
+    overrides: Optional[Mapping[str, Optional[Mapping[str, Any]]]] = None,
+    dynamic: Union[bool, str] = "strict",
+) -> Dict[str, Any]:
+    """根据 Pydantic 模型生成索引映射
+
+    Args:
+        schema: Pydantic 模型
+        overrides: 按字段路径覆盖映射，嵌套字段用点号（如 "search_results_id.id"）；
+            值带 type 时替换默认映射，否则合并参数（如 {"doc_values": False}）；值为 None 时不映射该字段
+        dynamic: 未声明字段的处理方式，默认 strict（拒绝写入，避免映射膨胀）
+    """
+    return {"dynamic": dynamic, "properties": _properties(schema, overrides or {})}
+
+
+@dataclass(frozen=True)
+class IndexSettings:
+    """索引设置
+
+    Args:
+        shards: 主分片数（创建后不可修改）
+        replicas: 副本数
+        refresh_interval: 新写入文档可被搜索的间隔，写多读少时可调大
+        extra: 其它 index.* 设置（如 analysis、codec）
+    """
+
+    shards: int = 1
+    replicas: int = 1
+    refresh_interval: str = "1s"
+    extra: Mapping[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "number_of_shards": self.shards,
+            "number_of_replicas": self.replicas,
+            "refresh_interval": self.refresh_interval,
+            **self.extra,
+        }
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """带版本别名的索引定义
+
+    Args:
+        alias: 读写使用的别名，具体索引名为 {alias}_v{版本号}
+        schema: 文档的 Pydantic 模型
+        overrides: 字段映射覆盖，见 build_mapping
+        settings: 索引设置
+    """
+
+    alias: str
+    schema: Type[BaseModel]
+    overrides: Mapping[str, Optional[Mapping[str, Any]]] = field(default_factory=dict)
+    settings: IndexSettings = field(default_factory=IndexSettings)
+
+    def mappings(self) -> Dict[str, Any]:
+        mappings = build_mapping(self.schema, self.overrides)
+        # 映射与设置的摘要写入 _meta，用于判断是否需要重建索引
+        mappings["_meta"] = {"schema_hash": self.schema_hash()}
+        return mappings
+
+    def schema_hash(self) -> str:
+        body = {
+            "mappings": build_mapping(self.schema, self.overrides),
+            "shards": self.settings.shards,
+            "extra": dict(self.settings.extra),
+        }
+        raw = json.dumps(body, sort_keys=True, separators=(",", ":"))
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+    def index_name(self, version: int) -> str:
+        return f"{self.alias}_v{version}"
+
+    def version_of(self, index: str) -> Optional[int]:
+        prefix = f"{self.alias}_v"
+        if index.startswith(prefix) and index[len(prefix):].isdigit():
+            return int(index[len(prefix):])
+        return None
+
+
+# 别名切换监听：callback(alias, index)，用于使依赖旧索引的缓存失效
+_alias_listeners: List[Callable[[str, str], None]] = []
+
+
+def on_alias_change(callback: Callable[[str, str], None]) -> Callable[[], None]:
+    """订阅别名切换（本进程内创建或重建索引时立即触发，其它进程切换时由 AliasWatcher 查询到后触发），
+    返回取消订阅函数"""
+    _alias_listeners.append(callback)
+    return lambda: _alias_listeners.remove(callback) if callback in _alias_listeners else None
+
+
+def _notify_alias_change(alias: str, index: str):
+    for callback in list(_alias_listeners):
+        try:
+            callback(alias, index)
+        except Exception as e:
+            from common.log import EnhancedLog
+
+            EnhancedLog.get_logger("es").error(f"❌ 别名切换回调执行失败: {e}")
+
+
+async def current_index(es, alias: str) -> Optional[str]:
+    """别名当前指向的具体索引，别名不存在时返回 None"""
+    if not await es.indices.exists_alias(name=alias):
+        return None
+    indices = list((await es.indices.get_alias(name=alias)).keys())
+    return indices[0] if indices else None
+
+
+_UNSEEN = object()
+
+
+class AliasWatcher:
+    """定期查询别名指向的具体索引，变化时通知 on_alias_change 的订阅者
+
+    on_alias_change 只在本进程创建或重建索引时触发；其它 worker 或脚本（python -m ...）切换别名后，
+    本进程最迟一个查询间隔后才能感知
+
+    Args:
+        aliases: 监视的别名
+        get_client: 返回 AsyncElasticsearch 客户端的函数，返回 None（未配置）时跳过本次查询
+        interval: 查询间隔（秒）
+    """
+
+    def __init__(self, aliases: List[str], get_client: Callable[[], Any], interval: float = 10.0):
+        self.aliases = list(aliases)
+        self.get_client = get_client
+        self.interval = interval
+        self.changes = 0
+        self._indices: Dict[str, Any] = {alias: _UNSEEN for alias in self.aliases}
+        self._unsubscribe: Optional[Callable[[], None]] = None
+        self._task = None
+
+    def _record(self, alias: str, index: Optional[str]):
+        # 本进程切换别名时 _notify_alias_change 已经通知过，这里只记下新索引
+        if alias in self._indices:
+            self._indices[alias] = index
+
+    async def check(self) -> List[str]:
+        """查询一次，返回指向的索引发生变化的别名（首次查询只记录，不算变化）"""
+        es = self.get_client()
+        if es is None:
+            return []
+        changed = []
+        for alias in self.aliases:
+            index = await current_index(es, alias)
+            previous = self._indices[alias]
+            self._indices[alias] = index
+            if previous is not _UNSEEN and index != previous:
+                changed.append(alias)
+                self.changes += 1
+                _notify_alias_change(alias, index)
+        return changed
+
+    async def start(self):
+        if self._task is None:
+            self._unsubscribe = on_alias_change(self._record)
+            self._task = asyncio.create_task(self._run(), name="es-alias-watcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                from common.log import EnhancedLog
+
+                EnhancedLog.get_logger("es").error(f"❌ 查询别名指向的索引失败: {e}")
+            await asyncio.sleep(self.interval)
+
+
+async def create_index(es, spec: IndexSpec, version: Optional[int] = None, **settings: Any) -> str:
+    """创建下一个版本（或指定版本）的具体索引，返回索引名；settings 覆盖本次创建的索引设置"""
+    if version is None:
+        existing = await es.indices.get(index=f"{spec.alias}_v*", expand_wildcards="all")
+        versions = [spec.version_of(name) for name in existing.keys()]
+        version = max([v for v in versions if v is not None], default=0) + 1
+    name = spec.index_name(version)
+    await es.indices.create(
+        index=name,
+        mappings=spec.mappings(),
+        settings={**spec.settings.to_dict(), **settings},
+    )
+    return name
+
+
+async def ensure_index(es, spec: IndexSpec) -> str:
+    """别名不存在时创建第一个版本并指向它，返回别名当前指向的索引"""
+    index = await current_index(es, spec.alias)
+    if index is None:
+        index = await create_index(es, spec)
+        await es.indices.update_aliases(
+            actions=[{"add": {"index": index, "alias": spec.alias, "is_write_index": True}}]
+        )
+        _notify_alias_change(spec.alias, index)
+    return index
+
+
+async def needs_reindex(es, spec: IndexSpec) -> bool:
+    """别名指向的索引与当前定义（映射、分片、附加设置）不一致时返回 True"""
+    index = await current_index(es, spec.alias)
+    if index is None:
+        return False
+    mapping = (await es.indices.get_mapping(index=index))[index]["mappings"]
+    return mapping.get("_meta", {}).get("schema_hash") != spec.schema_hash()
+
+
+async def reindex(
+    es,
+    spec: IndexSpec,
+    delete_old: bool = False,
+    requests_per_second: Optional[float] = None,
+) -> str:
+    """按当前定义创建新版本索引，复制数据后原子切换别名，返回新索引名
+
+    复制期间新索引关闭刷新且不建副本以加快写入，完成后恢复设置；
+    复制期间经别名写入旧索引的新文档在切换后补拷（已存在的文档不覆盖，期间对旧文档的更新会丢失）
+
+    Args:
+        es: AsyncElasticsearch
+        spec: 索引定义
+        delete_old: 切换后删除旧索引（默认保留以便回滚）
+        requests_per_second: 复制限速，None 表示不限速
+    """
+    old = await current_index(es, spec.alias)
+    if old is None:
+        return await ensure_index(es, spec)
+
+    new = await create_index(es, spec, refresh_interval="-1", number_of_replicas=0)
+    copy = es.options(request_timeout=None)
+    await copy.reindex(
+        source={"index": old},
+        dest={"index": new},
+        wait_for_completion=True,
+        slices="auto",
+        requests_per_second=requests_per_second or -1,
+    )
+    await es.indices.put_settings(
+        index=new,
+        settings={
+            "refresh_interval": spec.settings.refresh_interval,
+            "number_of_replicas": spec.settings.replicas,
+        },
+    )
+    await es.indices.refresh(index=new)
+
+    await es.indices.update_aliases(
+        actions=[
+            {"remove": {"index": old, "alias": spec.alias}},
+            {"add": {"index": new, "alias": spec.alias, "is_write_index": True}},
+        ]
+    )
+    # 补拷切换前写入旧索引、尚未复制的文档
+    await copy.reindex(
+        source={"index": old},
+        dest={"index": new, "op_type": "create"},
+        conflicts="proceed",
+        wait_for_completion=True,
+        refresh=True,
+    )
+    _notify_alias_change(spec.alias, new)
+    if delete_old:
+        await es.indices.delete(index=old)
+    return new
+
+
+# 搜索记录索引
+search_record_index = IndexSpec(
+    alias="search_records",
+    schema=SearchRecord,
+    overrides={
+        "search_time": {"type": "date", "format": "yyyy-MM-dd HH:mm||strict_date_optional_time"},
+        # 全文检索 + 精确匹配/聚合（热门搜索词）
+        "search_content": {
+            "type": "text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
+        },
+        "user_grade_id": {"type": "keyword", "ignore_above": 64},
+        "user_device": {"type": "keyword", "ignore_above": 128},
+        # 仅用于过滤，不排序不聚合，关闭 doc_values 节省磁盘
+        "search_results_id_list": {"type": "integer", "doc_values": False},
+        # 结果对象按 nested 存储，可用 nested 查询按结果字段过滤
+        "search_results_id": {"type": "nested"},
+        "search_time_taken": {"type": "float"},
+    },
+    settings=IndexSettings(shards=1, replicas=1, refresh_interval="5s"),
+)
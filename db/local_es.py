@@ -0,0 +1,375 @@
+"""
+进程内 Elasticsearch 替身
+以 common/inverted_index.py 的倒排索引实现本项目用到的 AsyncElasticsearch 接口子集：
+search（match / term / bool / match_all）、bulk、index、get、delete、reindex，
+以及 db/es_index.py 管理版本别名用到的 indices.* 方法；文档、索引或别名不存在等错误抛出与真实客户端相同的异常。
+可作为本地热点数据层或测试用的搜索后端：设置 ELASTICSEARCH_URL=memory:// 即由 init_es 创建，
+memory:///path/to/dir 时启动加载、关闭保存该目录下的索引快照
+"""
+
+import json
+import os
+from fnmatch import fnmatch
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from common.inverted_index import InvertedIndex
+
+DEFAULT_TEXT_FIELD = "search_content"
+DEFAULT_KEYWORD_FIELDS = ("user_grade_id", "user_device")
+
+
+NUMERIC_TYPES = (
+    "long", "integer", "short", "byte", "double", "float", "half_float", "scaled_float", "unsigned_long",
+)
+FILTER_TYPES = ("keyword", "constant_keyword", "boolean", "date") + NUMERIC_TYPES
+
+
+def _fields_from_mappings(
+    mappings: Optional[Mapping[str, Any]],
+) -> Tuple[Optional[str], List[str], List[str]]:
+    """映射中第一个 text 字段作为全文字段，keyword/数值/布尔/日期字段作为过滤字段；
+    返回 (全文字段, 过滤字段, 其中按数值匹配的字段)。数组字段的映射与元素相同，按元素匹配"""
+    text_field = None
+    keyword_fields, numeric_fields = [], []
+    for name, field in ((mappings or {}).get("properties") or {}).items():
+        kind = field.get("type")
+        if kind == "text" and text_field is None:
+            text_field = name
+        elif kind in FILTER_TYPES:
+            keyword_fields.append(name)
+            if kind in NUMERIC_TYPES:
+                numeric_fields.append(name)
+    return text_field, keyword_fields, numeric_fields
+
+
+def _api_error(status: int, error_type: str, reason: str, body: Optional[Mapping[str, Any]] = None) -> Exception:
+    """构造与 AsyncElasticsearch 相同的异常（404 为 NotFoundError，400 为 BadRequestError）；
+    未安装 elasticsearch 时退化为 LookupError / ValueError"""
+    if body is None:
+        body = {"error": {"type": error_type, "reason": reason}, "status": status}
+    try:
+        from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+        from elasticsearch import BadRequestError, NotFoundError
+    except ImportError:
+        return (LookupError if status == 404 else ValueError)(reason)
+    meta = ApiResponseMeta(
+        status=status,
+        http_version="1.1",
+        headers=HttpHeaders(),
+        duration=0.0,
+        node=NodeConfig("http", "localhost", 9200),
+    )
+    return (NotFoundError if status == 404 else BadRequestError)(error_type, meta, body)
+
+
+def _index_not_found(index: str) -> Exception:
+    return _api_error(404, "index_not_found_exception", f"no such index [{index}]")
+
+
+def _parse_query(query: Optional[Mapping[str, Any]], text_field: str) -> Tuple[str, str, Dict[str, Any]]:
+    """把查询 DSL 的子集转换为 (查询文本, operator, 过滤条件)"""
+    text, operator, filters = "", "or", {}
+
+    def visit(clause: Mapping[str, Any], scoring: bool):
+        nonlocal text, operator
+        (kind, body), = clause.items()
+        if kind == "match_all":
+            return
+        if kind == "term":
+            (name, value), = body.items()
+            filters[name] = value["value"] if isinstance(value, Mapping) else value
+            return
+        if kind == "match" and scoring:
+            (name, value), = body.items()
+            if name != text_field:
+                raise ValueError(f"只支持在 {text_field} 上全文检索")
+            if isinstance(value, Mapping):
+                text, operator = value["query"], value.get("operator", "or").lower()
+            else:
+                text = value
+            return
+        if kind == "bool":
+            for key, nested_scoring in (("must", True), ("filter", False)):
+                clauses = body.get(key) or []
+                for nested in [clauses] if isinstance(clauses, Mapping) else clauses:
+                    visit(nested, nested_scoring and scoring)
+            return
+        raise ValueError(f"不支持的查询: {kind}")
+
+    if query:
+        visit(query, True)
+    return text, operator, filters
+
+
+class _LocalIndices:
+    """indices.* 子集"""
+
+    def __init__(self, client: "LocalElasticsearch"):
+        self._client = client
+
+    async def create(self, index: str, mappings=None, settings=None, **kwargs):
+        if index in self._client._indexes:
+            raise _api_error(
+                400, "resource_already_exists_exception", f"index [{index}] already exists"
+            )
+        self._client._create(index, mappings)
+        return {"acknowledged": True, "index": index}
+
+    async def exists(self, index: str, **kwargs) -> bool:
+        return index in self._client._indexes or index in self._client._aliases
+
+    async def exists_alias(self, name: str, **kwargs) -> bool:
+        return name in self._client._aliases
+
+    async def get_alias(self, name: str, **kwargs):
+        index = self._client._aliases.get(name)
+        if index is None:
+            raise _api_error(
+                404, "aliases_not_found_exception", f"alias [{name}] missing",
+                body={"error": f"alias [{name}] missing", "status": 404},
+            )
+        return {index: {"aliases": {name: {}}}}
+
+    async def get(self, index: str, **kwargs):
+        return {
+            name: {"mappings": self._client._mappings.get(name, {})}
+            for name in self._client._indexes
+            if fnmatch(name, index)
+        }
+
+    async def get_mapping(self, index: str, **kwargs):
+        name = self._client._resolve(index)
+        if name not in self._client._indexes:
+            raise _index_not_found(index)
+        return {name: {"mappings": self._client._mappings.get(name, {})}}
+
+    async def update_aliases(self, actions: Sequence[Mapping[str, Any]], **kwargs):
+        aliases = self._client._aliases
+        for action in actions:
+            (kind, body), = action.items()
+            if kind == "add":
+                aliases[body["alias"]] = body["index"]
+            elif kind == "remove" and aliases.get(body["alias"]) == body["index"]:
+                del aliases[body["alias"]]
+        return {"acknowledged": True}
+
+    async def put_settings(self, **kwargs):
+        return {"acknowledged": True}
+
+    async def refresh(self, **kwargs):
+        return {"_shards": {"failed": 0}}
+
+    async def delete(self, index: str, ignore_unavailable: bool = False, **kwargs):
+        """删除索引（逗号分隔或通配符），指向被删索引的别名一并删除；
+        不带通配符的名称不存在时抛出 NotFoundError（ignore_unavailable=True 时跳过）"""
+        client = self._client
+        names = []
+        for pattern in index.split(","):
+            matched = [name for name in client._indexes if fnmatch(name, pattern)]
+            if not matched and not any(char in pattern for char in "*?") and not ignore_unavailable:
+                raise _index_not_found(pattern)
+            names.extend(matched)
+        for name in names:
+            client._indexes.pop(name, None)
+            client._mappings.pop(name, None)
+            for alias in [alias for alias, target in client._aliases.items() if target == name]:
+                del client._aliases[alias]
+        return {"acknowledged": True}
+
+
+class LocalElasticsearch:
+    """进程内搜索后端，接口与 AsyncElasticsearch 的常用方法一致
+
+    Args:
+        snapshot_dir: 快照目录，为空时只保存在内存中
+        text_field: 自动创建的索引（写入不存在的索引时）使用的全文字段
+        keyword_fields: 自动创建的索引使用的过滤字段
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: Optional[str] = None,
+        text_field: str = DEFAULT_TEXT_FIELD,
+        keyword_fields: Sequence[str] = DEFAULT_KEYWORD_FIELDS,
+    ):
+        self.snapshot_dir = snapshot_dir
+        self.text_field = text_field
+        self.keyword_fields = tuple(keyword_fields)
+        self.indices = _LocalIndices(self)
+        self._indexes: Dict[str, InvertedIndex] = {}
+        self._mappings: Dict[str, Any] = {}
+        self._aliases: Dict[str, str] = {}
+        if snapshot_dir:
+            self.load_snapshots(snapshot_dir)
+
+    # ------------------------------------------------------------------ 索引管理
+
+    def _create(self, name: str, mappings: Optional[Mapping[str, Any]] = None) -> InvertedIndex:
+        text_field, keyword_fields, numeric_fields = _fields_from_mappings(mappings)
+        index = InvertedIndex(
+            text_field or self.text_field,
+            keyword_fields if text_field else self.keyword_fields,
+            numeric_fields=numeric_fields if text_field else (),
+        )
+        self._indexes[name] = index
+        self._mappings[name] = dict(mappings or {})
+        return index
+
+    def _resolve(self, name: str) -> str:
+        return self._aliases.get(name, name)
+
+    def _index(self, name: str, create: bool = False) -> Optional[InvertedIndex]:
+        resolved = self._resolve(name)
+        index = self._indexes.get(resolved)
+        if index is None and create:
+            index = self._create(resolved)
+        return index
+
+    def options(self, **kwargs) -> "LocalElasticsearch":
+        return self
+
+    # ------------------------------------------------------------------ 文档
+
+    async def index(self, index: str, document: Mapping[str, Any], id: Optional[str] = None, **kwargs):
+        target = self._index(index, create=True)
+        doc_id = str(id if id is not None else len(target._ids))
+        created = doc_id not in target
+        target.add(doc_id, document)
+        return {"_index": self._resolve(index), "_id": doc_id, "result": "created" if created else "updated"}
+
+    async def get(self, index: str, id: str, **kwargs):
+        """文档不存在时抛出 NotFoundError（与 AsyncElasticsearch 一致）"""
+        target = self._index(index)
+        if target is None:
+            raise _index_not_found(index)
+        source = target.get(id)
+        if source is None:
+            raise _api_error(
+                404, "not_found", f"{index}/{id} not found",
+                body={"_index": self._resolve(index), "_id": str(id), "found": False},
+            )
+        return {"_index": self._resolve(index), "_id": str(id), "found": True, "_source": source}
+
+    async def delete(self, index: str, id: str, **kwargs):
+        """文档不存在时抛出 NotFoundError（与 AsyncElasticsearch 一致）"""
+        target = self._index(index)
+        if target is None:
+            raise _index_not_found(index)
+        if not target.delete(id):
+            raise _api_error(
+                404, "not_found", f"{index}/{id} not found",
+                body={"_index": self._resolve(index), "_id": str(id), "result": "not_found"},
+            )
+        return {"_index": self._resolve(index), "_id": str(id), "result": "deleted"}
+
+    async def bulk(
+        self,
+        operations: Iterable[Union[bytes, str, Mapping[str, Any]]],
+        index: Optional[str] = None,
+        **kwargs,
+    ):
+        """执行 index / create / delete 操作，operations 可以是已编码的行或字典"""
+        lines = [json.loads(line) if isinstance(line, (bytes, str)) else line for line in operations]
+        items, errors, position = [], False, 0
+        while position < len(lines):
+            (op_type, meta), = lines[position].items()
+            position += 1
+            target_name = meta.get("_index", index)
+            target = self._index(target_name, create=op_type != "delete")
+            doc_id = meta.get("_id")
+            result: Dict[str, Any] = {"_index": self._resolve(target_name), "_id": doc_id}
+            if op_type == "delete":
+                found = target is not None and target.delete(doc_id)
+                result.update(status=200 if found else 404, result="deleted" if found else "not_found")
+            else:
+                document = lines[position]
+                position += 1
+                doc_id = str(doc_id if doc_id is not None else len(target._ids))
+                result["_id"] = doc_id
+                if op_type == "create" and doc_id in target:
+                    errors = True
+                    result.update(status=409, error={"type": "version_conflict_engine_exception"})
+                else:
+                    created = doc_id not in target
+                    target.add(doc_id, document)
+                    result.update(status=201 if created else 200, result="created" if created else "updated")
+            items.append({op_type: result})
+        return {"took": 0, "errors": errors, "items": items}
+
+    async def reindex(self, source: Mapping[str, Any], dest: Mapping[str, Any], **kwargs):
+        origin = self._index(source["index"])
+        target = self._index(dest["index"], create=True)
+        create_only = dest.get("op_type") == "create"
+        count = 0
+        if origin is not None:
+            for doc_id in list(origin._docnos):
+                if create_only and doc_id in target:
+                    continue
+                target.add(doc_id, origin.get(doc_id))
+                count += 1
+        return {"total": count, "created": count, "failures": []}
+
+    # ------------------------------------------------------------------ 检索
+
+    async def search(
+        self,
+        index: str,
+        query: Optional[Mapping[str, Any]] = None,
+        size: int = 10,
+        source_excludes: Optional[Sequence[str]] = None,
+        **kwargs,
+    ):
+        """BM25 检索；索引不存在时与 AsyncElasticsearch 一样抛出 NotFoundError，ignore_unavailable=True 时返回空结果"""
+        target = self._index(index)
+        if target is None:
+            if not kwargs.get("ignore_unavailable"):
+                raise _index_not_found(index)
+            return {"took": 0, "hits": {"total": {"value": 0, "relation": "eq"}, "max_score": None, "hits": []}}
+        text, operator, filters = _parse_query(query, target.text_field)
+        total, results = target.search_documents(text, filters, size, operator)
+        excluded = set(source_excludes or ())
+        hits = [
+            {
+                "_index": self._resolve(index),
+                "_id": doc_id,
+                "_score": score,
+                "_source": {key: value for key, value in source.items() if key not in excluded},
+            }
+            for doc_id, score, source in results
+        ]
+        return {
+            "took": 0,
+            "hits": {
+                "total": {"value": total, "relation": "eq"},
+                "max_score": hits[0]["_score"] if hits else None,
+                "hits": hits,
+            },
+        }
+
+    # ------------------------------------------------------------------ 快照
+
+    def save_snapshots(self, directory: str):
+        """每个索引保存为 <索引名>.idx，别名与映射保存在 catalog.json"""
+        os.makedirs(directory, exist_ok=True)
+        for name, index in self._indexes.items():
+            index.save(os.path.join(directory, f"{name}.idx"))
+        catalog = {"aliases": self._aliases, "mappings": self._mappings}
+        with open(os.path.join(directory, "catalog.json"), "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False)
+
+    def load_snapshots(self, directory: str):
+        catalog_path = os.path.join(directory, "catalog.json")
+        if not os.path.exists(catalog_path):
+            return
+        with open(catalog_path, encoding="utf-8") as f:
+            catalog = json.load(f)
+        self._aliases = dict(catalog.get("aliases", {}))
+        self._mappings = dict(catalog.get("mappings", {}))
+        for filename in os.listdir(directory):
+            if filename.endswith(".idx"):
+                name = filename[: -len(".idx")]
+                self._indexes[name] = InvertedIndex.load(os.path.join(directory, filename))
+
+    async def close(self):
+        if self.snapshot_dir:
+            self.save_snapshots(self.snapshot_dir)
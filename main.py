@@ -1,13 +1,74 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from api import api_router
+from api.errors import request_validation_exception_handler
+from api.api_v1.analytics import search_analytics
+from api.api_v1.search import search_alias_watcher, search_cache
+from api.api_v1.search_records import search_record_buffer, search_record_index_buffer
+from api.api_v1.suggest import SEED_FROM_DB, seed_from_database, suggest_index
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-from common.startup_banner import print_banner, print_startup_tips
-from common.log import EnhancedLog
-from config.app_config import get_config, get_service_port, get_current_env
+from common.compression import CompressionMiddleware
+from common.log import EnhancedLog, SamplingPolicy
+from common.metrics import PrometheusMiddleware, metrics_registry
+from common.page_cache import RenderedPageCache
+from common.static_assets import AssetManifest, PrecompressedStaticFiles
+from common.profiling import ProfilingMiddleware, profiler_control
+from common.timing import timing_registry
+from db.es import close_es, init_es
+from config.app_config import config_manager, get_config, get_service_port, get_current_env
+
+
+def _loaded_database():
+    """db.database 会加载 SQLAlchemy（约 0.5 秒），只在请求或后台任务用到数据库时才导入；
+    尚未导入说明没有创建过引擎，无需释放，也没有连接池指标"""
+    return sys.modules.get("db.database")
+
+
+async def dispose_db_engine():
+    database = _loaded_database()
+    if database is not None:
+        await database.dispose_engine()
+
+
+def render_db_pool_metrics():
+    database = _loaded_database()
+    return database.render_prometheus() if database is not None else []
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时启动日志归档线程（LOG_ARCHIVE_ENABLED=true 时）、监听配置文件变化、
+    创建 Elasticsearch 客户端并监视搜索别名、启动写后缓冲、补全索引定期重建与分析状态共享；
+    关闭时写完缓冲数据、释放数据库与 Elasticsearch 连接池并刷新日志队列"""
+    EnhancedLog.start_archiver()
+    config_manager.start_watching()
+    await init_es()
+    await search_alias_watcher.start()
+    await search_record_buffer.start()
+    await search_record_index_buffer.start()
+    await suggest_index.start()
+    await search_analytics.start()
+    seeding = asyncio.create_task(seed_from_database()) if SEED_FROM_DB else None
+    yield
+    if seeding is not None:
+        seeding.cancel()
+    await search_alias_watcher.stop()
+    await suggest_index.stop()
+    await search_analytics.stop()
+    await search_record_buffer.stop()
+    await search_record_index_buffer.stop(timeout=10)
+    config_manager.stop_watching()
+    await dispose_db_engine()
+    await close_es()
+    EnhancedLog.shutdown()
 
 
 # models.Base.metadata.create_all(bind=engine)
@@ -16,11 +77,32 @@ app = FastAPI(
     title="FastAPI Starter",
     description="🚀 现代化的 Python Web API 框架",
     version="1.0.0",
+    lifespan=lifespan,
+)
+
+# 输入含 NaN / Infinity 时默认的 422 处理会序列化失败
+app.add_exception_handler(RequestValidationError, request_validation_exception_handler)
+
+# 接口日志：高频接口按调用点采样，被抑制的条数每分钟汇总输出一次
+api_logger = EnhancedLog.get_logger(
+    "api",
+    call_site_sampling={
+        "welcome_page": SamplingPolicy(rate=10, burst=20),
+        "read_data": SamplingPolicy(first_n=100, every_k=100),
+    },
 )
 
-# 配置模板和静态文件
+# 配置模板和静态文件（python -m common.static_assets 构建带指纹的预压缩资源）
+static_assets = AssetManifest("static", url_prefix="/static")
 templates = Jinja2Templates(directory="templates")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+templates.env.globals["static_url"] = static_assets.url
+# 与请求无关的页面只渲染一次，模板文件变化时自动重渲染
+page_cache = RenderedPageCache(templates)
+app.mount(
+    "/static",
+    PrecompressedStaticFiles(directory="static", manifest=static_assets),
+    name="static",
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,6 +112,28 @@ app.add_middleware(
     allow_headers=["*"],  # 允许所有头
 )
 
+# 响应压缩：小于 1KB 或非文本的响应不压缩，/metrics 交给抓取端自行协商
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=1024,
+    route_levels={"/api/v1": {"gzip": 5, "br": 5, "zstd": 6}, "/metrics": None},
+)
+
+# 按需单请求剖析（需配置 PROFILE_TOKEN），位于指标中间件内层
+app.add_middleware(ProfilingMiddleware, control=profiler_control)
+
+# 请求延迟直方图与在途请求数，最外层注册以覆盖其它中间件的耗时
+app.add_middleware(PrometheusMiddleware, registry=metrics_registry)
+
+# log_time 装饰的函数耗时汇总与数据库连接池使用情况一并通过 /metrics 输出
+metrics_registry.register_collector(timing_registry.render_prometheus)
+metrics_registry.register_collector(render_db_pool_metrics)
+metrics_registry.register_collector(search_record_buffer.render_prometheus)
+metrics_registry.register_collector(search_record_index_buffer.render_prometheus)
+metrics_registry.register_collector(search_cache.render_prometheus)
+metrics_registry.register_collector(suggest_index.render_prometheus)
+metrics_registry.register_collector(search_analytics.render_prometheus)
+
 
 # 启动页面路由
 @app.get("/", response_class=HTMLResponse)
@@ -37,11 +141,10 @@ async def welcome_page(request: Request):
     """
     FastAPI 启动欢迎页面
     """
-    logger = EnhancedLog.get_logger("api")
     client_ip = request.client.host
     user_agent = request.headers.get("user-agent", "Unknown")
 
-    logger.info(
+    api_logger.info(
         "🚀 访问欢迎页面",
         extra={
             "extra_fields": {
@@ -53,24 +156,50 @@ async def welcome_page(request: Request):
         },
     )
 
-    return templates.TemplateResponse("index.html", {"request": request})
+    return page_cache.response(request, "index.html")
 
 
 # 创建一个路由来返回数据
 @app.get("/hi")
 async def read_data():
-    logger = EnhancedLog.get_logger("api")
-    logger.info(
+    api_logger.info(
         "🚀 测试接口被调用",
         extra={"extra_fields": {"endpoint": "/hi", "method": "GET"}},
     )
     return "hello world"
 
 
+# Prometheus 指标
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+# 预约对某个路径接下来 N 次请求做剖析，结果写入 logs/profiles/
+@app.post("/admin/profile", include_in_schema=False)
+async def arm_profile(
+    path: str,
+    count: int = 1,
+    mode: Optional[str] = None,
+    x_profile: Optional[str] = Header(None),
+):
+    if not profiler_control.check_token(x_profile):
+        raise HTTPException(status_code=403, detail="profiling disabled or bad token")
+    profiler_control.arm(path, count, mode)
+    return {"armed": profiler_control.armed(), "profiled": profiler_control.profiled}
+
+
 app.include_router(api_router)
 
 
 if __name__ == "__main__":
+    # 仅直接运行时需要，由 uvicorn/gunicorn 加载 main:app 时不导入
+    import uvicorn
+
+    from common.startup_banner import print_banner, print_startup_tips
+
     # 加载配置
     config = get_config()
     port = get_service_port()
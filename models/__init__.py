@@ -0,0 +1 @@
+from .search import SearchRecordModel
@@ -0,0 +1,21 @@
+from sqlalchemy import JSON, BigInteger, Column, Float, Index, String
+
+from db.database import Base
+
+
+class SearchRecordModel(Base):
+    """搜索记录（对应 schemas.search.SearchRecord）"""
+
+    __tablename__ = "search_records"
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, nullable=False)
+    user_grade_id = Column(String(64), nullable=False)
+    search_content = Column(String(1024), nullable=False)
+    search_time = Column(String(16), nullable=False)
+    search_results_id = Column(BigInteger, nullable=False)
+    search_results_id_list = Column(JSON, nullable=False)
+    search_time_taken = Column(Float, nullable=False)
+    user_device = Column(String(128), nullable=False)
+
+    __table_args__ = (Index("ix_search_records_user_time", "user_id", "search_time", "id"),)
@@ -9,12 +9,15 @@ class SearchResult(BaseModel):
 class SearchRecord(BaseModel):
     id: int = Field(..., description="The unique identifier of the search record")
     user_id: int = Field(..., description="The ID of the user")
-    user_grade_id: str = Field(..., description="The current grade level of the user")
+    user_grade_id: str = Field(
+        ..., max_length=64, description="The current grade level of the user"
+    )
     search_content: str = Field(
-        ..., description="The search keyword entered by the user"
+        ..., max_length=1024, description="The search keyword entered by the user"
     )
     search_time: str = Field(
         ...,
+        max_length=16,
         description="The time when the user performed the search (format: YYYY-MM-DD HH:MM)",
     )
     search_results_id: SearchResult = Field(
@@ -24,8 +27,11 @@ class SearchRecord(BaseModel):
         ..., description="The list of unique identifiers for sample documents"
     )
     search_time_taken: float = Field(
-        ..., description="The time taken for the search request in seconds"
+        ...,
+        ge=0,
+        allow_inf_nan=False,
+        description="The time taken for the search request in seconds",
     )
     user_device: str = Field(
-        ..., description="The device used by the user during the search"
+        ..., max_length=128, description="The device used by the user during the search"
     )
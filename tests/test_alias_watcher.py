@@ -0,0 +1,49 @@
+"""
+别名监视：其它进程切换 search_records 别名后，本进程的搜索缓存在下一次查询别名时失效
+"""
+
+import unittest
+
+from common.query_cache import QueryCache
+from db.es_index import AliasWatcher, create_index, ensure_index, on_alias_change, search_record_index
+from db.local_es import LocalElasticsearch
+
+ALIAS = search_record_index.alias
+
+
+class AliasWatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.es = LocalElasticsearch()
+        self.old_index = await ensure_index(self.es, search_record_index)
+        self.cache = QueryCache("test", ttl=3600)
+        self.unsubscribe = on_alias_change(lambda alias, index: self.cache.invalidate_tag(alias))
+        self.watcher = AliasWatcher([ALIAS], lambda: self.es)
+
+    async def asyncTearDown(self):
+        self.unsubscribe()
+
+    async def test_switch_by_another_process_invalidates_the_cache(self):
+        self.assertEqual(await self.watcher.check(), [])
+        self.cache.set("q", {"hits": ["old"]}, tags=(ALIAS,))
+
+        # 模拟其它进程重建索引：直接切换别名，不经过本进程的 reindex
+        new_index = await create_index(self.es, search_record_index)
+        await self.es.indices.update_aliases(
+            actions=[
+                {"remove": {"index": self.old_index, "alias": ALIAS}},
+                {"add": {"index": new_index, "alias": ALIAS, "is_write_index": True}},
+            ]
+        )
+        self.assertEqual(len(self.cache), 1)
+
+        self.assertEqual(await self.watcher.check(), [ALIAS])
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(await self.watcher.check(), [])
+
+    async def test_no_client_skips_the_check(self):
+        watcher = AliasWatcher([ALIAS], lambda: None)
+        self.assertEqual(await watcher.check(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
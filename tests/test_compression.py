@@ -0,0 +1,50 @@
+"""
+响应压缩中间件：条件请求的 304 在外层指标中间件中记到正确的路由上
+"""
+
+import unittest
+
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from common.compression import CompressionMiddleware
+from common.metrics import MetricsRegistry, PrometheusMiddleware
+from common.page_cache import etag_matches
+
+ETAG = '"v1"'
+
+
+class ConditionalRequestMetricsTest(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        async def read_item(item_id: int, request: Request):
+            if etag_matches(request.headers.get("if-none-match"), ETAG):
+                return Response(status_code=304, headers={"ETag": ETAG})
+            return Response("x" * 2048, media_type="text/plain", headers={"ETag": ETAG})
+
+        self.registry = MetricsRegistry()
+        app.add_middleware(CompressionMiddleware, minimum_size=1024)
+        app.add_middleware(PrometheusMiddleware, registry=self.registry)
+        self.client = TestClient(app)
+
+    def test_not_modified_is_labelled_with_the_route(self):
+        response = self.client.get("/items/1", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        etag = response.headers["etag"]
+
+        response = self.client.get(
+            "/items/1", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], etag)
+
+        metrics = self.registry.render()
+        self.assertIn('route="/items/{item_id}",method="GET",status="304"', metrics)
+        self.assertNotIn('route="<unmatched>"', metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()
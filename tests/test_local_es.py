@@ -0,0 +1,79 @@
+"""
+进程内 Elasticsearch 替身与 AsyncElasticsearch 行为一致：错误类型、删除索引时清理别名、数值与数组字段的精确匹配
+"""
+
+import unittest
+
+from elasticsearch import BadRequestError, NotFoundError
+
+from db.local_es import LocalElasticsearch
+
+MAPPINGS = {
+    "properties": {
+        "search_content": {"type": "text"},
+        "user_device": {"type": "keyword"},
+        "user_id": {"type": "long"},
+        "search_time_taken": {"type": "double"},
+        "search_results_id_list": {"type": "long"},
+    }
+}
+
+
+class LocalElasticsearchTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.es = LocalElasticsearch()
+        await self.es.indices.create(index="records_v1", mappings=MAPPINGS)
+        await self.es.indices.update_aliases(actions=[{"add": {"index": "records_v1", "alias": "records"}}])
+        await self.es.index(
+            index="records",
+            id="1",
+            document={
+                "search_content": "勾股定理",
+                "user_device": "ios",
+                "user_id": 7,
+                "search_time_taken": 0.5,
+                "search_results_id_list": [11, 12],
+            },
+        )
+
+    async def test_missing_documents_and_indices_raise_not_found(self):
+        with self.assertRaises(NotFoundError):
+            await self.es.get(index="records", id="404")
+        with self.assertRaises(NotFoundError):
+            await self.es.delete(index="records", id="404")
+        with self.assertRaises(NotFoundError):
+            await self.es.get(index="missing", id="1")
+        with self.assertRaises(NotFoundError):
+            await self.es.search(index="missing", query={"match_all": {}})
+        with self.assertRaises(NotFoundError):
+            await self.es.indices.get_alias(name="missing")
+        with self.assertRaises(NotFoundError):
+            await self.es.indices.delete(index="missing")
+        with self.assertRaises(BadRequestError):
+            await self.es.indices.create(index="records_v1", mappings=MAPPINGS)
+
+        await self.es.indices.delete(index="missing", ignore_unavailable=True)
+        response = await self.es.search(index="missing", query={"match_all": {}}, ignore_unavailable=True)
+        self.assertEqual(response["hits"]["total"]["value"], 0)
+
+    async def test_deleting_an_index_removes_its_aliases(self):
+        await self.es.indices.delete(index="records_v1")
+        self.assertFalse(await self.es.indices.exists_alias(name="records"))
+        self.assertFalse(await self.es.indices.exists(index="records"))
+
+    async def test_numeric_and_array_fields_match_by_value(self):
+        async def count(**term):
+            response = await self.es.search(index="records", query={"bool": {"filter": [{"term": term}]}})
+            return response["hits"]["total"]["value"]
+
+        self.assertEqual(await count(user_id=7), 1)
+        self.assertEqual(await count(user_id=7.0), 1)
+        self.assertEqual(await count(user_id="7"), 1)
+        self.assertEqual(await count(search_time_taken=0.5), 1)
+        self.assertEqual(await count(search_results_id_list=12), 1)
+        self.assertEqual(await count(search_results_id_list=13), 0)
+        self.assertEqual(await count(user_device="ios"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
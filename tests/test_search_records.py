@@ -0,0 +1,69 @@
+"""
+搜索记录写入接口：与表结构不符的记录在入口返回 422，不进入写后缓冲区
+"""
+
+import unittest
+
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from fastapi.testclient import TestClient
+
+from api.api_v1 import search_records
+from api.errors import request_validation_exception_handler
+
+
+def make_payload(**overrides) -> dict:
+    payload = {
+        "id": 1,
+        "user_id": 1,
+        "user_grade_id": "g1",
+        "search_content": "勾股定理",
+        "search_time": "2024-01-01 10:00",
+        "search_results_id": {"id": 1},
+        "search_results_id_list": [1, 2],
+        "search_time_taken": 0.12,
+        "user_device": "ios",
+    }
+    payload.update(overrides)
+    return payload
+
+
+class IngestValidationTest(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(search_records.router)
+        app.add_exception_handler(RequestValidationError, request_validation_exception_handler)
+        self.client = TestClient(app)
+        self.buffered = len(search_records.search_record_buffer)
+
+    def post(self, body: str):
+        return self.client.post(
+            "/search-records", content=body, headers={"Content-Type": "application/json"}
+        )
+
+    def test_non_finite_or_negative_time_taken_is_rejected(self):
+        for value in ("NaN", "Infinity", "-Infinity", "-1"):
+            with self.subTest(value=value):
+                body = '{"id": 1, "user_id": 1, "user_grade_id": "g1", "search_content": "q", ' \
+                    '"search_time": "2024-01-01 10:00", "search_results_id": {"id": 1}, ' \
+                    f'"search_results_id_list": [1], "search_time_taken": {value}, "user_device": "ios"}}'
+                response = self.post(body)
+                self.assertEqual(response.status_code, 422)
+                self.assertIn("search_time_taken", response.text)
+
+    def test_strings_longer_than_the_columns_are_rejected(self):
+        for field, length in (
+            ("search_content", 1025),
+            ("user_grade_id", 65),
+            ("user_device", 129),
+            ("search_time", 17),
+        ):
+            with self.subTest(field=field):
+                response = self.client.post("/search-records", json=make_payload(**{field: "x" * length}))
+                self.assertEqual(response.status_code, 422)
+
+        self.assertEqual(len(search_records.search_record_buffer), self.buffered)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+流式分析：非有限或负的耗时不进入直方图，查询结果始终可以序列化为 JSON
+"""
+
+import json
+import unittest
+
+from common.sketches import LatencyHistogram
+from common.stream_analytics import StreamAnalytics
+
+NOW = 1_700_000_000.0
+
+
+class NonFiniteLatencyTest(unittest.TestCase):
+    def test_histogram_ignores_invalid_values(self):
+        histogram = LatencyHistogram()
+        for value in (0.2, float("inf"), float("-inf"), float("nan"), -1.0, 0.4):
+            histogram.add(value)
+
+        self.assertEqual(histogram.count, 2)
+        self.assertAlmostEqual(histogram.sum, 0.6)
+        self.assertEqual(histogram.max, 0.4)
+        self.assertEqual(histogram.min, 0.2)
+
+    def test_window_stays_serializable(self):
+        analytics = StreamAnalytics("test", window_seconds=60, windows=5)
+        analytics.observe("勾股定理", 0.3, "ios", "g1", now=NOW - 60)
+        analytics.observe("勾股定理", float("inf"), "ios", "g1", now=NOW - 60)
+        analytics.observe("勾股定理", float("nan"), "android", "g2", now=NOW)
+        analytics.observe("勾股定理", 0.5, "ios", "g1", now=NOW)
+
+        window = analytics.sliding(300, now=NOW)
+        self.assertEqual(window.queries.estimate("勾股定理"), 4)
+        self.assertEqual(sorted(window.latency["device"]), ["ios"])
+        for groups in window.latency.values():
+            for histogram in groups.values():
+                self.assertEqual(histogram.count, 2)
+                summary = {
+                    "mean": histogram.mean,
+                    "max": histogram.max,
+                    **histogram.quantiles((0.5, 0.99)),
+                }
+                json.dumps(summary, allow_nan=False)
+        json.dumps(analytics.snapshot(), allow_nan=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+写后缓冲：含坏数据的批次只丢弃坏数据，暂时性错误整批保留重试
+运行：python -m unittest discover -s tests -t .
+"""
+
+import os
+import tempfile
+import unittest
+
+from common.write_behind import WriteBehindBuffer
+
+
+def make_row(record_id: int, time_taken=0.12) -> dict:
+    return {
+        "id": record_id,
+        "user_id": 1,
+        "user_grade_id": "g1",
+        "search_content": f"query {record_id}",
+        "search_time": "2024-01-01 10:00",
+        "search_results_id": 1,
+        "search_results_id_list": [1, 2],
+        "search_time_taken": time_taken,
+        "user_device": "ios",
+    }
+
+
+class PoisonedBatchTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._previous_url = os.environ.get("DATABASE_URL")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{self._directory.name}/test.db"
+
+        from db.init import init_db
+
+        await init_db()
+
+    async def asyncTearDown(self):
+        from db.database import dispose_engine
+
+        await dispose_engine()
+        if self._previous_url is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = self._previous_url
+        self._directory.cleanup()
+
+    async def _stored_ids(self):
+        from sqlalchemy import select
+
+        from db.database import get_session_factory
+        from models import SearchRecordModel
+
+        async with get_session_factory()() as session:
+            return sorted((await session.execute(select(SearchRecordModel.id))).scalars())
+
+    async def test_bad_row_is_dropped_and_valid_rows_are_written(self):
+        from api.api_v1.search_records import is_permanent_write_error, write_search_records
+
+        buffer = WriteBehindBuffer("test", write_search_records, is_permanent=is_permanent_write_error)
+        # NaN 在 SQLite 中存为 NULL，违反 NOT NULL 约束
+        buffer.add([make_row(1), make_row(2, float("nan")), make_row(3), make_row(4)])
+
+        self.assertTrue(await buffer.flush())
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.dropped, 1)
+        self.assertEqual(buffer.flushed, 3)
+        self.assertEqual(await self._stored_ids(), [1, 3, 4])
+        self.assertIn('write_behind_dropped_total{buffer="test"} 1', buffer.render_prometheus())
+
+    async def test_transient_error_keeps_the_batch(self):
+        calls = []
+
+        async def sink(items):
+            calls.append(list(items))
+            raise ConnectionError("database is down")
+
+        buffer = WriteBehindBuffer("test", sink, is_permanent=lambda error: False)
+        buffer.add([make_row(1), make_row(2)])
+
+        self.assertFalse(await buffer.flush())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.dropped, 0)
+
+    async def test_transient_error_while_splitting_requeues_unwritten_rows_in_order(self):
+        written = []
+        failures = {"transient": 1}
+
+        class BadRow(Exception):
+            pass
+
+        async def sink(items):
+            if any(item["id"] == 2 for item in items):
+                raise BadRow()
+            if items[0]["id"] == 3 and failures["transient"]:
+                failures["transient"] -= 1
+                raise ConnectionError("database is down")
+            written.extend(item["id"] for item in items)
+
+        buffer = WriteBehindBuffer("test", sink, is_permanent=lambda error: isinstance(error, BadRow))
+        buffer.add([make_row(i) for i in range(1, 5)])
+
+        self.assertFalse(await buffer.flush())
+        self.assertEqual([item["id"] for item in buffer._items], [3, 4])
+        self.assertTrue(await buffer.flush())
+        self.assertEqual(written, [1, 3, 4])
+        self.assertEqual(buffer.dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
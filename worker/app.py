@@ -2,7 +2,6 @@ import os
 
 from celery.app import Celery
 from datetime import datetime
-import pandas as pd
 import json
 
 
@@ -26,6 +25,9 @@ def process_ask(prompt, template, json_str, times, length):
     print(f"get ask")
     print(template)
     data = json.loads(json_str)
+    # pandas 只在执行任务时导入，不拖慢 worker 启动
+    import pandas as pd
+
     df = pd.DataFrame(data)
     return {"ask": json_str}
 